@@ -0,0 +1,70 @@
+"""
+Admin API — Runtime controls for instrumentation and on-demand profiling.
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from typing import Optional
+from app.services import metrics, profiler, shared_state
+
+router = APIRouter()
+
+
+@router.post("/metrics")
+async def toggle_metrics(enabled: bool):
+    """Switch hot-path instrumentation on or off without a restart."""
+    metrics.set_enabled(enabled)
+    return {"message": f"Metrics {'enabled' if enabled else 'disabled'}", "enabled": metrics.is_enabled()}
+
+
+# ── Profiling ───────────────────────────────────────────────
+class ProfileRequest(BaseModel):
+    target: str = "tick"  # "tick" or a route path, e.g. "/api/agents/"
+    count: int = 3
+    sort: str = "cumulative"
+
+
+@router.post("/profile")
+async def start_profile(req: ProfileRequest):
+    """Profile the next `count` simulation ticks or requests to one route."""
+    try:
+        state = profiler.start(req.target, req.count, req.sort)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"message": f"Profiling next {state['active']['count']} x {req.target}", **state}
+
+
+@router.get("/profile")
+async def profile_status():
+    return profiler.status()
+
+
+@router.delete("/profile")
+async def cancel_profile():
+    """Disarm the active session; partial captures are still saved."""
+    result = profiler.cancel()
+    return {"message": "Profiling cancelled", "result": result}
+
+
+@router.get("/profile/{profile_id}")
+async def get_profile(profile_id: str):
+    result = profiler.get_result(profile_id)
+    if not result:
+        return {"error": "Profile not found"}
+    return result
+
+
+@router.get("/profile/{profile_id}/flame", response_class=PlainTextResponse)
+async def get_profile_flame(profile_id: str):
+    """Collapsed stacks, one `frame;frame;frame count` per line (flamegraph.pl / speedscope)."""
+    collapsed = await profiler.get_collapsed(profile_id)
+    if collapsed is None:
+        return PlainTextResponse("Profile not found", status_code=404)
+    return PlainTextResponse(collapsed)
+
+
+# ── Shared state ────────────────────────────────────────────
+@router.get("/state")
+async def shared_state_status():
+    """This worker's role and the snapshot version it is serving."""
+    return shared_state.get_status()
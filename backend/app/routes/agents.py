@@ -2,73 +2,212 @@
 AI Agents API routes — manages trading bot configurations + simulation wallets.
 Persists agent configs to disk so they survive restarts.
 """
+import asyncio
 import time
-from fastapi import APIRouter
-from pydantic import BaseModel
-from app.services.simulator import get_wallet, get_all_wallets, get_trade_history, initialize_agent_wallet, set_agent_status
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, field_validator
+from app.services.simulator import (
+    get_wallet, get_all_wallets, get_trade_history, initialize_agent_wallets,
+    set_agent_status, update_agent_config, add_status_listener, set_agent_directory,
+    execute_orders, get_covariance_engine, get_leaderboard,
+)
+from app.services import projection, risk, shared_state, sweep
+from app.services.agent_registry import AgentRegistry
+from app.services.leaderboard import METRICS
+from app.services.rebalancer import plan_rebalance, validate_targets
+from app.services.market_data import MarketDataService, CRYPTO_IDS, STOCK_SYMBOLS
 from app.services.persistence import save_agents, load_agents
 
 router = APIRouter()
+market_service = MarketDataService()
 
 # Load agents from disk on module import
-_agents = load_agents()
-if not _agents:
-    _agents = [
+_registry = AgentRegistry(load_agents())
+if not len(_registry):
+    _registry.load([
         {"id": 1, "name": "Alpha Momentum", "strategy": "Trend Following", "asset": "Crypto (BTC/ETH)", "status": "active", "capital": 25000},
         {"id": 2, "name": "Tech Breakout", "strategy": "Volatility Breakout", "asset": "Stocks (AAPL/NVDA/MSFT)", "status": "active", "capital": 30000},
         {"id": 3, "name": "Stable Yield", "strategy": "Mean Reversion", "asset": "Crypto (BTC/ETH)", "status": "active", "capital": 15000},
         {"id": 4, "name": "Altcoin Scalper", "strategy": "High Frequency", "asset": "Crypto (SOL/AVAX/MATIC)", "status": "active", "capital": 10000},
-    ]
-    save_agents(_agents)
+    ])
+    save_agents(_registry.all())
 
-_next_id = max((a["id"] for a in _agents), default=0) + 1
+_next_id = _registry.next_id()
+
+# Keep the simulator's trading set in sync with persisted statuses
+for _a in _registry.all():
+    set_agent_status(_a["id"], _a.get("status", "active"))
+
+
+def _on_status_changes(changes: Dict[int, str]):
+    """Mirror a tick's simulator-initiated status changes (risk auto-pause) into the agent configs."""
+    changed = False
+    for agent_id, status in changes.items():
+        agent = _registry.get(agent_id)
+        if agent and agent["status"] != status:
+            _registry.update(agent_id, status=status)
+            changed = True
+    if changed:
+        save_agents(_registry.all())
+
+
+add_status_listener(_on_status_changes)
 
 
 def get_agents_list():
     """Expose agent list for other modules."""
-    return _agents
+    return _registry.all()
+
+
+set_agent_directory(get_agents_list)
+
+
+def _restore_agents(state: dict):
+    global _next_id
+    _registry.load(state["agents"])
+    _next_id = state["nextId"]
+
+
+shared_state.register("agents", lambda: {"agents": _registry.all(), "nextId": _next_id}, _restore_agents,
+                      version=lambda: (_registry.version, _next_id))
+
+
+# Sortable keys for GET /: agent config fields, or a wallet field (with default)
+AGENT_SORT_KEYS = ("id", "name", "strategy", "asset", "status", "capital")
+WALLET_SORT_KEYS = {
+    "totalValue": "total_value",
+    "pnl": "pnl",
+    "pnlPct": "pnl_pct",
+    "tradesCount": "trades_count",
+    "cash": "cash",
+}
+
+
+def _wallet_view(agent: dict, wallet: dict) -> dict:
+    return {
+        "initialCapital": wallet.get("initial_capital", agent["capital"]),
+        "cash": round(wallet.get("cash", agent["capital"]), 2),
+        "totalValue": wallet.get("total_value", agent["capital"]),
+        "pnl": wallet.get("pnl", 0),
+        "pnlPct": wallet.get("pnl_pct", 0),
+        "tradesCount": wallet.get("trades_count", 0),
+        "wins": wallet.get("wins", 0),
+        "losses": wallet.get("losses", 0),
+        "winRate": round(
+            (wallet.get("wins", 0) / max(wallet.get("trades_count", 1), 1)) * 100, 1
+        ),
+        "positions": {
+            sym: {
+                "qty": round(p["qty"], 6),
+                "avgEntry": round(p["avgEntry"], 2),
+                "currentPrice": round(p["currentPrice"], 2),
+                "unrealizedPnl": round((p["currentPrice"] - p["avgEntry"]) * p["qty"], 2),
+            }
+            for sym, p in wallet.get("positions", {}).items()
+        },
+        "lastTrade": wallet.get("last_trade"),
+    }
+
+
+def _split(value: Optional[str]):
+    """Comma-separated query value -> list of alternatives (None stays None)."""
+    if value is None:
+        return None
+    parts = [v.strip() for v in value.split(",") if v.strip()]
+    return parts[0] if len(parts) == 1 else parts
 
 
 @router.get("/")
-async def list_agents():
-    """List all agents enriched with live simulation data."""
-    enriched = []
+async def list_agents(
+    strategy: Optional[str] = None,
+    asset: Optional[str] = None,
+    status: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None,
+):
+    """
+    List agents enriched with live simulation data.
+    - strategy / asset / status: exact match, comma-separated for alternatives
+    - q: case-insensitive substring of the agent name
+    - sort: an agent field or totalValue / pnl / pnlPct / tradesCount / cash; prefix "-" for descending
+    - offset / limit: pagination over the filtered, sorted list
+    - fields: comma-separated keys to return (e.g. "id,name,status,wallet"); "wallet" and
+      "runtime" are only computed when requested
+    """
     all_wallets = get_all_wallets()
-    for agent in _agents:
-        wallet = all_wallets.get(agent["id"], {})
-        enriched.append({
-            **agent,
-            "wallet": {
-                "initialCapital": wallet.get("initial_capital", agent["capital"]),
-                "cash": round(wallet.get("cash", agent["capital"]), 2),
-                "totalValue": wallet.get("total_value", agent["capital"]),
-                "pnl": wallet.get("pnl", 0),
-                "pnlPct": wallet.get("pnl_pct", 0),
-                "tradesCount": wallet.get("trades_count", 0),
-                "wins": wallet.get("wins", 0),
-                "losses": wallet.get("losses", 0),
-                "winRate": round(
-                    (wallet.get("wins", 0) / max(wallet.get("trades_count", 1), 1)) * 100, 1
-                ),
-                "positions": {
-                    sym: {
-                        "qty": round(p["qty"], 6),
-                        "avgEntry": round(p["avgEntry"], 2),
-                        "currentPrice": round(p["currentPrice"], 2),
-                        "unrealizedPnl": round((p["currentPrice"] - p["avgEntry"]) * p["qty"], 2),
-                    }
-                    for sym, p in wallet.get("positions", {}).items()
-                },
-                "lastTrade": wallet.get("last_trade"),
-            },
-            "runtime": _format_runtime(wallet.get("started_at", time.time())),
-        })
-    return {"agents": enriched, "count": len(enriched)}
+    ids = _registry.ids(strategy=_split(strategy), asset=_split(asset), status=_split(status))
+    if q:
+        needle = q.lower()
+        ids = [a for a in ids if needle in _registry.get(a)["name"].lower()]
+
+    if sort:
+        key, reverse = sort.lstrip("-"), sort.startswith("-")
+        if key in AGENT_SORT_KEYS:
+            # Sort on (missing, value) so str fields never compare against a numeric default
+            values = {a: _registry.get(a).get(key) for a in ids}
+            ids.sort(key=lambda a: (values[a] is None, values[a]), reverse=reverse)
+        elif key in WALLET_SORT_KEYS:
+            wkey = WALLET_SORT_KEYS[key]
+            ids.sort(key=lambda a: all_wallets.get(a, {}).get(wkey, 0), reverse=reverse)
+        else:
+            return {"error": f"Unknown sort key '{key}'"}
+
+    total = len(ids)
+    page = ids[max(offset, 0):None if limit is None else max(offset, 0) + max(limit, 0)]
+    wanted = {f.strip() for f in fields.split(",") if f.strip()} if fields else None
+
+    enriched = []
+    for agent_id in page:
+        agent = _registry.get(agent_id)
+        wallet = all_wallets.get(agent_id, {})
+        if wanted is None:
+            enriched.append({
+                **agent,
+                "wallet": _wallet_view(agent, wallet),
+                "runtime": _format_runtime(wallet.get("started_at", time.time())),
+            })
+            continue
+        row = {k: agent[k] for k in wanted if k in agent}
+        if "wallet" in wanted:
+            row["wallet"] = _wallet_view(agent, wallet)
+        if "runtime" in wanted:
+            row["runtime"] = _format_runtime(wallet.get("started_at", time.time()))
+        enriched.append(row)
+    # Plain dicts of JSON types: skip FastAPI's per-field encoder, which dominates at 10k+ agents
+    return JSONResponse({"agents": enriched, "count": len(enriched), "total": total, "offset": offset})
+
+
+@router.get("/leaderboard")
+async def get_leaderboard_page(
+    by: str = Query(default="pnl", pattern="^(" + "|".join(METRICS) + ")$"),
+    top: int = Query(default=10, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    worst: bool = False,
+    agent_id: Optional[int] = None,
+):
+    """
+    Agents ranked by pnl / pnlPct / winRate / sharpe as of the last tick: `top` ranks from
+    `offset` (from the bottom with worst=true), plus `agent_id`'s own rank when given.
+    """
+    board = get_leaderboard()
+    entries = board.top(by, top, offset, worst)
+    for entry in entries:
+        agent = _registry.get(entry["id"]) or {}
+        entry.update(name=agent.get("name"), strategy=agent.get("strategy"), status=agent.get("status"))
+    result = {"by": by, "total": len(board), "agents": entries}
+    if agent_id is not None:
+        result["agent"] = board.rank(agent_id, by)
+    return result
 
 
 @router.get("/{agent_id}")
 async def get_agent(agent_id: int):
-    agent = next((a for a in _agents if a["id"] == agent_id), None)
+    agent = _registry.get(agent_id)
     if not agent:
         return {"error": "Agent not found"}
     wallet = get_wallet(agent_id)
@@ -82,31 +221,219 @@ class CreateAgentRequest(BaseModel):
     asset: str
     capital: float
 
+def _deploy(requests: List[CreateAgentRequest]) -> List[dict]:
+    """Register agents, fund their wallets and persist both once, however many there are."""
+    global _next_id
+    created = []
+    for req in requests:
+        agent = {
+            "id": _next_id, "name": req.name, "strategy": req.strategy,
+            "asset": req.asset, "status": "active", "capital": req.capital,
+        }
+        _registry.add(agent)
+        created.append(agent)
+        _next_id += 1
+    save_agents(_registry.all())
+    initialize_agent_wallets([(a["id"], a["capital"], a["strategy"], a["asset"]) for a in created])
+    return created
+
+
 @router.post("/create")
 async def create_agent(req: CreateAgentRequest):
-    global _next_id
-    new_agent = {
-        "id": _next_id, "name": req.name, "strategy": req.strategy,
-        "asset": req.asset, "status": "active", "capital": req.capital,
-    }
-    _agents.append(new_agent)
-    save_agents(_agents)
-    initialize_agent_wallet(_next_id, req.capital, req.strategy, req.asset)
-    _next_id += 1
+    new_agent = _deploy([req])[0]
     return {"message": f"Agent '{req.name}' deployed with ${req.capital:,.2f} virtual funds", "agent": new_agent}
 
 
+class BulkCreateRequest(BaseModel):
+    agents: List[CreateAgentRequest]
+
+@router.post("/bulk")
+async def create_agents_bulk(req: BulkCreateRequest):
+    """Deploy many agents in one request, writing the agents and wallet files once."""
+    if not req.agents:
+        return {"error": "No agents given"}
+    created = _deploy(req.agents)
+    capital = sum(a["capital"] for a in created)
+    return {
+        "message": f"Deployed {len(created)} agents with ${capital:,.2f} virtual funds",
+        "count": len(created),
+        "ids": [a["id"] for a in created],
+    }
+
+
+class SweepRequest(BaseModel):
+    strategy: str
+    grid: Optional[Dict[str, List[float]]] = None  # {param: [values...]}, every combination
+    ranges: Optional[Dict[str, List[float]]] = None  # {param: [low, high]}, random search
+    samples: int = sweep.DEFAULT_SAMPLES
+    seed: Optional[int] = None
+    symbols: Optional[List[str]] = None  # default: every tracked symbol
+    by: str = "sharpe"  # return / drawdown / sharpe
+    top: int = 20
+
+@router.post("/sweep")
+async def sweep_strategy(req: SweepRequest):
+    """
+    Backtest a grid or random sample of strategy parameters on daily history and rank them.
+    Backtests already run with the same parameters and data come from the cache.
+    """
+    try:
+        configs = sweep.build_configs(req.strategy, req.grid, req.ranges, req.samples, req.seed)
+        series, skipped = await sweep.load_series(req.symbols or list(CRYPTO_IDS.values()) + STOCK_SYMBOLS)
+        result = await asyncio.to_thread(sweep.run_sweep, req.strategy, configs, series, req.by, req.top)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {**result, "skipped": skipped}
+
+
 @router.post("/{agent_id}/toggle")
 async def toggle_agent(agent_id: int):
-    agent = next((a for a in _agents if a["id"] == agent_id), None)
+    agent = _registry.get(agent_id)
     if not agent:
         return {"error": "Agent not found"}
-    agent["status"] = "paused" if agent["status"] == "active" else "active"
+    _registry.update(agent_id, status="paused" if agent["status"] == "active" else "active")
     set_agent_status(agent_id, agent["status"])
-    save_agents(_agents)
+    save_agents(_registry.all())
     return {"message": f"Agent '{agent['name']}' is now {agent['status']}", "agent": agent}
 
 
+class BulkToggleRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    strategy: Optional[str] = None  # select by current config/status instead of (or on top of) ids
+    asset: Optional[str] = None
+    status: Optional[str] = None
+    set_status: Optional[str] = None  # "active" / "paused"; omitted flips each agent
+    all: bool = False
+
+@router.post("/bulk-toggle")
+async def toggle_agents_bulk(req: BulkToggleRequest):
+    """Pause/resume (or flip) a set of agents, persisting once."""
+    if req.set_status not in (None, "active", "paused"):
+        return {"error": "set_status must be 'active' or 'paused'"}
+    if req.ids is None and not (req.strategy or req.asset or req.status or req.all):
+        return {"error": "Give ids, a filter, or all=true"}
+    ids = _registry.ids(strategy=req.strategy, asset=req.asset, status=req.status)
+    if req.ids is not None:
+        selected = set(req.ids)
+        ids = [a for a in ids if a in selected]
+
+    changed = {"active": 0, "paused": 0}
+    for agent_id in ids:
+        current = _registry.get(agent_id)["status"]
+        new_status = req.set_status or ("paused" if current == "active" else "active")
+        if new_status == current:
+            continue
+        _registry.update(agent_id, status=new_status)
+        set_agent_status(agent_id, new_status)
+        changed[new_status] += 1
+    if changed["active"] or changed["paused"]:
+        save_agents(_registry.all())
+    return {
+        "message": f"Resumed {changed['active']} and paused {changed['paused']} agents",
+        "matched": len(ids),
+        "activated": changed["active"],
+        "paused": changed["paused"],
+    }
+
+
+class UpdateAgentRequest(BaseModel):
+    strategy: Optional[str] = None
+    asset: Optional[str] = None
+
+@router.post("/{agent_id}/update")
+async def update_agent(agent_id: int, req: UpdateAgentRequest):
+    agent = _registry.get(agent_id)
+    if not agent:
+        return {"error": "Agent not found"}
+    _registry.update(agent_id, strategy=req.strategy or None, asset=req.asset or None)
+    update_agent_config(agent_id, req.strategy, req.asset)
+    save_agents(_registry.all())
+    return {"message": f"Agent '{agent['name']}' updated", "agent": agent}
+
+
+@router.get("/{agent_id}/risk")
+async def get_agent_risk(agent_id: int):
+    """Live drawdown, exposure, concentration and VaR for one agent."""
+    agent = _registry.get(agent_id)
+    if not agent:
+        return {"error": "Agent not found"}
+    return {**risk.get_risk_report(agent_id), "status": agent["status"]}
+
+
+@router.get("/{agent_id}/projection")
+async def get_agent_projection(
+    agent_id: int,
+    paths: int = Query(default=projection.DEFAULT_PATHS, ge=100, le=projection.MAX_PATHS),
+    horizon: int = Query(default=projection.TRADING_DAYS, ge=1, le=projection.MAX_HORIZON),
+    seed: Optional[int] = None,
+    drift: str = Query(default="historical", pattern="^(historical|zero)$"),
+):
+    """
+    Monte Carlo projection of the agent's current holdings over `horizon` trading days:
+    percentile bands of equity, terminal return / VaR, and drawdown probabilities.
+    """
+    agent = _registry.get(agent_id)
+    wallet = get_wallet(agent_id)
+    if not agent or not wallet:
+        return {"error": "Agent not found"}
+    values = {sym: p["qty"] * p.get("currentPrice", 0) for sym, p in wallet["positions"].items()}
+    result = await projection.project(values, wallet["cash"], get_covariance_engine(),
+                                      paths=paths, horizon=horizon, seed=seed, drift=drift)
+    return {"agentId": agent_id, **result}
+
+
+class RiskLimitsRequest(BaseModel):
+    max_drawdown_pct: Optional[float] = None
+    max_position_pct: Optional[float] = None
+    max_gross_exposure_pct: Optional[float] = None
+    max_var_pct: Optional[float] = None
+
+@router.post("/{agent_id}/risk/limits")
+async def set_agent_risk_limits(agent_id: int, req: RiskLimitsRequest):
+    agent = _registry.get(agent_id)
+    if not agent:
+        return {"error": "Agent not found"}
+    limits = risk.set_limits(agent_id, **req.model_dump())
+    return {"message": f"Risk limits updated for '{agent['name']}'", "limits": limits}
+
+
+class AgentRebalanceRequest(BaseModel):
+    targets: Optional[Dict[str, float]] = None  # {symbol: weight of equity}, e.g. {"BTC": 0.3}
+    max_weight: Optional[float] = Field(default=0.30, ge=0, le=1)  # also caps explicit targets
+    crypto_cap: Optional[float] = Field(default=None, ge=0, le=1)
+    dry_run: bool = True
+
+    @field_validator("targets")
+    @classmethod
+    def check_targets(cls, v):
+        return v if v is None else validate_targets(v)
+
+@router.post("/{agent_id}/rebalance")
+async def rebalance_agent(agent_id: int, req: AgentRebalanceRequest):
+    """Plan the minimal trades to reach target weights / limits, and optionally execute them."""
+    agent = _registry.get(agent_id)
+    wallet = get_wallet(agent_id)
+    if not agent or not wallet:
+        return {"error": "Agent not found"}
+    if not req.dry_run and agent["status"] != "active":
+        return {"error": f"Agent '{agent['name']}' is paused; resume it before executing a rebalance"}
+    prices = {p["symbol"]: p["price"] for p in market_service.get_all_prices()}
+    plan = plan_rebalance(
+        {sym: p["qty"] * p["currentPrice"] for sym, p in wallet["positions"].items()},
+        prices,
+        wallet["cash"],
+        targets=req.targets,
+        max_weight=req.max_weight,
+        sector_caps={"Crypto": req.crypto_cap} if req.crypto_cap is not None else None,
+    )
+    if req.dry_run or not plan["trades"]:
+        return {"agentId": agent_id, "dryRun": True, **plan}
+    result = execute_orders(agent_id, [
+        {"symbol": t["symbol"], "side": t["side"], "qty": t["qty"]} for t in plan["trades"]
+    ])
+    return {"agentId": agent_id, "dryRun": False, **plan, "execution": result}
+
+
 def _format_runtime(started_at: float) -> str:
     elapsed = time.time() - started_at
     if elapsed < 60:
@@ -0,0 +1,91 @@
+"""
+Alerts API — Price / indicator threshold rules and the feed of alerts they fire.
+Rules are checked on every market refresh; fired alerts can be polled or streamed (SSE).
+"""
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.services.alerts import get_alert_engine, MAX_EVENTS
+
+router = APIRouter()
+engine = get_alert_engine()
+
+
+@router.get("/")
+async def list_alerts(
+    symbol: Optional[str] = None,
+    status: Optional[str] = Query(default=None, pattern="^(active|triggered)$"),
+):
+    rules = engine.query(symbol, status)
+    return {"rules": rules, "count": len(rules)}
+
+
+class AlertRuleRequest(BaseModel):
+    symbol: str
+    field: str = "price"  # or an indicator: rsi, sma20, zscore, ...
+    condition: str = "cross"  # above / below / cross
+    threshold: float
+    once: bool = False  # disarm after the first time it fires
+    note: Optional[str] = None
+
+@router.post("/")
+async def create_alert(req: AlertRuleRequest):
+    try:
+        rule = engine.create([req.model_dump()])[0]
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"message": f"Alert #{rule['id']} set on {rule['symbol']} {rule['field']}", "rule": rule}
+
+
+class BulkAlertRequest(BaseModel):
+    rules: List[AlertRuleRequest]
+
+@router.post("/bulk")
+async def create_alerts_bulk(req: BulkAlertRequest):
+    """Register many rules at once; nothing is added if any rule is invalid."""
+    if not req.rules:
+        return {"error": "No rules given"}
+    try:
+        rules = engine.create([r.model_dump() for r in req.rules])
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"message": f"Created {len(rules)} alerts", "count": len(rules), "ids": [r["id"] for r in rules]}
+
+
+@router.get("/events")
+async def alert_events(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=MAX_EVENTS),
+):
+    """Fired alerts with seq > `since`, oldest first; pass back the returned `seq` to poll for newer ones."""
+    events = engine.events_since(since, limit)
+    return {"events": events, "count": len(events), "seq": events[-1]["seq"] if events else max(since, engine.seq)}
+
+
+@router.get("/stream")
+async def alert_stream(request: Request, since: Optional[int] = Query(default=None, ge=0)):
+    """Server-Sent Events feed of fired alerts, from `since` (default: only new ones)."""
+    async def events():
+        seq = engine.seq if since is None else since
+        while not await request.is_disconnected():
+            for event in engine.events_since(seq, MAX_EVENTS):
+                seq = event["seq"]
+                yield f"event: alert\ndata: {json.dumps(event)}\n\n"
+            await asyncio.sleep(1)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.delete("/{rule_id}")
+async def delete_alert(rule_id: int):
+    rule = engine.delete(rule_id)
+    if not rule:
+        return {"error": "Alert not found"}
+    return {"message": f"Alert #{rule_id} deleted", "rule": rule}
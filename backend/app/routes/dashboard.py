@@ -3,7 +3,7 @@ Dashboard API — Real-time aggregated data from agents, market, and portfolio.
 """
 import time
 from fastapi import APIRouter
-from app.services.simulator import get_all_wallets
+from app.services.simulator import get_all_wallets, get_tick_metrics
 from app.services.market_data import MarketDataService
 
 router = APIRouter()
@@ -75,6 +75,7 @@ async def get_dashboard_stats():
             "label": sentiment_label,
         },
         "portfolioHistory": history,
+        "lastTick": get_tick_metrics(),
     }
 
 
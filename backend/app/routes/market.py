@@ -1,9 +1,15 @@
 """
 Market Data API routes — serves real-time prices and AI analysis.
 """
+import math
+from typing import Optional
 from fastapi import APIRouter, Query
-from app.services.market_data import MarketDataService
-from app.services.ai_engine import generate_signal
+from app.services.market_data import MarketDataService, STOCK_SYMBOLS
+from app.services.ai_engine import compute_indicator_series, generate_signal
+from app.services.candles import get_candle_builder, INTERVALS
+from app.services.metrics import record_cache
+from app.services.stock_history import get_stock_history
+from app.services.simulator import get_covariance_engine
 
 router = APIRouter()
 service = MarketDataService()
@@ -13,6 +19,7 @@ service = MarketDataService()
 async def get_all_prices():
     """Get all current market prices (crypto + stocks)."""
     data = service.get_all_prices()
+    record_cache("market_prices", bool(data))
     if not data:
         # If cache is empty, fetch now
         await service.refresh_all()
@@ -24,6 +31,7 @@ async def get_all_prices():
 async def get_crypto_prices():
     """Get crypto prices only."""
     data = service.get_crypto_prices()
+    record_cache("market_crypto", bool(data))
     if not data:
         data = await service.fetch_crypto_prices()
     return {"data": data}
@@ -33,6 +41,7 @@ async def get_crypto_prices():
 async def get_stock_prices():
     """Get stock prices only."""
     data = service.get_stock_prices()
+    record_cache("market_stocks", bool(data))
     if not data:
         data = await service.fetch_stock_prices()
     return {"data": data}
@@ -42,10 +51,48 @@ async def get_stock_prices():
 async def get_price_history(
     coin_id: str = "bitcoin",
     days: int = Query(default=30, ge=1, le=365),
+    points: int = Query(default=60, ge=0, le=5000),
+    method: str = Query(default="lttb", pattern="^(lttb|minmax)$"),
 ):
-    """Get historical price data for a crypto asset."""
-    data = await service.fetch_crypto_history(coin_id, days)
-    return {"coin": coin_id, "days": days, "data": data}
+    """Get historical price data for a crypto asset, downsampled to ~`points` (0 = full resolution)."""
+    data = await service.fetch_crypto_history(coin_id, days, points=points or None, method=method)
+    return {"coin": coin_id, "days": days, "points": len(data), "data": data}
+
+
+@router.get("/candles/{symbol}")
+async def get_candles(
+    symbol: str,
+    interval: str = Query(default="1m", pattern="^(" + "|".join(INTERVALS) + ")$"),
+    limit: int = Query(default=200, ge=1, le=1000),
+    indicators: bool = False,
+):
+    """
+    OHLCV bars built from the polled quotes; the last bar is still open (closed=false).
+    indicators=true adds the indicator set computed on the closed bars' closes, one value per bar.
+    """
+    builder = get_candle_builder()
+    symbol = symbol.upper()
+    if symbol not in builder.symbols():
+        return {"error": f"No candles for {symbol}"}
+    result = {"symbol": symbol, "interval": interval, "candles": builder.candles(symbol, interval, limit)}
+    result["count"] = len(result["candles"])
+    if indicators:
+        closes = builder.arrays(symbol, interval)["close"]
+        # Computed on the full closed history so long-window indicators are warm, then trimmed
+        series = compute_indicator_series(closes)
+        n = min(limit, len(closes))
+        result["indicators"] = {
+            k: [None if math.isnan(v) else v for v in values[len(closes) - n:].tolist()]
+            for k, values in series.items() if k not in ("length", "currentPrice")
+        }
+    return result
+
+
+@router.get("/correlations")
+async def get_correlations(symbols: Optional[str] = None):
+    """EWMA return correlation matrix and volatilities across tracked symbols (comma-separated filter)."""
+    wanted = [s.strip().upper() for s in symbols.split(",")] if symbols else None
+    return get_covariance_engine().correlations(wanted)
 
 
 @router.get("/analysis/{symbol}")
@@ -56,19 +103,19 @@ async def get_ai_analysis(symbol: str):
     coin_id = coin_map.get(symbol.upper())
 
     if coin_id:
-        history = await service.fetch_crypto_history(coin_id, 60)
+        history = await service.fetch_crypto_history(coin_id, 60, points=None)
         prices = [p["price"] for p in history]
     else:
-        # For stocks, generate simulated history from current data for demo
-        import random
-        stock_data = service.get_stock_prices()
-        current = next((s for s in stock_data if s["symbol"] == symbol.upper()), None)
-        if current:
-            base = current["price"]
-            prices = [base * (1 + random.uniform(-0.03, 0.03)) for _ in range(60)]
-            prices.append(base)
-        else:
+        # Stocks: cached daily closes, with the live quote as the latest point
+        symbol = symbol.upper()
+        current = next((s for s in service.get_stock_prices() if s["symbol"] == symbol), None)
+        if not current and symbol not in STOCK_SYMBOLS:
             return {"error": f"Symbol {symbol} not found"}
+        prices = await get_stock_history().get_closes(symbol, 120)
+        if current:
+            prices.append(current["price"])
+        if len(prices) < 2:
+            return {"error": f"No price history available for {symbol}"}
 
     signal = generate_signal(prices)
     signal["symbol"] = symbol.upper()
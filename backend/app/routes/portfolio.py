@@ -1,52 +1,89 @@
 """
-Portfolio API routes.
+Portfolio API routes — aggregated holdings across every agent's simulated wallet.
 """
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import List
-from app.services.ai_engine import analyze_portfolio
+from fastapi import APIRouter, Query
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
+from app.services import projection
+from app.services.simulator import get_portfolio_analyzer, get_covariance_engine
+from app.services.market_data import MarketDataService
+from app.services.rebalancer import plan_rebalance, validate_targets
 
 router = APIRouter()
-
-# In-memory portfolio state (would be DB in production)
-_portfolio = [
-    {"name": "BTC", "value": 45000, "sector": "Crypto"},
-    {"name": "AAPL", "value": 32000, "sector": "Stocks"},
-    {"name": "ETH", "value": 28000, "sector": "Crypto"},
-    {"name": "NVDA", "value": 18000, "sector": "Stocks"},
-    {"name": "SOL", "value": 12000, "sector": "Crypto"},
-    {"name": "Cash", "value": 12832.50, "sector": "Cash"},
-]
+market_service = MarketDataService()
 
 
 @router.get("/holdings")
 async def get_holdings():
-    """Get current portfolio holdings."""
-    total = sum(h["value"] for h in _portfolio)
+    """Get current portfolio holdings (all agent positions marked to market, plus cash)."""
+    portfolio = get_portfolio_analyzer()
+    holdings = portfolio.holdings()
     return {
-        "holdings": _portfolio,
-        "totalValue": total,
-        "assetCount": len(_portfolio),
+        "holdings": holdings,
+        "totalValue": round(portfolio.total, 2),
+        "assetCount": len(holdings),
     }
 
 
 @router.get("/analysis")
 async def get_portfolio_analysis():
     """Get AI-driven portfolio analysis and rebalancing suggestions."""
-    analysis = analyze_portfolio(_portfolio)
-    return analysis
+    return get_portfolio_analyzer().analysis()
+
+
+@router.get("/projection")
+async def get_portfolio_projection(
+    paths: int = Query(default=projection.DEFAULT_PATHS, ge=100, le=projection.MAX_PATHS),
+    horizon: int = Query(default=projection.TRADING_DAYS, ge=1, le=projection.MAX_HORIZON),
+    seed: Optional[int] = None,
+    drift: str = Query(default="historical", pattern="^(historical|zero)$"),
+):
+    """Monte Carlo projection of the aggregated holdings (see /api/agents/{id}/projection)."""
+    portfolio = get_portfolio_analyzer()
+    values = {h["name"]: h["value"] for h in portfolio.holdings() if h["name"] != "Cash"}
+    return await projection.project(values, portfolio.get("Cash"), get_covariance_engine(),
+                                    paths=paths, horizon=horizon, seed=seed, drift=drift)
 
 
+class Adjustment(BaseModel):
+    name: str
+    newValue: Optional[float] = Field(default=None, ge=0)  # target value; omitted/null keeps the current one
+
 class RebalanceRequest(BaseModel):
-    adjustments: List[dict]  # [{name: "BTC", newValue: 40000}, ...]
+    adjustments: List[Adjustment] = []  # [{name: "BTC", newValue: 40000}, ...] target values
+    targets: Optional[Dict[str, float]] = None  # {symbol: weight of total equity}
+    max_weight: Optional[float] = Field(default=0.30, ge=0, le=1)  # also caps explicit targets
+    crypto_cap: Optional[float] = Field(default=None, ge=0, le=1)
+
+    @field_validator("targets")
+    @classmethod
+    def check_targets(cls, v):
+        return v if v is None else validate_targets(v)
 
 @router.post("/rebalance")
 async def rebalance(req: RebalanceRequest):
-    """Apply rebalancing adjustments to the portfolio."""
-    global _portfolio
-    for adj in req.adjustments:
-        for h in _portfolio:
-            if h["name"] == adj.get("name"):
-                h["value"] = adj.get("newValue", h["value"])
-                break
-    return {"message": "Portfolio rebalanced", "holdings": _portfolio}
+    """
+    Compute the trades that move the aggregated portfolio to target values/weights, or back
+    within the per-asset and crypto caps. Always a dry run: the aggregate spans many wallets,
+    so execution goes through /api/agents/{id}/rebalance.
+    """
+    portfolio = get_portfolio_analyzer()
+    values = {h["name"]: h["value"] for h in portfolio.holdings() if h["name"] != "Cash"}
+    targets = req.targets
+    if req.adjustments and portfolio.total > 0:
+        targets = {**{sym: v / portfolio.total for sym, v in values.items()}, **(targets or {})}
+        for adj in req.adjustments:
+            if adj.name and adj.name != "Cash":
+                value = adj.newValue if adj.newValue is not None else values.get(adj.name, 0)
+                targets[adj.name] = value / portfolio.total
+    prices = {p["symbol"]: p["price"] for p in market_service.get_all_prices()}
+    try:
+        plan = plan_rebalance(
+            values, prices, portfolio.get("Cash"),
+            targets=targets,
+            max_weight=req.max_weight,
+            sector_caps={"Crypto": req.crypto_cap} if req.crypto_cap is not None else None,
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"message": f"Rebalance plan: {plan['summary']['trades']} trades", "dryRun": True, **plan}
@@ -0,0 +1,24 @@
+"""
+Trades API — Global feed of the latest simulated trades across all agents.
+"""
+from typing import Optional
+from fastapi import APIRouter, Query
+from app.services.simulator import get_recent_trades
+from app.routes.agents import get_agents_list
+
+router = APIRouter()
+
+
+@router.get("/recent")
+async def recent_trades(
+    limit: int = Query(default=20, ge=1, le=500),
+    agent_id: Optional[int] = None,
+    symbol: Optional[str] = None,
+    include_failed: bool = False,
+):
+    """Latest trades across all agents, newest first, optionally filtered by agent and symbol."""
+    names = {a["id"]: a["name"] for a in get_agents_list()}
+    trades = get_recent_trades(limit, agent_id=agent_id, symbol=symbol, successful_only=not include_failed)
+    for t in trades:
+        t["agent"] = names.get(t["agentId"], f"Agent #{t['agentId']}")
+    return {"trades": trades, "count": len(trades)}
@@ -0,0 +1,83 @@
+"""
+Agent Registry — Id-indexed store of agent configs with secondary indexes.
+Lookups by id are O(1) and filters on strategy / asset / status intersect precomputed id
+sets instead of scanning every agent, so registries with tens of thousands of agents stay fast.
+"""
+from typing import Dict, Iterable, List, Optional, Set
+
+INDEXED_FIELDS = ("strategy", "asset", "status")
+
+
+class AgentRegistry:
+    def __init__(self, agents: Iterable[dict] = ()):
+        self._by_id: Dict[int, dict] = {}
+        self._index: Dict[str, Dict[str, Set[int]]] = {f: {} for f in INDEXED_FIELDS}
+        self.version = 0  # bumped on every change
+        self.load(agents)
+
+    def load(self, agents: Iterable[dict]):
+        """Replace the contents and rebuild every index."""
+        self._by_id = {}
+        self._index = {f: {} for f in INDEXED_FIELDS}
+        self.version += 1
+        for agent in agents:
+            self.add(agent)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, agent_id: int) -> bool:
+        return agent_id in self._by_id
+
+    def next_id(self) -> int:
+        return max(self._by_id, default=0) + 1
+
+    def get(self, agent_id: int) -> Optional[dict]:
+        return self._by_id.get(agent_id)
+
+    def all(self) -> List[dict]:
+        return list(self._by_id.values())
+
+    def add(self, agent: dict):
+        self._by_id[agent["id"]] = agent
+        self.version += 1
+        for field in INDEXED_FIELDS:
+            self._index[field].setdefault(agent.get(field), set()).add(agent["id"])
+
+    def update(self, agent_id: int, **fields) -> Optional[dict]:
+        """Set fields on an agent (None values are ignored), keeping the indexes in sync."""
+        agent = self._by_id.get(agent_id)
+        if agent is None:
+            return None
+        for field, value in fields.items():
+            if value is None or agent.get(field) == value:
+                continue
+            if field in self._index:
+                self._index[field].get(agent.get(field), set()).discard(agent_id)
+                self._index[field].setdefault(value, set()).add(agent_id)
+            agent[field] = value
+            self.version += 1
+        return agent
+
+    def values(self, field: str) -> Dict[str, int]:
+        """Distinct values of an indexed field with their agent counts."""
+        return {v: len(ids) for v, ids in self._index[field].items() if ids}
+
+    def ids(self, **filters) -> List[int]:
+        """
+        Agent ids matching every given filter, in id order. A filter value may be
+        a single value or a list of alternatives; None means "don't filter on this field".
+        """
+        sets = []
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            index = self._index[field]
+            if isinstance(wanted, (list, tuple, set)):
+                sets.append(set().union(*(index.get(w, set()) for w in wanted)))
+            else:
+                sets.append(index.get(wanted, set()))
+        if not sets:
+            return list(self._by_id)
+        sets.sort(key=len)
+        return sorted(sets[0].intersection(*sets[1:]))  # ids are assigned in increasing order
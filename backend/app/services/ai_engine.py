@@ -3,7 +3,10 @@ AI Engine — Signal Generation & Portfolio Analysis
 Uses technical indicators (RSI, moving averages, momentum) to generate trading signals.
 """
 import numpy as np
-from typing import List, Dict, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from collections import defaultdict
+from typing import Callable, List, Dict, Optional
+from app.services.market_data import get_sector
 
 
 def compute_rsi(prices: List[float], period: int = 14) -> float:
@@ -52,27 +55,104 @@ def compute_volatility(prices: List[float], period: int = 20) -> float:
     return round(float(np.std(returns) * np.sqrt(252) * 100), 2)
 
 
-def generate_signal(prices: List[float]) -> Dict:
+def compute_zscore(prices: List[float], period: int = 20) -> float:
+    """Distance of the last price from its N-period mean, in standard deviations."""
+    if len(prices) < period:
+        return 0.0
+    window = np.asarray(prices[-period:], dtype=float)
+    std = window.std()
+    if std == 0:
+        return 0.0
+    return round(float((window[-1] - window.mean()) / std), 2)
+
+
+def compute_channel(prices: List[float], period: int = 20) -> tuple:
+    """Highest high / lowest low of the N periods before the last price (Donchian channel)."""
+    if len(prices) < period + 1:
+        return (None, None)
+    window = np.asarray(prices[-period - 1:-1], dtype=float)
+    return (round(float(window.max()), 2), round(float(window.min()), 2))
+
+
+def compute_indicators(prices: List[float]) -> Dict:
     """
-    Generate a comprehensive trading signal from price history.
-    Returns signal, confidence, and all indicators.
+    Compute the full indicator set for one price series (a list or a NumPy array, e.g. candle closes).
+    Used as the shared per-symbol state that strategy plugins read from.
     """
-    if len(prices) < 30:
-        return {
-            "signal": "HOLD",
-            "confidence": 0,
-            "reason": "Insufficient data",
-            "indicators": {},
-        }
+    channel_high, channel_low = compute_channel(prices)
+    return {
+        "length": len(prices),
+        "currentPrice": prices[-1] if len(prices) else None,
+        "rsi": compute_rsi(prices),
+        "sma20": compute_sma(prices, 20),
+        "sma50": compute_sma(prices, 50),
+        "ema12": compute_ema(prices, 12),
+        "momentum": compute_momentum(prices),
+        "momentumShort": compute_momentum(prices, 3),
+        "volatility": compute_volatility(prices),
+        "zscore": compute_zscore(prices),
+        "channelHigh": channel_high,
+        "channelLow": channel_low,
+    }
 
-    rsi = compute_rsi(prices)
-    sma_20 = compute_sma(prices, 20)
-    sma_50 = compute_sma(prices, 50) or sma_20
-    ema_12 = compute_ema(prices, 12)
-    momentum = compute_momentum(prices)
-    volatility = compute_volatility(prices)
-    current_price = prices[-1]
 
+def compute_indicator_series(prices) -> Dict[str, np.ndarray]:
+    """
+    compute_indicators at every point of a series at once (row i sees prices[:i + 1]), for
+    backtests and bar arrays. Same periods and rounding; values it reports as None are NaN here.
+    """
+    p = np.asarray(prices, dtype=float)
+    n = len(p)
+
+    def tail(values: np.ndarray, start: int, fill: float) -> np.ndarray:
+        out = np.full(n, fill)
+        out[start:] = values
+        return out
+
+    def window(k: int) -> np.ndarray:  # row j covers prices[j:j + k], i.e. ends at i = j + k - 1
+        return sliding_window_view(p, k) if n >= k else np.empty((0, k))
+
+    def sma(k: int) -> np.ndarray:
+        return tail(np.round(window(k).mean(axis=1), 2), k - 1, np.nan)
+
+    def momentum(k: int) -> np.ndarray:
+        return tail(np.round((p[k:] - p[:-k]) / p[:-k] * 100, 2), k, 0.0)
+
+    deltas = sliding_window_view(np.diff(p), 14) if n > 14 else np.empty((0, 14))
+    gains = np.where(deltas > 0, deltas, 0).mean(axis=1)
+    losses = np.where(deltas < 0, -deltas, 0).mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(losses == 0, 100.0, np.round(100 - 100 / (1 + gains / losses), 2))
+
+    weights = np.exp(np.linspace(-1., 0., 12))
+    weights /= weights.sum()
+
+    w20 = window(20)
+    returns = np.diff(w20, axis=1) / w20[:, :-1]
+    std = w20.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zscore = np.where(std == 0, 0.0, np.round((w20[:, -1] - w20.mean(axis=1)) / std, 2))
+    channel = sliding_window_view(p[:-1], 20) if n > 20 else np.empty((0, 20))
+
+    return {
+        "length": np.arange(1, n + 1, dtype=float),
+        "currentPrice": p,
+        "rsi": tail(rsi, 14, 50.0),
+        "sma20": sma(20),
+        "sma50": sma(50),
+        "ema12": tail(np.round(window(12) @ weights, 2), 11, np.nan),
+        "momentum": momentum(10),
+        "momentumShort": momentum(3),
+        "volatility": tail(np.round(returns.std(axis=1) * np.sqrt(252) * 100, 2), 19, 0.0),
+        "zscore": tail(zscore, 19, 0.0),
+        "channelHigh": tail(np.round(channel.max(axis=1, initial=-np.inf), 2), 20, np.nan),
+        "channelLow": tail(np.round(channel.min(axis=1, initial=np.inf), 2), 20, np.nan),
+    }
+
+
+def score_indicators(rsi: float, sma_20: Optional[float], sma_50: Optional[float],
+                     momentum: float, current_price: float) -> tuple:
+    """Weighted multi-indicator score (roughly -2.5..+2.5) plus the reasons behind it."""
     # Scoring system: each indicator contributes a score from -1 to +1
     score = 0
     reasons = []
@@ -114,6 +194,32 @@ def generate_signal(prices: List[float]) -> Dict:
         score -= 0.5
         reasons.append(f"Strong downward momentum ({momentum}%)")
 
+    return score, reasons
+
+
+def generate_signal(prices: List[float]) -> Dict:
+    """
+    Generate a comprehensive trading signal from price history.
+    Returns signal, confidence, and all indicators.
+    """
+    if len(prices) < 30:
+        return {
+            "signal": "HOLD",
+            "confidence": 0,
+            "reason": "Insufficient data",
+            "indicators": {},
+        }
+
+    rsi = compute_rsi(prices)
+    sma_20 = compute_sma(prices, 20)
+    sma_50 = compute_sma(prices, 50) or sma_20
+    ema_12 = compute_ema(prices, 12)
+    momentum = compute_momentum(prices)
+    volatility = compute_volatility(prices)
+    current_price = prices[-1]
+
+    score, reasons = score_indicators(rsi, sma_20, sma_50, momentum, current_price)
+
     # Determine signal
     if score >= 1.0:
         signal = "STRONG_BUY"
@@ -145,54 +251,143 @@ def generate_signal(prices: List[float]) -> Dict:
     }
 
 
-def analyze_portfolio(holdings: List[Dict]) -> Dict:
-    """Analyze a portfolio and return rebalancing suggestions."""
-    total_value = sum(h.get("value", 0) for h in holdings)
-    if total_value == 0:
-        return {"suggestions": [], "riskScore": 0}
+class PortfolioAnalyzer:
+    """
+    Incrementally maintained portfolio allocation state.
+    `update()` adjusts the running total and sector totals in O(1); the analysis
+    (allocations + suggestions) is rebuilt only when something has changed since the last call.
+    """
 
-    allocations = []
-    suggestions = []
+    def __init__(self, holdings: Optional[List[Dict]] = None, risk_model: Optional[Callable] = None):
+        self.risk_model = risk_model  # (values, total) -> covariance risk dict or None
+        self._values: Dict[str, float] = {}
+        self._sector_totals: Dict[str, float] = defaultdict(float)
+        self._total = 0.0
+        self._cached: Optional[Dict] = None
+        for h in holdings or []:
+            self.update(h["name"], h.get("value", 0))
 
-    for h in holdings:
-        pct = (h["value"] / total_value) * 100
-        allocations.append({"asset": h["name"], "percentage": round(pct, 1)})
+    def update(self, name: str, value: float):
+        old = self._values.get(name, 0.0)
+        if value == old and name in self._values:
+            return
+        delta = value - old
+        self._total += delta
+        self._sector_totals[get_sector(name)] += delta
+        if value:
+            self._values[name] = value
+        else:
+            self._values.pop(name, None)
+        self._cached = None
 
-        # Flag over-concentration
-        if pct > 40:
-            suggestions.append({
-                "type": "REDUCE",
-                "asset": h["name"],
-                "message": f"{h['name']} represents {pct:.1f}% of portfolio — consider reducing to below 30% for better diversification.",
-                "priority": "high",
-            })
-        elif pct < 5 and h["name"] != "Cash":
+    def sync(self, values: Dict[str, float]):
+        """Apply a full {name: value} view, touching only entries that changed or disappeared."""
+        for name in [n for n in self._values if n not in values]:
+            self.update(name, 0.0)
+        for name, value in values.items():
+            self.update(name, value)
+
+    def get(self, name: str) -> float:
+        return self._values.get(name, 0.0)
+
+    def invalidate(self):
+        """Drop the cached analysis (e.g. the risk model's covariance moved)."""
+        self._cached = None
+
+    @property
+    def total(self) -> float:
+        return self._total
+
+    def sector_pct(self, sector: str) -> float:
+        return self._sector_totals.get(sector, 0.0) / self._total * 100 if self._total > 0 else 0.0
+
+    def holdings(self) -> List[Dict]:
+        return [
+            {"name": name, "value": round(value, 2), "sector": get_sector(name)}
+            for name, value in self._values.items()
+        ]
+
+    def copy(self) -> "PortfolioAnalyzer":
+        clone = PortfolioAnalyzer(risk_model=self.risk_model)
+        clone._values = dict(self._values)
+        clone._sector_totals = defaultdict(float, self._sector_totals)
+        clone._total = self._total
+        return clone
+
+    def analysis(self) -> Dict:
+        """Allocations, rebalancing suggestions and risk score (cached until the next change)."""
+        if self._cached is None:
+            self._cached = self._analyze()
+        return self._cached
+
+    def _analyze(self) -> Dict:
+        total_value = self._total
+        if total_value <= 0:
+            return {"suggestions": [], "riskScore": 0}
+
+        allocations = []
+        suggestions = []
+
+        for name, value in self._values.items():
+            pct = (value / total_value) * 100
+            allocations.append({"asset": name, "percentage": round(pct, 1)})
+
+            # Flag over-concentration
+            if pct > 40:
+                suggestions.append({
+                    "type": "REDUCE",
+                    "asset": name,
+                    "message": f"{name} represents {pct:.1f}% of portfolio — consider reducing to below 30% for better diversification.",
+                    "priority": "high",
+                })
+            elif pct < 5 and name != "Cash":
+                suggestions.append({
+                    "type": "INCREASE",
+                    "asset": name,
+                    "message": f"{name} is only {pct:.1f}% — consider increasing position if you're bullish.",
+                    "priority": "low",
+                })
+
+        # Check crypto vs stocks balance
+        crypto_pct = self.sector_pct("Crypto")
+        stock_pct = self.sector_pct("Stocks")
+
+        if crypto_pct > 60:
             suggestions.append({
-                "type": "INCREASE",
-                "asset": h["name"],
-                "message": f"{h['name']} is only {pct:.1f}% — consider increasing position if you're bullish.",
-                "priority": "low",
+                "type": "REBALANCE",
+                "asset": "Portfolio",
+                "message": f"Crypto exposure at {crypto_pct:.0f}% is high. Consider adding more stocks for stability.",
+                "priority": "medium",
             })
 
-    # Check crypto vs stocks balance
-    crypto_pct = sum(a["percentage"] for a in allocations if a["asset"] in ["BTC", "ETH", "SOL", "ADA", "XRP"])
-    stock_pct = sum(a["percentage"] for a in allocations if a["asset"] in ["AAPL", "NVDA", "MSFT", "TSLA", "META"])
+        risk = self.risk_model(self._values, total_value) if self.risk_model else None
+        if risk:
+            # Covariance-based: annualized volatility mapped onto 0-100 (80%+ vol scores 100)
+            risk_score = min(round(risk["annualizedVolatilityPct"] * 1.25, 0), 100)
+            top = risk["contributions"][0]
+            if len(risk["contributions"]) > 1 and top["contributionPct"] > 50:
+                suggestions.append({
+                    "type": "REDUCE",
+                    "asset": top["symbol"],
+                    "message": f"{top['symbol']} drives {top['contributionPct']:.0f}% of portfolio volatility with a {top['weightPct']:.0f}% weight — trimming it cuts risk the most.",
+                    "priority": "medium",
+                })
+        else:
+            # Not enough return history yet: higher crypto share = higher risk
+            risk_score = min(round(crypto_pct * 0.8 + 20, 0), 100)
 
-    if crypto_pct > 60:
-        suggestions.append({
-            "type": "REBALANCE",
-            "asset": "Portfolio",
-            "message": f"Crypto exposure at {crypto_pct:.0f}% is high. Consider adding more stocks for stability.",
-            "priority": "medium",
-        })
+        result = {
+            "allocations": allocations,
+            "suggestions": suggestions,
+            "riskScore": risk_score,
+            "cryptoExposure": round(crypto_pct, 1),
+            "stockExposure": round(stock_pct, 1),
+        }
+        if risk:
+            result["volatility"] = risk
+        return result
 
-    # Simple risk score (higher crypto = higher risk)
-    risk_score = min(round(crypto_pct * 0.8 + 20, 0), 100)
 
-    return {
-        "allocations": allocations,
-        "suggestions": suggestions,
-        "riskScore": risk_score,
-        "cryptoExposure": round(crypto_pct, 1),
-        "stockExposure": round(stock_pct, 1),
-    }
+def analyze_portfolio(holdings: List[Dict]) -> Dict:
+    """Analyze a portfolio and return rebalancing suggestions."""
+    return PortfolioAnalyzer(holdings).analysis()
@@ -0,0 +1,265 @@
+"""
+Alerts — Price and indicator threshold rules evaluated once per market refresh.
+Rules sit in sorted threshold indexes per (symbol, field, direction). A refresh that moves a
+field from `old` to `new` bisects the matching index for the thresholds between the two
+values, so the work is O(log rules + fired) per watched field however many rules exist.
+Fired alerts go into a numbered event log that clients poll or stream with `since`. Rule changes
+only mark the rule set dirty; the simulator writes it out with its periodic save (flush()).
+"""
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from app.services import shared_state
+from app.services.log import get_logger
+from app.services.market_data import CRYPTO_IDS, STOCK_SYMBOLS
+from app.services.persistence import save_alerts, load_alerts
+
+FIELDS = ("price", "rsi", "sma20", "sma50", "ema12", "momentum", "momentumShort",
+          "volatility", "zscore", "channelHigh", "channelLow")  # "price" or a compute_indicators key
+CONDITIONS = ("above", "below", "cross")  # cross fires in either direction
+MAX_RULES = 100_000
+MAX_EVENTS = 1_000  # fired alerts kept for polling / streaming
+
+log = get_logger("alerts")
+
+
+class ThresholdIndex:
+    """Rule ids sorted by threshold (parallel lists, so bisect works on the thresholds directly)."""
+    __slots__ = ("thresholds", "ids")
+
+    def __init__(self):
+        self.thresholds: List[float] = []
+        self.ids: List[int] = []
+
+    def add(self, threshold: float, rule_id: int):
+        i = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.ids.insert(i, rule_id)
+
+    def remove(self, threshold: float, rule_id: int):
+        i = bisect_left(self.thresholds, threshold)
+        i = self.ids.index(rule_id, i, bisect_right(self.thresholds, threshold))
+        del self.thresholds[i], self.ids[i]
+
+    def rising(self, old: float, new: float) -> List[int]:
+        """Rules with old < threshold <= new."""
+        return self.ids[bisect_right(self.thresholds, old):bisect_right(self.thresholds, new)]
+
+    def falling(self, old: float, new: float) -> List[int]:
+        """Rules with new <= threshold < old."""
+        return self.ids[bisect_left(self.thresholds, new):bisect_left(self.thresholds, old)]
+
+
+class AlertEngine:
+    def __init__(self):
+        self.rules: Dict[int, dict] = {}
+        self.next_id = 1
+        self._index: Dict[Tuple[str, str, str], ThresholdIndex] = {}  # (symbol, field, "up"/"down")
+        self._watched: Dict[str, Dict[str, int]] = {}  # symbol -> {field: active rules}
+        self._last: Dict[Tuple[str, str], float] = {}  # value each watched field had at the last refresh
+        self.events: Deque[dict] = deque(maxlen=MAX_EVENTS)
+        self.seq = 0  # number of the last fired event
+        self._lock = threading.Lock()
+        self._export: Optional[dict] = None  # cached snapshot, rebuilt after the next change
+        self.version = 0  # bumped on every change, so unchanged alerts aren't republished
+        self._dirty = False  # rules changed since they were last written to disk
+
+    # ── Rules ───────────────────────────────────────────────
+    def _directions(self, rule: dict) -> List[str]:
+        return {"above": ["up"], "below": ["down"], "cross": ["up", "down"]}[rule["condition"]]
+
+    def _arm(self, rule: dict):
+        key = (rule["symbol"], rule["field"])
+        for direction in self._directions(rule):
+            self._index.setdefault((*key, direction), ThresholdIndex()).add(rule["threshold"], rule["id"])
+        fields = self._watched.setdefault(rule["symbol"], {})
+        fields[rule["field"]] = fields.get(rule["field"], 0) + 1
+
+    def _disarm(self, rule: dict):
+        key = (rule["symbol"], rule["field"])
+        for direction in self._directions(rule):
+            self._index[(*key, direction)].remove(rule["threshold"], rule["id"])
+        fields = self._watched[rule["symbol"]]
+        fields[rule["field"]] -= 1
+        if not fields[rule["field"]]:
+            del fields[rule["field"]]
+            self._last.pop(key, None)
+            if not fields:
+                del self._watched[rule["symbol"]]
+
+    def create(self, specs: List[dict]) -> List[dict]:
+        """
+        Validate and register rules ({symbol, field, condition, threshold, once, note}).
+        Nothing is added if any spec is invalid.
+        """
+        tracked = set(CRYPTO_IDS.values()) | set(STOCK_SYMBOLS)
+        with self._lock:
+            if len(self.rules) + len(specs) > MAX_RULES:
+                raise ValueError(f"At most {MAX_RULES} alert rules")
+            now = time.time()
+            rules = []
+            for i, spec in enumerate(specs):
+                symbol = spec["symbol"].upper()
+                if symbol not in tracked:
+                    raise ValueError(f"Rule {i}: unknown symbol '{spec['symbol']}'")
+                if spec.get("field", "price") not in FIELDS:
+                    raise ValueError(f"Rule {i}: field must be one of {', '.join(FIELDS)}")
+                if spec.get("condition", "cross") not in CONDITIONS:
+                    raise ValueError(f"Rule {i}: condition must be one of {', '.join(CONDITIONS)}")
+                if not math.isfinite(spec["threshold"]):
+                    raise ValueError(f"Rule {i}: threshold must be a finite number")
+                rules.append({
+                    "id": self.next_id + i,
+                    "symbol": symbol,
+                    "field": spec.get("field", "price"),
+                    "condition": spec.get("condition", "cross"),
+                    "threshold": float(spec["threshold"]),
+                    "once": bool(spec.get("once", False)),
+                    "note": spec.get("note"),
+                    "status": "active",
+                    "createdAt": now,
+                    "fired": 0,
+                    "lastFiredAt": None,
+                })
+            for rule in rules:
+                self.rules[rule["id"]] = rule
+                self._arm(rule)
+            self.next_id += len(rules)
+            self._changed(persist=True)
+        return rules
+
+    def delete(self, rule_id: int) -> Optional[dict]:
+        with self._lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is None:
+                return None
+            if rule["status"] == "active":
+                self._disarm(rule)
+            self._changed(persist=True)
+        return rule
+
+    def query(self, symbol: Optional[str] = None, status: Optional[str] = None) -> List[dict]:
+        return [
+            r for r in self.rules.values()
+            if (symbol is None or r["symbol"] == symbol.upper()) and (status is None or r["status"] == status)
+        ]
+
+    def watched_fields(self, symbol: str) -> Set[str]:
+        """Fields of `symbol` that active rules watch."""
+        return set(self._watched.get(symbol, ()))
+
+    # ── Evaluation ──────────────────────────────────────────
+    def evaluate(self, prices: Dict[str, float], indicators: Dict[str, dict], ts: Optional[float] = None) -> List[dict]:
+        """
+        Fold one market refresh in: for every watched field, fire the rules whose thresholds lie
+        between the previous and the current value. The first value a field is seen with only arms it.
+        """
+        ts = ts or time.time()
+        fired: List[dict] = []
+        with self._lock:
+            for symbol, fields in list(self._watched.items()):
+                for field in list(fields):
+                    value = (prices.get(symbol) or None) if field == "price" else indicators.get(symbol, {}).get(field)
+                    if value is None:
+                        continue
+                    old = self._last.get((symbol, field))
+                    self._last[(symbol, field)] = value
+                    if old is None or value == old:
+                        continue
+                    if value > old:
+                        index = self._index.get((symbol, field, "up"))
+                        hits = index.rising(old, value) if index else []
+                    else:
+                        index = self._index.get((symbol, field, "down"))
+                        hits = index.falling(old, value) if index else []
+                    for rule_id in hits:
+                        fired.append(self._fire(self.rules[rule_id], old, value, ts))
+            if fired:
+                triggered = [e for e in fired if self.rules[e["ruleId"]]["status"] == "triggered"]
+                for event in triggered:
+                    self._disarm(self.rules[event["ruleId"]])
+                self._changed(persist=True)  # fire counts and timestamps are saved for repeating rules too
+        if fired:
+            log.info("Fired %d alert(s)", len(fired), extra={"fired": len(fired)})
+        return fired
+
+    def _fire(self, rule: dict, old: float, new: float, ts: float) -> dict:
+        self.seq += 1
+        rule["fired"] += 1
+        rule["lastFiredAt"] = ts
+        if rule["once"]:
+            rule["status"] = "triggered"
+        event = {
+            "seq": self.seq,
+            "ruleId": rule["id"],
+            "symbol": rule["symbol"],
+            "field": rule["field"],
+            "direction": "above" if new > old else "below",
+            "threshold": rule["threshold"],
+            "previous": old,
+            "value": new,
+            "note": rule["note"],
+            "timestamp": ts,
+        }
+        self.events.append(event)
+        return event
+
+    def events_since(self, since: int = 0, limit: int = 100) -> List[dict]:
+        """Fired alerts with seq > `since`, oldest first (events older than MAX_EVENTS are gone)."""
+        events = self.events
+        skip = max(len(events) - (self.seq - since), 0)  # seqs are consecutive, so no scan is needed
+        return [events[i] for i in range(skip, min(skip + limit, len(events)))]
+
+    # ── State ───────────────────────────────────────────────
+    def _changed(self, persist: bool = False):
+        self._export = None
+        self.version += 1
+        self._dirty = self._dirty or persist
+
+    def flush(self):
+        """Write the rules to disk if they changed since the last flush."""
+        with self._lock:
+            if not self._dirty:
+                return
+            state = {"rules": [dict(r) for r in self.rules.values()], "nextId": self.next_id}
+            self._dirty = False
+        save_alerts(state)
+
+    def load_rules(self, state: dict):
+        self.rules = {r["id"]: r for r in state.get("rules", [])}
+        self.next_id = state.get("nextId", max(self.rules, default=0) + 1)
+        self._index.clear()
+        self._watched.clear()
+        for rule in self.rules.values():
+            if rule["status"] == "active":
+                self._arm(rule)
+
+    def to_dict(self) -> dict:
+        if self._export is None:
+            self._export = {
+                "rules": list(self.rules.values()),
+                "nextId": self.next_id,
+                "events": list(self.events),
+                "seq": self.seq,
+            }
+        return self._export
+
+    def load(self, state: dict):
+        """Reader workers: install the writer's rules and event log."""
+        self.load_rules(state)
+        self.events = deque(state["events"], maxlen=MAX_EVENTS)
+        self.seq = state["seq"]
+        self._export = None
+
+
+_engine = AlertEngine()
+_engine.load_rules(load_alerts())
+shared_state.register("alerts", _engine.to_dict, _engine.load, version=lambda: _engine.version)
+
+
+def get_alert_engine() -> AlertEngine:
+    return _engine
@@ -0,0 +1,167 @@
+"""
+Candles — Streaming OHLCV bars built from polled quotes.
+Every market refresh folds each symbol's quote into its open bar at each interval (1m, 5m, 1h, 1d).
+An open bar is six numbers however many quotes it absorbs; when a quote lands in a later bucket
+the open bar is closed into a fixed-size NumPy ring per (symbol, interval), so closed history is
+bounded and comes back as contiguous arrays that ai_engine.compute_indicator_series runs on directly.
+Buckets without a quote produce no bar. Historical bars from another source (e.g. daily stock
+history) can be seeded behind the live ones.
+
+Quotes carry a cumulative volume counter (day volume for stocks, rolling 24h for crypto), so a
+bar's volume is the sum of the counter's increases while it was open: exact for day volume,
+an approximation for the rolling 24h figure.
+"""
+import base64
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services import shared_state
+
+INTERVALS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+RING_SIZE = {"1m": 720, "5m": 576, "1h": 720, "1d": 365}  # closed bars kept: 12h, 2d, 30d, 1y
+FIELDS = ("time", "open", "high", "low", "close", "volume")  # time = bucket start, epoch seconds
+
+
+class CandleSeries:
+    """Bars for one symbol at one interval: the open bar plus a ring of closed bars."""
+    __slots__ = ("seconds", "ring", "head", "count", "open", "_encoded")
+
+    def __init__(self, seconds: int, capacity: int):
+        self.seconds = seconds
+        self.ring = np.zeros((capacity, len(FIELDS)))
+        self.head = 0  # next slot to write
+        self.count = 0
+        self.open: Optional[List[float]] = None
+        self._encoded: Optional[str] = None  # base64 of the closed bars, until the next bar closes
+
+    def update(self, ts: float, price: float, volume: float):
+        start = ts - ts % self.seconds
+        bar = self.open
+        if bar is not None and start > bar[0]:
+            self.ring[self.head] = bar
+            self.head = (self.head + 1) % len(self.ring)
+            self.count = min(self.count + 1, len(self.ring))
+            self._encoded = None
+            bar = self.open = None
+        if bar is None:
+            self.open = [start, price, price, price, price, volume]
+        elif start == bar[0]:  # a stale quote from an earlier bucket is dropped
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += volume
+
+    def closed(self, limit: Optional[int] = None) -> np.ndarray:
+        """The last `limit` closed bars, oldest first, as an (n, 6) array."""
+        n = self.count if limit is None else min(limit, self.count)
+        idx = (self.head - n + np.arange(n)) % len(self.ring)
+        return self.ring[idx]
+
+    def to_dict(self) -> dict:
+        if self._encoded is None:
+            self._encoded = base64.b64encode(self.closed().tobytes()).decode()
+        return {"ring": self._encoded, "open": self.open}
+
+    def _fill(self, bars: np.ndarray):
+        """Replace the closed bars with `bars` (oldest first), keeping the newest that fit."""
+        bars = bars[-len(self.ring):]
+        self.ring[:len(bars)] = bars
+        self.count = len(bars)
+        self.head = self.count % len(self.ring)
+        self._encoded = None
+
+    def prepend(self, bars: np.ndarray):
+        """Insert historical closed bars (oldest first) that are older than every bar held."""
+        closed = self.closed()
+        first = closed[0, 0] if len(closed) else self.open[0] if self.open is not None else np.inf
+        self._fill(np.concatenate([bars[bars[:, 0] < first], closed]))
+
+    def load(self, state: dict):
+        self._fill(np.frombuffer(base64.b64decode(state["ring"])).reshape(-1, len(FIELDS)))
+        self.open = state["open"]
+
+
+class CandleBuilder:
+    def __init__(self):
+        self._series: Dict[str, Dict[str, CandleSeries]] = {}
+        self._last_volume: Dict[str, float] = {}
+        self._export: Optional[dict] = None  # cached snapshot, rebuilt after the next update
+        self.version = 0  # bumped on every update, so unchanged candles aren't republished
+
+    def _for(self, symbol: str) -> Dict[str, CandleSeries]:
+        series = self._series.get(symbol)
+        if series is None:
+            series = self._series[symbol] = {
+                name: CandleSeries(seconds, RING_SIZE[name]) for name, seconds in INTERVALS.items()
+            }
+        return series
+
+    def update(self, quotes: List[dict], ts: float):
+        """Fold one refresh of quotes ({symbol, price, volume}) taken at `ts` into every interval."""
+        for quote in quotes:
+            symbol, price = quote.get("symbol"), quote.get("price")
+            if not symbol or not price or price <= 0:
+                continue
+            volume = float(quote.get("volume") or 0)
+            last = self._last_volume.get(symbol)
+            self._last_volume[symbol] = volume
+            traded = volume - last if last is not None and volume > last else 0.0  # counter resets count as 0
+            for series in self._for(symbol).values():
+                series.update(ts, price, traded)
+        self._export = None
+        self.version += 1
+
+    def seed(self, symbol: str, interval: str, bars: np.ndarray):
+        """Backfill one series with historical closed bars, an (n, 6) array in FIELDS order."""
+        if len(bars):
+            self._for(symbol)[interval].prepend(bars)
+            self._export = None
+            self.version += 1
+
+    def symbols(self) -> List[str]:
+        return list(self._series)
+
+    def arrays(self, symbol: str, interval: str, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Closed bars as column arrays ({"time", "open", ..., "volume"}), oldest first."""
+        series = self._series.get(symbol, {}).get(interval)
+        bars = series.closed(limit) if series else np.empty((0, len(FIELDS)))
+        return {field: bars[:, i] for i, field in enumerate(FIELDS)}
+
+    def candles(self, symbol: str, interval: str, limit: int = 200, include_open: bool = True) -> List[dict]:
+        series = self._series.get(symbol, {}).get(interval)
+        if series is None:
+            return []
+        rows = [{**dict(zip(FIELDS, bar)), "closed": True} for bar in series.closed(limit).tolist()]
+        if include_open and series.open is not None:
+            rows.append({**dict(zip(FIELDS, series.open)), "closed": False})
+            rows = rows[-limit:]
+        for row in rows:
+            row["time"] = int(row["time"])
+        return rows
+
+    def to_dict(self) -> dict:
+        if self._export is None:
+            self._export = {
+                "series": {sym: {name: s.to_dict() for name, s in by_interval.items()}
+                           for sym, by_interval in self._series.items()},
+                "lastVolume": dict(self._last_volume),
+            }
+        return self._export
+
+    def load(self, state: dict):
+        for symbol, by_interval in state["series"].items():
+            series = self._for(symbol)
+            for name, s in by_interval.items():
+                if name in series:
+                    series[name].load(s)
+        self._last_volume = dict(state["lastVolume"])
+        self._export = None
+
+
+_builder = CandleBuilder()
+shared_state.register("candles", _builder.to_dict, _builder.load, version=lambda: _builder.version)
+
+
+def get_candle_builder() -> CandleBuilder:
+    return _builder
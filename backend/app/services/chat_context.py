@@ -0,0 +1,87 @@
+"""
+Chat Context — Per-tick snapshot of agent state for the AI chat.
+Built once by the simulator after each tick so chat handlers read precomputed
+summaries instead of walking every wallet and trade history per request.
+"""
+import time
+from typing import Dict, List
+
+from app.services.leaderboard import Leaderboard
+
+
+def _summarize_agent(agent_id: int, name: str, w: dict) -> dict:
+    trades = w.get("trades_count", 0)
+    wins = w.get("wins", 0)
+    positions = []
+    for sym, pos in w.get("positions", {}).items():
+        unrealized = round((pos["currentPrice"] - pos["avgEntry"]) * pos["qty"], 2)
+        positions.append(f"{sym} ({'+' if unrealized >= 0 else ''}{unrealized:.2f})")
+
+    return {
+        "id": agent_id,
+        "name": name,
+        "strategy": w.get("strategy", "Unknown"),
+        "totalValue": round(w.get("total_value", 0), 2),
+        "pnl": round(w.get("pnl", 0), 2),
+        "pnlPct": w.get("pnl_pct", 0),
+        "trades": trades,
+        "winRate": round((wins / max(trades, 1)) * 100, 1),
+        "wins": wins,
+        "losses": w.get("losses", 0),
+        "positions": ", ".join(positions) if positions else "No open positions",
+        "positionsList": list(w.get("positions", {}).keys()),
+    }
+
+
+def _format_trade(t: dict, names: Dict[int, str]) -> dict:
+    return {
+        "agent": names.get(t["agentId"], f"Agent #{t['agentId']}"),
+        "action": t["action"],
+        "symbol": t["symbol"],
+        "qty": round(t["qty"], 4),
+        "price": t["price"],
+        "value": t["value"],
+        "pnl": t.get("pnl"),
+        "timestamp": t["timestamp"],
+    }
+
+
+def build_snapshot(wallets: Dict[int, dict], recent_trades: List[dict], agents: List[dict],
+                   leaderboard: Leaderboard) -> dict:
+    """
+    One pass over all wallets producing everything the chat handlers need:
+    agent summaries keyed by name, holders per symbol, aggregated holdings and totals.
+    Best/worst agents come from the already-synced leaderboard.
+    """
+    names = {a["id"]: a["name"] for a in agents}
+    summaries = {}
+    holders: Dict[str, List[str]] = {}
+    holdings: Dict[str, float] = {}
+    total_cash = total_pnl = total_initial = 0.0
+
+    for agent_id, w in wallets.items():
+        name = names.get(agent_id, f"Agent #{agent_id}")
+        summaries[agent_id] = _summarize_agent(agent_id, name, w)
+        total_cash += w.get("cash", 0)
+        total_pnl += w.get("pnl", 0)
+        total_initial += w.get("initial_capital", 0)
+        for sym, pos in w.get("positions", {}).items():
+            holdings[sym] = holdings.get(sym, 0) + pos.get("qty", 0) * pos.get("currentPrice", 0)
+            holders.setdefault(sym, []).append(name)
+
+    portfolio = [{"name": sym, "value": round(val, 2)} for sym, val in holdings.items()]
+    portfolio.append({"name": "Cash", "value": round(total_cash, 2)})
+
+    return {
+        "builtAt": time.time(),
+        "agents": list(summaries.values()),
+        "byName": {s["name"]: s for s in summaries.values()},
+        "best": summaries.get(leaderboard.best("pnl")),
+        "worst": summaries.get(leaderboard.worst("pnl")),
+        "holders": holders,
+        "holdings": portfolio,
+        "totalValue": round(sum(s["totalValue"] for s in summaries.values()), 2),
+        "totalPnl": round(total_pnl, 2),
+        "totalInitial": round(total_initial, 2),
+        "recentTrades": [_format_trade(t, names) for t in recent_trades],
+    }
@@ -0,0 +1,167 @@
+"""
+Covariance Engine — Rolling EWMA covariance / correlation of log returns across every tracked symbol.
+Each market refresh folds one return vector into the matrix (RiskMetrics-style zero-mean EWMA),
+so an update costs O(symbols²) no matter how much history has been seen. On top of it:
+portfolio volatility and each holding's marginal / component contribution to that volatility.
+"""
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.market_data import POLL_INTERVAL
+
+EWMA_LAMBDA = 0.97  # decay per refresh (half-life ≈ 23 refreshes)
+MIN_UPDATES = 10  # returns a symbol needs before its risk numbers are reported
+PERIODS_PER_YEAR = 365 * 24 * 3600 / POLL_INTERVAL  # refreshes per year, for annualizing
+
+
+class CovarianceEngine:
+    def __init__(self, decay: float = EWMA_LAMBDA, min_updates: int = MIN_UPDATES):
+        self.decay = decay
+        self.min_updates = min_updates
+        self.symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._last = np.empty(0)  # last seen price per symbol (nan until first seen)
+        self._cov = np.zeros((0, 0))
+        self._counts = np.zeros(0, dtype=int)  # returns folded in per symbol
+        self.updates = 0
+        self._listeners: List[Callable[[], None]] = []
+
+    def on_update(self, callback: Callable[[], None]):
+        """Called after every update (e.g. to invalidate analyses derived from the matrix)."""
+        self._listeners.append(callback)
+
+    def _grow(self, new_symbols: List[str]):
+        k, extra = len(self.symbols), len(new_symbols)
+        for s in new_symbols:
+            self._index[s] = len(self.symbols)
+            self.symbols.append(s)
+        cov = np.zeros((k + extra, k + extra))
+        cov[:k, :k] = self._cov
+        self._cov = cov
+        self._last = np.concatenate([self._last, np.full(extra, np.nan)])
+        self._counts = np.concatenate([self._counts, np.zeros(extra, dtype=int)])
+
+    def update(self, prices: Dict[str, float]):
+        """Fold one refresh of {symbol: price} in. Symbols missing this refresh are left untouched."""
+        new = [s for s, p in prices.items() if p and p > 0 and s not in self._index]
+        if new:
+            self._grow(new)
+        current = np.full(len(self.symbols), np.nan)
+        for s, p in prices.items():
+            if p and p > 0:
+                current[self._index[s]] = p
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = np.log(current / self._last)
+        idx = np.flatnonzero(np.isfinite(returns))
+        if idx.size == len(self.symbols):
+            # Common case: every symbol refreshed, so update the whole matrix in place
+            self._cov *= self.decay
+            self._cov += (1 - self.decay) * np.outer(returns, returns)
+            self._counts += 1
+        elif idx.size:
+            r = returns[idx]
+            block = np.ix_(idx, idx)
+            self._cov[block] = self.decay * self._cov[block] + (1 - self.decay) * np.outer(r, r)
+            self._counts[idx] += 1
+        self._last = np.where(np.isfinite(current), current, self._last)
+        self.updates += 1
+        for callback in self._listeners:
+            callback()
+
+    def _ready(self, symbols: Optional[List[str]] = None) -> np.ndarray:
+        """Indices of (requested) symbols with enough returns to trust."""
+        idx = np.flatnonzero(self._counts >= self.min_updates)
+        if symbols is not None:
+            wanted = {self._index[s] for s in symbols if s in self._index}
+            idx = np.array([i for i in idx if i in wanted], dtype=int)
+        return idx
+
+    def covariance(self, idx: np.ndarray) -> np.ndarray:
+        """Bias-corrected EWMA covariance for the given indices (early estimates start from zero)."""
+        counts = np.minimum.outer(self._counts[idx], self._counts[idx])
+        return self._cov[np.ix_(idx, idx)] / (1 - self.decay ** counts)
+
+    def matrix(self, symbols: List[str]) -> Tuple[List[str], np.ndarray]:
+        """(ready symbols, their per-refresh covariance) out of `symbols`."""
+        idx = self._ready(symbols)
+        return [self.symbols[i] for i in idx], self.covariance(idx)
+
+    def correlations(self, symbols: Optional[List[str]] = None) -> dict:
+        idx = self._ready(symbols)
+        cov = self.covariance(idx)
+        vol = np.sqrt(np.diag(cov))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(vol, vol)
+        corr = np.nan_to_num(corr)
+        np.fill_diagonal(corr, 1.0)
+        names = [self.symbols[i] for i in idx]
+        return {
+            "symbols": names,
+            "correlation": np.round(corr, 4).tolist(),
+            "volatilityPct": {s: round(float(v) * 100, 4) for s, v in zip(names, vol)},
+            "annualizedVolatilityPct": {
+                s: round(float(v) * math.sqrt(PERIODS_PER_YEAR) * 100, 2) for s, v in zip(names, vol)
+            },
+            "updates": self.updates,
+            "halfLife": round(math.log(0.5) / math.log(self.decay), 1),
+        }
+
+    def portfolio_risk(self, values: Dict[str, float], total: float) -> Optional[dict]:
+        """
+        Volatility of a portfolio of {symbol: value} out of `total` equity (cash has zero variance),
+        with each holding's marginal contribution dσ/dw and its share of σ (shares sum to 100%).
+        """
+        held = [s for s, v in values.items() if v and s in self._index]
+        idx = self._ready(held)
+        if total <= 0 or idx.size == 0:
+            return None
+        names = [self.symbols[i] for i in idx]
+        w = np.array([values[s] / total for s in names])
+        cov = self.covariance(idx)
+        sigma_w = cov @ w
+        sigma = math.sqrt(max(float(w @ sigma_w), 0.0))
+        if sigma == 0:
+            return None
+        marginal = sigma_w / sigma
+        component = w * marginal
+        contributions = sorted(
+            (
+                {
+                    "symbol": s,
+                    "weightPct": round(float(w[i]) * 100, 2),
+                    "marginalPct": round(float(marginal[i]) * 100, 4),
+                    "contributionPct": round(float(component[i] / sigma) * 100, 2),
+                }
+                for i, s in enumerate(names)
+            ),
+            key=lambda c: c["contributionPct"],
+            reverse=True,
+        )
+        return {
+            "volatilityPct": round(sigma * 100, 4),
+            "annualizedVolatilityPct": round(sigma * math.sqrt(PERIODS_PER_YEAR) * 100, 2),
+            "contributions": contributions,
+            "untracked": [s for s in values if s not in names and s != "Cash"],
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "symbols": self.symbols,
+            "last": self._last.tolist(),
+            "cov": self._cov.tolist(),
+            "counts": self._counts.tolist(),
+            "updates": self.updates,
+        }
+
+    def load(self, state: dict):
+        self.symbols = list(state["symbols"])
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        self._last = np.array(state["last"], dtype=float).reshape(len(self.symbols))
+        self._cov = np.array(state["cov"], dtype=float).reshape(len(self.symbols), len(self.symbols))
+        self._counts = np.array(state["counts"], dtype=int).reshape(len(self.symbols))
+        self.updates = state["updates"]
+        for callback in self._listeners:
+            callback()
@@ -0,0 +1,68 @@
+"""
+Downsampling — Shape-preserving reduction of time series for charts.
+LTTB (Largest-Triangle-Three-Buckets) keeps the points that carry the most visual area, so
+spikes and turning points survive; min/max bucketing keeps each bucket's extremes. Both
+operate on NumPy arrays and always keep the first and last points.
+"""
+import numpy as np
+
+MONTHS = np.array(["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the `n_out` points LTTB selects from (x, y); x must be increasing."""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # Average of each bucket (and of the final point) is the third triangle vertex
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        cx, cy = avg_x[b + 1], avg_y[b + 1]
+        # Twice the triangle area for every candidate in the bucket at once
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of each bucket's min and max (in time order), about `n_out` points in total."""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 4:
+        return np.array([0, n - 1])
+    buckets = (n_out - 2) // 2
+    edges = np.linspace(1, n - 1, buckets + 1).astype(int)
+    width = int(np.max(np.diff(edges)))
+    # Pad buckets to equal width so argmin/argmax run over a 2-D view in one call
+    idx = edges[:-1, None] + np.arange(width)[None, :]
+    valid = idx < edges[1:, None]
+    idx = np.minimum(idx, n - 2)
+    vals = y[idx]
+    lo = idx[np.arange(buckets), np.argmin(np.where(valid, vals, np.inf), axis=1)]
+    hi = idx[np.arange(buckets), np.argmax(np.where(valid, vals, -np.inf), axis=1)]
+    return np.unique(np.concatenate(([0], lo, hi, [n - 1])))
+
+
+def format_dates(timestamps_ms: np.ndarray) -> np.ndarray:
+    """Vectorized "%b %d" labels (UTC) for millisecond epoch timestamps."""
+    days = timestamps_ms.astype("datetime64[ms]").astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+    day_of_month = (days - months).astype(int) + 1
+    labels = np.char.add(MONTHS[months.astype(int) % 12], " ")
+    return np.char.add(labels, np.char.zfill(day_of_month.astype(str), 2))
@@ -0,0 +1,90 @@
+"""
+Intent Router — Compiled keyword classifier + handler registry for the AI chat.
+All intent keywords and symbol aliases are folded into one vocabulary dict, so a message is
+classified by splitting it into words once and looking each word up, instead of one substring
+search per keyword. Matching is on whole words, and the cost doesn't grow with the keyword count.
+"""
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.services.market_data import CRYPTO_IDS
+
+Handler = Callable[[str, List[str]], Awaitable[dict]]
+
+# Ticker and CoinGecko id both resolve to the CoinGecko id: {"btc": "bitcoin", "bitcoin": "bitcoin", ...}
+SYMBOL_ALIASES: Dict[str, str] = {}
+for _cg_id, _sym in CRYPTO_IDS.items():
+    SYMBOL_ALIASES[_sym.lower()] = _cg_id
+    SYMBOL_ALIASES[_cg_id] = _cg_id
+
+_WORD = re.compile(r"\w+")
+
+
+class IntentRouter:
+    """
+    Register handlers with `@router.intent(name, keywords, priority)`. Keywords match whole
+    words only, so inflections are listed explicitly ("bot" doesn't match "bottom"); when several
+    intents match, the highest priority wins. `requires_symbol` intents only fire if a symbol is present.
+    """
+
+    def __init__(self):
+        self._intents: Dict[str, dict] = {}
+        self._vocab: Optional[Dict[str, Tuple[str, str]]] = None  # word -> ("intent", name) / ("sym", coin id)
+        self._fallback: Optional[Handler] = None
+
+    def intent(self, name: str, keywords: List[str], priority: int = 0, requires_symbol: bool = False):
+        def wrapper(handler: Handler) -> Handler:
+            self._intents[name] = {
+                "keywords": keywords,
+                "priority": priority,
+                "requires_symbol": requires_symbol,
+                "handler": handler,
+            }
+            self._vocab = None  # rebuilt lazily
+            return handler
+        return wrapper
+
+    def fallback(self, handler: Handler) -> Handler:
+        self._fallback = handler
+        return handler
+
+    def _build_vocab(self) -> Dict[str, Tuple[str, str]]:
+        vocab = {alias: ("sym", coin_id) for alias, coin_id in SYMBOL_ALIASES.items()}
+        for name, spec in self._intents.items():
+            vocab.update((k, ("intent", name)) for k in spec["keywords"])
+        return vocab
+
+    def classify(self, text: str) -> Tuple[Optional[str], List[str]]:
+        """Return (intent name or None, CoinGecko ids of symbols mentioned, in order)."""
+        if self._vocab is None:
+            self._vocab = self._build_vocab()
+        vocab = self._vocab
+        matched = set()
+        symbols: List[str] = []
+        for word in _WORD.findall(text.lower()):
+            hit = vocab.get(word)
+            if hit is None:
+                continue
+            kind, value = hit
+            if kind == "intent":
+                matched.add(value)
+            elif value not in symbols:
+                symbols.append(value)
+
+        best = None
+        for name in matched:
+            spec = self._intents[name]
+            if spec["requires_symbol"] and not symbols:
+                continue
+            if best is None or spec["priority"] > self._intents[best]["priority"]:
+                best = name
+        return best, symbols
+
+    async def handle(self, intent: Optional[str], text: str, symbols: List[str]) -> dict:
+        """Run the handler for an already-classified message."""
+        if intent is None:
+            return await self._fallback(text, symbols)
+        return await self._intents[intent]["handler"](text, symbols)
+
+    async def dispatch(self, text: str) -> dict:
+        intent, symbols = self.classify(text)
+        return await self.handle(intent, text, symbols)
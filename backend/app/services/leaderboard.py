@@ -0,0 +1,149 @@
+"""
+Leaderboard — Agents ranked by PnL, PnL %, win rate and Sharpe ratio, kept sorted across ticks.
+Each metric has its own RankIndex: (key, agent id) pairs in a list of sorted chunks with their
+maxima and chunk offsets, so best/worst, top-K pages and an agent's rank are bisections rather
+than a max()/sort over every agent. The simulator syncs it once per tick: changes are found by
+comparing metric tables, agents that moved on a metric are repositioned in that index alone, and
+a metric on which many agents moved is re-sorted in one NumPy pass instead.
+"""
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate, chain
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+METRICS = ("pnl", "pnlPct", "winRate", "sharpe")
+CHUNK = 512  # target chunk length; chunks split at twice this
+RESORT_FRACTION = 0.02  # re-sort (vectorized) instead of moving agents when more than this share changed
+
+Key = Tuple[float, int]  # (-value, agent id): ascending order is best first, ties by id
+
+
+class RankIndex:
+    """Sorted keys in chunks of ~CHUNK: insert/remove touch one chunk, positions come from chunk offsets."""
+
+    def __init__(self):
+        self._chunks: List[List[Key]] = []
+        self._maxes: List[Key] = []
+        self._offsets: Optional[List[int]] = None  # start position of each chunk, rebuilt lazily
+
+    def __len__(self) -> int:
+        return self._positions()[-1] if self._chunks else 0
+
+    def _positions(self) -> List[int]:
+        if self._offsets is None:
+            self._offsets = list(accumulate((len(c) for c in self._chunks), initial=0))
+        return self._offsets
+
+    def rebuild(self, keys: List[Key]):
+        """Replace the contents with `keys`, already in ascending order."""
+        self._chunks = [keys[i:i + CHUNK] for i in range(0, len(keys), CHUNK)]
+        self._maxes = [c[-1] for c in self._chunks]
+        self._offsets = None
+
+    def add(self, key: Key):
+        self._offsets = None
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._chunks):
+            i -= 1
+            self._chunks[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._chunks[i], key)
+        chunk = self._chunks[i]
+        if len(chunk) > 2 * CHUNK:
+            self._chunks[i:i + 1] = [chunk[:CHUNK], chunk[CHUNK:]]
+            self._maxes[i:i + 1] = [chunk[CHUNK - 1], chunk[-1]]
+
+    def remove(self, key: Key):
+        i = bisect_left(self._maxes, key)
+        chunk = self._chunks[i]
+        del chunk[bisect_left(chunk, key)]
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i], self._maxes[i]
+        self._offsets = None
+
+    def position(self, key: Key) -> int:
+        """0-based position of a key that is in the index."""
+        i = bisect_left(self._maxes, key)
+        return self._positions()[i] + bisect_left(self._chunks[i], key)
+
+    def slice(self, start: int, stop: int) -> List[Key]:
+        offsets = self._positions()
+        stop = min(stop, offsets[-1]) if self._chunks else 0
+        out: List[Key] = []
+        if start >= stop:
+            return out
+        i = bisect_right(offsets, start) - 1
+        j = start - offsets[i]
+        while len(out) < stop - start:
+            out.extend(self._chunks[i][j:j + stop - start - len(out)])
+            i, j = i + 1, 0
+        return out
+
+
+class Leaderboard:
+    def __init__(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._table = np.empty((0, len(METRICS)))  # one row per agent, columns in METRICS order
+        self._rows: Dict[int, int] = {}  # agent id -> row
+        self._indexes = {m: RankIndex() for m in METRICS}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def sync(self, values: Dict[int, Tuple[float, ...]]):
+        """Bring the board in line with this tick's {agent_id: metrics}; agents not given are dropped."""
+        ids = np.fromiter(values, dtype=np.int64, count=len(values))
+        table = np.fromiter(chain.from_iterable(values.values()), dtype=float,
+                            count=len(values) * len(METRICS)).reshape(len(values), len(METRICS))
+        same_agents = np.array_equal(ids, self._ids)
+        changed = table != self._table if same_agents else None
+        for k, index in enumerate(self._indexes.values()):
+            rows = np.flatnonzero(changed[:, k]) if same_agents else None
+            if rows is None or len(rows) > RESORT_FRACTION * len(ids):
+                order = np.lexsort((ids, -table[:, k]))
+                index.rebuild(list(zip((-table[order, k]).tolist(), ids[order].tolist())))
+                continue
+            # Few agents moved on this metric: reposition just those
+            for row, agent_id, old, new in zip(rows.tolist(), ids[rows].tolist(),
+                                               self._table[rows, k].tolist(), table[rows, k].tolist()):
+                index.remove((-old, agent_id))
+                index.add((-new, agent_id))
+        if not same_agents:
+            self._rows = {a: i for i, a in enumerate(ids.tolist())}
+        self._ids, self._table = ids, table
+
+    def _entry(self, agent_id: int, rank: int) -> dict:
+        return {"rank": rank, "id": agent_id, **dict(zip(METRICS, self._table[self._rows[agent_id]].tolist()))}
+
+    def top(self, by: str, n: int = 10, offset: int = 0, worst: bool = False) -> List[dict]:
+        """Ranks offset+1 .. offset+n by `by` (best first), or from the bottom with `worst`."""
+        index = self._indexes[by]
+        if worst:
+            total = len(index)
+            keys = index.slice(max(total - offset - n, 0), total - offset)[::-1]
+            return [self._entry(a, total - offset - i) for i, (_, a) in enumerate(keys)]
+        return [self._entry(a, offset + i + 1) for i, (_, a) in enumerate(index.slice(offset, offset + n))]
+
+    def rank(self, agent_id: int, by: str) -> Optional[dict]:
+        """The agent's 1-based rank by `by`, with its metrics, or None if it isn't on the board."""
+        row = self._rows.get(agent_id)
+        if row is None:
+            return None
+        position = self._indexes[by].position((-float(self._table[row, METRICS.index(by)]), agent_id))
+        return self._entry(agent_id, position + 1)
+
+    def best(self, by: str = "pnl") -> Optional[int]:
+        entries = self.top(by, 1)
+        return entries[0]["id"] if entries else None
+
+    def worst(self, by: str = "pnl") -> Optional[int]:
+        entries = self.top(by, 1, worst=True)
+        return entries[0]["id"] if entries else None
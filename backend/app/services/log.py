@@ -0,0 +1,141 @@
+"""
+Logging — Structured, non-blocking logging for the backend.
+Records go through a QueueHandler; formatting (JSON or text) and stdout writes happen on a
+QueueListener thread, so the event loop only pays for an enqueue. Repeated warnings/errors
+from the same call site are rate-limited, with the suppressed count attached to the next one.
+
+Configure with AGENTFI_LOG_LEVEL (default INFO), AGENTFI_LOG_FORMAT ("json" | "text")
+and AGENTFI_LOG_RATE_LIMIT (seconds between identical warnings, default 30).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+ROOT = "agentfi"
+DEFAULT_RATE_LIMIT = float(os.getenv("AGENTFI_LOG_RATE_LIMIT", "30"))
+
+# Attributes every LogRecord has; anything else came in through `extra=` and is emitted as a field
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime", "rate_key", "suppressed"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(component: str) -> logging.Logger:
+    """Per-component logger, e.g. get_logger("simulator") -> "agentfi.simulator"."""
+    return logging.getLogger(f"{ROOT}.{component}")
+
+
+def _component(record: logging.LogRecord) -> str:
+    return record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "component": _component(record),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        ts = datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+        line = f"{ts} {record.levelname:<7} [{_component(record)}] {record.getMessage()}"
+        if getattr(record, "suppressed", 0):
+            line += f" (+{record.suppressed} suppressed)"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets one WARNING+ record per call site through every `interval` seconds.
+    The site is (logger, unformatted message, `rate_key` extra), so pass e.g.
+    extra={"rate_key": agent_id} when distinct subjects should not share a budget.
+    """
+
+    def __init__(self, interval: float = DEFAULT_RATE_LIMIT):
+        super().__init__()
+        self.interval = interval
+        self._seen: Dict[Tuple, list] = {}  # key -> [last emitted at, suppressed since]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.interval <= 0:
+            return True
+        key = (record.name, record.msg, getattr(record, "rate_key", None))
+        now = time.monotonic()
+        seen = self._seen.get(key)
+        if seen and now - seen[0] < self.interval:
+            seen[1] += 1
+            return False
+        record.suppressed = seen[1] if seen else 0
+        self._seen[key] = [now, 0]
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Only resolve the message and traceback text here; formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    """Idempotent: attach the queue handler to the "agentfi" logger and start the writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+    level = (level or os.getenv("AGENTFI_LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("AGENTFI_LOG_FORMAT", "json")).lower()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(level)
+    root.addHandler(handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+    _listener = None
@@ -5,11 +5,29 @@ Uses free, no-API-key-required endpoints.
 import asyncio
 import httpx
 import time
+import numpy as np
 from typing import Dict, List, Optional
+from app.services.metrics import timer, FETCH_LATENCY, FETCH_ERRORS
+from app.services.downsample import lttb, minmax, format_dates
+from app.services.log import get_logger
+from app.services import shared_state
+from app.services.candles import get_candle_builder
+
+log = get_logger("market_data")
 
 # In-memory cache for market data
 _cache: Dict[str, dict] = {}
 _last_update: float = 0
+
+
+def _restore_cache(state: dict):
+    global _cache, _last_update
+    _cache, _last_update = state["cache"], state["lastUpdate"]
+
+
+shared_state.register("market", lambda: {"cache": _cache, "lastUpdate": _last_update}, _restore_cache,
+                      version=lambda: _last_update)
+
 POLL_INTERVAL = 30  # seconds
 
 
@@ -23,6 +41,17 @@ CRYPTO_IDS = {
 
 STOCK_SYMBOLS = ["AAPL", "NVDA", "MSFT", "TSLA", "META", "AMZN", "GOOGL"]
 
+# Symbol → sector metadata, used wherever holdings are grouped (portfolio analysis, exposure)
+SYMBOL_SECTORS: Dict[str, str] = {
+    **{symbol: "Crypto" for symbol in CRYPTO_IDS.values()},
+    **{symbol: "Stocks" for symbol in STOCK_SYMBOLS},
+    "Cash": "Cash",
+}
+
+
+def get_sector(symbol: str) -> str:
+    return SYMBOL_SECTORS.get(symbol, "Other")
+
 
 class MarketDataService:
     def __init__(self):
@@ -34,8 +63,8 @@ class MarketDataService:
         while self._running:
             try:
                 await self.refresh_all()
-            except Exception as e:
-                print(f"[MarketDataService] polling error: {e}")
+            except Exception:
+                log.exception("Market data polling failed")
             await asyncio.sleep(POLL_INTERVAL)
 
     # ── Crypto via CoinGecko (free, no key) ─────────────────────
@@ -46,10 +75,15 @@ class MarketDataService:
             f"?ids={ids}&vs_currencies=usd&include_24hr_change=true"
             f"&include_24hr_vol=true&include_market_cap=true"
         )
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
+        try:
+            with timer(FETCH_LATENCY, provider="coingecko", endpoint="prices"):
+                async with httpx.AsyncClient(timeout=15) as client:
+                    resp = await client.get(url)
+                    resp.raise_for_status()
+                    data = resp.json()
+        except Exception:
+            FETCH_ERRORS.inc(provider="coingecko", endpoint="prices")
+            raise
 
         results = []
         for cg_id, symbol in CRYPTO_IDS.items():
@@ -78,10 +112,11 @@ class MarketDataService:
         headers = {"User-Agent": "Mozilla/5.0"}
         results = []
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                resp = await client.get(url, headers=headers)
-                resp.raise_for_status()
-                data = resp.json()
+            with timer(FETCH_LATENCY, provider="yahoo", endpoint="quote"):
+                async with httpx.AsyncClient(timeout=15) as client:
+                    resp = await client.get(url, headers=headers)
+                    resp.raise_for_status()
+                    data = resp.json()
 
             quotes = data.get("quoteResponse", {}).get("result", [])
             for q in quotes:
@@ -96,7 +131,8 @@ class MarketDataService:
                 })
         except Exception as e:
             # Yahoo Finance free endpoint might be blocked; use fallback
-            print(f"[MarketDataService] Yahoo Finance error: {e}, using fallback")
+            FETCH_ERRORS.inc(provider="yahoo", endpoint="quote")
+            log.warning("Yahoo Finance error, using fallback prices: %s", e, extra={"provider": "yahoo"})
             results = self._stock_fallback()
         return results
 
@@ -127,21 +163,35 @@ class MarketDataService:
         return results
 
     # ── Crypto price history via CoinGecko ──────────────────────
-    async def fetch_crypto_history(self, coin_id: str = "bitcoin", days: int = 30) -> List[dict]:
+    async def fetch_crypto_history(self, coin_id: str = "bitcoin", days: int = 30,
+                                   points: Optional[int] = 60, method: str = "lttb") -> List[dict]:
+        """
+        Price history for charts. `points` downsamples with LTTB (or "minmax" bucketing) so
+        spikes survive; pass points=None for full resolution (what analysis should use).
+        """
         url = (
             f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
             f"?vs_currency=usd&days={days}"
         )
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-
-        prices = data.get("prices", [])
-        from datetime import datetime
+        try:
+            with timer(FETCH_LATENCY, provider="coingecko", endpoint="market_chart"):
+                async with httpx.AsyncClient(timeout=15) as client:
+                    resp = await client.get(url)
+                    resp.raise_for_status()
+                    data = resp.json()
+        except Exception:
+            FETCH_ERRORS.inc(provider="coingecko", endpoint="market_chart")
+            raise
+
+        raw = np.asarray(data.get("prices", []), dtype=float).reshape(-1, 2)
+        ts, price = raw[:, 0], raw[:, 1]
+        if points and len(ts) > points:
+            idx = minmax(price, points) if method == "minmax" else lttb(ts, price, points)
+            ts, price = ts[idx], price[idx]
+        dates = format_dates(ts)
         return [
-            {"timestamp": p[0], "date": datetime.fromtimestamp(p[0] / 1000).strftime("%b %d"), "price": round(p[1], 2)}
-            for p in prices[::max(1, len(prices) // 60)]  # downsample to ~60 points
+            {"timestamp": int(t), "date": d, "price": p}
+            for t, d, p in zip(ts.tolist(), dates.tolist(), np.round(price, 2).tolist())
         ]
 
     # ── Combined refresh ────────────────────────────────────────
@@ -153,7 +203,9 @@ class MarketDataService:
         _cache["stocks"] = stocks
         _cache["all"] = crypto + stocks
         _last_update = time.time()
-        print(f"[MarketDataService] refreshed {len(crypto)} crypto + {len(stocks)} stocks")
+        get_candle_builder().update(_cache["all"], _last_update)
+        log.info("Refreshed %d crypto + %d stocks", len(crypto), len(stocks),
+                 extra={"crypto": len(crypto), "stocks": len(stocks)})
 
     def get_all_prices(self) -> List[dict]:
         return _cache.get("all", [])
@@ -163,3 +215,6 @@ class MarketDataService:
 
     def get_stock_prices(self) -> List[dict]:
         return _cache.get("stocks", [])
+
+    def get_last_update(self) -> float:
+        return _last_update
@@ -0,0 +1,192 @@
+"""
+Metrics — Lightweight in-process instrumentation with Prometheus text exposition.
+Counters, gauges and histograms with labels; hot paths are wrapped in `timer()` which is a
+no-op when instrumentation is switched off at runtime (see set_enabled / AGENTFI_METRICS).
+"""
+import asyncio
+import functools
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = os.getenv("AGENTFI_METRICS", "1") != "0"
+_metrics: Dict[str, "_Metric"] = {}
+
+
+def set_enabled(enabled: bool):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _label_key(labels: dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: Tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Tuple, float] = {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if _enabled:
+            key = _label_key(labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if _enabled:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+        self._series: Dict[Tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        idx = bisect_left(self.buckets, value)
+        if idx < len(self.buckets):
+            series[idx] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(key, inf)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+def _register(metric: _Metric):
+    return _metrics.setdefault(metric.name, metric)
+
+
+def counter(name: str, help_text: str) -> Counter:
+    return _register(Counter(name, help_text))
+
+
+def gauge(name: str, help_text: str) -> Gauge:
+    return _register(Gauge(name, help_text))
+
+
+def histogram(name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help_text, buckets))
+
+
+# ── Application metrics ─────────────────────────────────────
+TICK_DURATION = histogram("agentfi_tick_duration_seconds", "Simulation tick duration")
+FETCH_LATENCY = histogram("agentfi_provider_fetch_seconds", "Market data provider fetch latency")
+FETCH_ERRORS = counter("agentfi_provider_fetch_errors_total", "Market data provider fetch errors")
+PERSIST_DURATION = histogram("agentfi_persist_duration_seconds", "Wallet/trade persistence duration")
+ROUTE_LATENCY = histogram("agentfi_http_request_seconds", "HTTP request latency by route")
+LOOP_LAG = histogram("agentfi_event_loop_lag_seconds", "Event loop scheduling lag",
+                     buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+AGENTS = gauge("agentfi_agents", "Agents by status")
+POSITIONS = gauge("agentfi_open_positions", "Open positions across all agents")
+CACHE_REQUESTS = counter("agentfi_cache_requests_total", "Cache lookups by cache and result")
+CACHE_HIT_RATIO = gauge("agentfi_cache_hit_ratio", "Cache hit ratio by cache")
+
+
+@contextmanager
+def timer(hist: Histogram, **labels):
+    """Time a block into `hist`; costs one flag check when instrumentation is disabled."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        hist.observe(time.perf_counter() - start, **labels)
+
+
+def timed(hist: Histogram, **labels):
+    """Decorator form of timer() for sync and async functions."""
+    def wrapper(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def inner(*args, **kwargs):
+                with timer(hist, **labels):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with timer(hist, **labels):
+                    return fn(*args, **kwargs)
+        return inner
+    return wrapper
+
+
+def record_cache(cache: str, hit: bool):
+    if not _enabled:
+        return
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.get(cache=cache, result="hit")
+    total = hits + CACHE_REQUESTS.get(cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(round(hits / total, 4), cache=cache)
+
+
+async def monitor_event_loop(interval: float = 0.5):
+    """Background task: how late the loop wakes us up is the scheduling lag."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(time.perf_counter() - start - interval, 0.0))
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,258 @@
+"""
+Order Book — Per-symbol simulated limit order books and a matching engine.
+Agent orders cross against each other first (price-time priority), and whatever is
+left is filled against modelled external liquidity with per-symbol fees and slippage.
+"""
+import heapq
+import itertools
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Per-symbol market microstructure: fees (bps of notional), half-spread + square-root
+# impact slippage (bps), and the external notional available per tick before fills go partial.
+DEFAULT_MARKET_CONFIG = {"maker_bps": 5.0, "taker_bps": 10.0, "spread_bps": 4.0, "impact_bps": 25.0, "depth": 2_000_000}
+MARKET_CONFIG: Dict[str, dict] = {
+    "BTC": {"maker_bps": 5.0, "taker_bps": 10.0, "spread_bps": 1.0, "impact_bps": 10.0, "depth": 20_000_000},
+    "ETH": {"maker_bps": 5.0, "taker_bps": 10.0, "spread_bps": 2.0, "impact_bps": 15.0, "depth": 10_000_000},
+    "SOL": {"maker_bps": 5.0, "taker_bps": 10.0, "spread_bps": 5.0, "impact_bps": 30.0, "depth": 2_000_000},
+    "AAPL": {"maker_bps": 0.0, "taker_bps": 1.0, "spread_bps": 1.0, "impact_bps": 5.0, "depth": 50_000_000},
+    "NVDA": {"maker_bps": 0.0, "taker_bps": 1.0, "spread_bps": 1.0, "impact_bps": 8.0, "depth": 40_000_000},
+    "MSFT": {"maker_bps": 0.0, "taker_bps": 1.0, "spread_bps": 1.0, "impact_bps": 5.0, "depth": 50_000_000},
+}
+
+
+def get_market_config(symbol: str) -> dict:
+    return MARKET_CONFIG.get(symbol, DEFAULT_MARKET_CONFIG)
+
+
+class Order:
+    __slots__ = ("id", "agent_id", "side", "price", "qty", "filled")
+
+    def __init__(self, order_id: int, agent_id: int, side: str, qty: float, price: Optional[float]):
+        self.id = order_id
+        self.agent_id = agent_id
+        self.side = side  # "BUY" / "SELL"
+        self.price = price  # None for market orders
+        self.qty = qty
+        self.filled = 0.0
+
+    @property
+    def remaining(self) -> float:
+        return self.qty - self.filled
+
+
+def _fill(agent_id, order_id, side, qty, price, fee_bps, liquidity) -> dict:
+    return {
+        "agent_id": agent_id,
+        "order_id": order_id,
+        "side": side,
+        "qty": qty,
+        "price": price,
+        "fee": qty * price * fee_bps / 10_000,
+        "liquidity": liquidity,  # "maker" / "taker" / "external"
+    }
+
+
+class OrderBook:
+    """
+    One symbol's book. Each side keeps a heap of price levels (bids negated) plus a
+    {price: deque[Order]} map; empty levels are dropped lazily when they reach the top.
+    """
+
+    def __init__(self, symbol: str, config: Optional[dict] = None):
+        self.symbol = symbol
+        self.config = config or get_market_config(symbol)
+        self._bid_heap: List[float] = []
+        self._ask_heap: List[float] = []
+        self._bids: Dict[float, Deque[Order]] = {}
+        self._asks: Dict[float, Deque[Order]] = {}
+        self._orders: Dict[int, Order] = {}
+        self._ids = itertools.count(1)
+
+    # ── Book inspection ─────────────────────────────────────
+    def _best(self, heap: List[float], levels: Dict[float, Deque[Order]], sign: int) -> Optional[float]:
+        while heap:
+            price = heap[0] * sign
+            if levels.get(price):
+                return price
+            heapq.heappop(heap)
+            levels.pop(price, None)
+        return None
+
+    def best_bid(self) -> Optional[float]:
+        return self._best(self._bid_heap, self._bids, -1)
+
+    def best_ask(self) -> Optional[float]:
+        return self._best(self._ask_heap, self._asks, 1)
+
+    def depth(self, levels: int = 10) -> dict:
+        """Aggregated quantity at the top N price levels of each side."""
+        def side(book, reverse):
+            prices = sorted((p for p, q in book.items() if q), reverse=reverse)[:levels]
+            return [{"price": p, "qty": round(sum(o.remaining for o in book[p]), 6)} for p in prices]
+        return {"symbol": self.symbol, "bids": side(self._bids, True), "asks": side(self._asks, False)}
+
+    def buy_cost_bound(self, qty: float, ref_price: float) -> float:
+        """
+        Most a buy of `qty` around `ref_price` can cost, fees included: every unit filled externally
+        with the whole order's slippage. Crossing another agent at `ref_price` is never dearer.
+        """
+        cfg = self.config
+        notional = qty * ref_price
+        slip_bps = cfg["spread_bps"] / 2 + cfg["impact_bps"] * math.sqrt(min(notional, cfg["depth"]) / cfg["depth"])
+        fee_bps = max(cfg["maker_bps"], cfg["taker_bps"])
+        return notional * (1 + slip_bps / 10_000) * (1 + fee_bps / 10_000)
+
+    # ── Order entry ─────────────────────────────────────────
+    def submit_limit(self, agent_id: int, side: str, qty: float, price: float) -> List[dict]:
+        """Cross a limit order against the opposite side, resting any remainder."""
+        order = Order(next(self._ids), agent_id, side, qty, price)
+        fills = self._match(order)
+        if order.remaining > 1e-12:
+            self._rest(order)
+        return fills
+
+    def submit_market(self, agent_id: int, side: str, qty: float, ref_price: float) -> List[dict]:
+        """Sweep the book at any price, then fill the rest against external liquidity."""
+        order = Order(next(self._ids), agent_id, side, qty, None)
+        fills = self._match(order)
+        if order.remaining > 1e-12:
+            fills.extend(self._fill_external(order, ref_price))
+        return fills
+
+    def cancel(self, order_id: int) -> bool:
+        order = self._orders.pop(order_id, None)
+        if not order:
+            return False
+        book = self._bids if order.side == "BUY" else self._asks
+        level = book.get(order.price)
+        if level:
+            level.remove(order)
+        return True
+
+    def cancel_all(self) -> List[Order]:
+        """Drop every resting order and return them (unfilled remainder)."""
+        orders = list(self._orders.values())
+        self._bid_heap.clear()
+        self._ask_heap.clear()
+        self._bids.clear()
+        self._asks.clear()
+        self._orders.clear()
+        return orders
+
+    # ── Matching ────────────────────────────────────────────
+    def _rest(self, order: Order):
+        if order.side == "BUY":
+            book, heap, key = self._bids, self._bid_heap, -order.price
+        else:
+            book, heap, key = self._asks, self._ask_heap, order.price
+        level = book.get(order.price)
+        if level is None:
+            level = book[order.price] = deque()
+            heapq.heappush(heap, key)
+        level.append(order)
+        self._orders[order.id] = order
+
+    def _match(self, order: Order) -> List[dict]:
+        fills = []
+        if order.side == "BUY":
+            best, book = self.best_ask, self._asks
+            crosses = lambda p: order.price is None or p <= order.price
+        else:
+            best, book = self.best_bid, self._bids
+            crosses = lambda p: order.price is None or p >= order.price
+
+        maker_bps, taker_bps = self.config["maker_bps"], self.config["taker_bps"]
+        while order.remaining > 1e-12:
+            price = best()
+            if price is None or not crosses(price):
+                break
+            level = book[price]
+            while level and order.remaining > 1e-12:
+                resting = level[0]
+                if resting.agent_id == order.agent_id:
+                    # Self-trade prevention: cancel the older resting order
+                    level.popleft()
+                    self._orders.pop(resting.id, None)
+                    continue
+                qty = min(order.remaining, resting.remaining)
+                order.filled += qty
+                resting.filled += qty
+                fills.append(_fill(order.agent_id, order.id, order.side, qty, price, taker_bps, "taker"))
+                fills.append(_fill(resting.agent_id, resting.id, resting.side, qty, price, maker_bps, "maker"))
+                if resting.remaining <= 1e-12:
+                    level.popleft()
+                    self._orders.pop(resting.id, None)
+        return fills
+
+    def _fill_external(self, order: Order, ref_price: float) -> List[dict]:
+        """
+        Fill against modelled venue liquidity: half-spread plus square-root impact on the
+        notional taken. Notional beyond `depth` isn't available this tick, so fills go partial.
+        """
+        cfg = self.config
+        qty = order.remaining
+        if ref_price <= 0:
+            return []
+        max_qty = cfg["depth"] / ref_price
+        qty = min(qty, max_qty)
+        if qty <= 1e-12:
+            return []
+        slip_bps = cfg["spread_bps"] / 2 + cfg["impact_bps"] * math.sqrt(qty * ref_price / cfg["depth"])
+        direction = 1 if order.side == "BUY" else -1
+        price = ref_price * (1 + direction * slip_bps / 10_000)
+        if order.price is not None and direction * (price - order.price) > 0:
+            return []  # limit would be violated by the slippage
+        order.filled += qty
+        return [_fill(order.agent_id, order.id, order.side, qty, price, cfg["taker_bps"], "external")]
+
+
+class MatchingEngine:
+    """Holds one OrderBook per symbol and runs the per-tick agent auction."""
+
+    def __init__(self):
+        self._books: Dict[str, OrderBook] = {}
+        self.orders_matched = 0
+        self.fills_generated = 0
+
+    def book(self, symbol: str) -> OrderBook:
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = OrderBook(symbol)
+        return book
+
+    def match_orders(self, symbol: str, ref_price: float, orders: List[dict]) -> List[dict]:
+        """
+        Match one tick's agent orders for a symbol.
+        `orders` are {"agent_id", "side", "qty"} dicts (market intent at `ref_price`):
+        they first rest/cross as limits at the reference price so opposing agents trade
+        with each other fee-cheaply and slippage-free, then leftovers go to external liquidity.
+        """
+        book = self.book(symbol)
+        fills = []
+        for o in orders:
+            fills.extend(book.submit_limit(o["agent_id"], o["side"], o["qty"], ref_price))
+        for resting in book.cancel_all():
+            if resting.remaining > 1e-12:
+                residual = Order(resting.id, resting.agent_id, resting.side, resting.remaining, None)
+                fills.extend(book._fill_external(residual, ref_price))
+        self.orders_matched += len(orders)
+        self.fills_generated += len(fills)
+        return fills
+
+
+def aggregate_fills(fills: List[dict]) -> Dict[tuple, dict]:
+    """Collapse fills into one VWAP fill per (agent_id, side)."""
+    agg: Dict[tuple, dict] = {}
+    for f in fills:
+        key = (f["agent_id"], f["side"])
+        a = agg.get(key)
+        if a is None:
+            agg[key] = {**f}
+            continue
+        notional = a["qty"] * a["price"] + f["qty"] * f["price"]
+        a["qty"] += f["qty"]
+        a["price"] = notional / a["qty"]
+        a["fee"] += f["fee"]
+    return agg
@@ -5,12 +5,16 @@ so everything survives server restarts and PC reboots.
 import json
 import os
 import time
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+DATA_DIR = os.getenv("AGENTFI_DATA_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
 AGENTS_FILE = os.path.join(DATA_DIR, "agents.json")
 WALLETS_FILE = os.path.join(DATA_DIR, "wallets.json")
 TRADES_FILE = os.path.join(DATA_DIR, "trades.json")
+HISTORY_DIR = os.path.join(DATA_DIR, "history")  # cached daily bars, one file per symbol
+SWEEP_DIR = os.path.join(DATA_DIR, "sweeps")  # memory-mapped backtest series + cached sweep results
+SWEEP_CACHE_FILE = os.path.join(SWEEP_DIR, "results.jsonl")  # append-only log, one batch of entries per line
+ALERTS_FILE = os.path.join(DATA_DIR, "alerts.json")
 
 
 def _ensure_dir():
@@ -77,3 +81,82 @@ def load_trades() -> Dict[int, List[dict]]:
         return {int(k): v for k, v in raw.items()}
     except (json.JSONDecodeError, IOError):
         return {}
+
+
+def save_bars(symbol: str, cached: dict):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    with open(os.path.join(HISTORY_DIR, f"{symbol}.json"), "w") as f:
+        json.dump(cached, f, separators=(",", ":"))
+
+
+def load_bars(symbol: str) -> dict:
+    path = os.path.join(HISTORY_DIR, f"{symbol}.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def append_sweep_cache(entries: Dict[str, dict]):
+    """Append new cache entries as one line, so a write costs the batch size rather than the cache size."""
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    with open(SWEEP_CACHE_FILE, "a") as f:
+        f.write(json.dumps(entries, separators=(",", ":")) + "\n")
+
+
+def save_sweep_cache(cache: Dict[str, dict]):
+    """Compact the log: rewrite it as a single line holding the whole cache."""
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    tmp = SWEEP_CACHE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(json.dumps(cache, separators=(",", ":")) + "\n")
+    os.replace(tmp, SWEEP_CACHE_FILE)
+
+
+def load_sweep_cache() -> Tuple[Dict[str, dict], int]:
+    """
+    Replay the log oldest first. Returns (cache, entries logged). A line torn by a crash mid-append
+    is dropped and the log rewritten, so the next append doesn't land on the fragment.
+    """
+    cache: Dict[str, dict] = {}
+    logged = 0
+    torn = False
+    if not os.path.exists(SWEEP_CACHE_FILE):
+        return cache, logged
+    try:
+        with open(SWEEP_CACHE_FILE, "r") as f:
+            for line in f:
+                try:
+                    entries = json.loads(line)
+                except json.JSONDecodeError:
+                    torn = True
+                    continue
+                cache.update(entries)
+                logged += len(entries)
+    except IOError:
+        return {}, 0
+    if torn:
+        save_sweep_cache(cache)
+        logged = len(cache)
+    return cache, logged
+
+
+def save_alerts(state: dict):
+    _ensure_dir()
+    tmp = ALERTS_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp, ALERTS_FILE)
+
+
+def load_alerts() -> dict:
+    if not os.path.exists(ALERTS_FILE):
+        return {}
+    try:
+        with open(ALERTS_FILE, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
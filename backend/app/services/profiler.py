@@ -0,0 +1,247 @@
+"""
+Profiler — On-demand in-process profiling of simulation ticks or HTTP routes.
+An armed session wraps the next N ticks (or the next N requests to one route) in cProfile
+plus a wall-clock stack sampler, then stores pstats output and a collapsed-stack flame file
+(flamegraph.pl / speedscope format). With nothing armed, the hooks cost one global check.
+
+Routes run on the event loop, so while a captured request awaits, other coroutines (ticks, other
+requests) run in its window. cProfile can't tell them apart and its pstats include that work; the
+stack sampler keeps only samples taken while the captured task itself is running and reports the
+rest as `otherSamples`. Result files are written off the event loop.
+"""
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.services.log import get_logger
+from app.services.persistence import DATA_DIR
+
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+SAMPLE_INTERVAL = 0.002  # seconds between stack samples
+MAX_COUNT = 100  # ticks/requests per session
+MAX_RESULTS = 20  # finished sessions kept in memory (files stay on disk)
+TOP_N = 30
+SORT_KEYS = {"cumulative": 3, "tottime": 2, "calls": 1}  # -> index into pstats rows
+
+_session: Optional[dict] = None
+_results: "OrderedDict[str, dict]" = OrderedDict()
+_writes: Dict[str, asyncio.Task] = {}  # profile id -> file write still in flight
+
+log = get_logger("profiler")
+
+
+class _StackSampler(threading.Thread):
+    """
+    Samples one thread's Python stack. With a `task`, samples taken while the loop runs anything
+    else (another task, a callback, or idle polling) are only counted in `other`.
+    """
+
+    def __init__(self, thread_id: int, stacks: Counter, task: Optional[asyncio.Task] = None):
+        super().__init__(daemon=True, name="profiler-sampler")
+        self.thread_id = thread_id
+        self.stacks = stacks
+        self.task = task
+        self.other = 0
+        self._done = threading.Event()
+
+    def run(self):
+        loop = self.task.get_loop() if self.task is not None else None
+        while not self._done.wait(SAMPLE_INTERVAL):
+            if loop is not None and asyncio.current_task(loop) is not self.task:
+                self.other += 1
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def start(target: str, count: int = 3, sort: str = "cumulative") -> dict:
+    """Arm a session for `target` ("tick" or a route path such as "/api/agents/")."""
+    global _session
+    if _session is not None:
+        raise ValueError(f"A profiling session is already armed for {_session['target']}")
+    if target != "tick" and not target.startswith("/"):
+        raise ValueError("Target must be 'tick' or a route path starting with '/'")
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Sort must be one of {', '.join(SORT_KEYS)}")
+    _session = {
+        "id": uuid.uuid4().hex[:12],
+        "target": target,
+        "count": max(1, min(count, MAX_COUNT)),
+        "captured": 0,
+        "sort": sort,
+        "armedAt": time.time(),
+        "busy": False,
+        "profile": cProfile.Profile(),
+        "stacks": Counter(),
+        "otherSamples": 0,
+        "wallSeconds": 0.0,
+    }
+    return status()
+
+
+def cancel() -> Optional[dict]:
+    """Disarm the current session, keeping whatever was captured so far."""
+    global _session
+    if _session is None:
+        return None
+    if _session["captured"]:
+        return _finish()
+    _session = None
+    return None
+
+
+def is_armed(target: str) -> bool:
+    return _session is not None and _session["target"] == target
+
+
+@contextmanager
+def capture(target: str):
+    """Profile one tick/request for the armed session; a no-op unless `target` is armed."""
+    session = _session
+    if session is None or session["target"] != target or session["busy"]:
+        # cProfile can't nest, so overlapping requests to the same route are skipped
+        yield
+        return
+    session["busy"] = True
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # no running loop: plain synchronous code, nothing interleaves
+        task = None
+    sampler = _StackSampler(threading.get_ident(), session["stacks"], task)
+    sampler.start()
+    start_time = time.perf_counter()
+    session["profile"].enable()
+    try:
+        yield
+    finally:
+        session["profile"].disable()
+        session["wallSeconds"] += time.perf_counter() - start_time
+        sampler.stop()
+        session["otherSamples"] += sampler.other
+        session["busy"] = False
+        session["captured"] += 1
+        if session["captured"] >= session["count"] and session is _session:
+            _finish()
+
+
+def _top_functions(stats: pstats.Stats, sort: str) -> list:
+    key = SORT_KEYS[sort]
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][key], reverse=True)[:TOP_N]
+    return [
+        {
+            "function": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": nc,
+            "totalTime": round(tt, 6),
+            "cumulativeTime": round(ct, 6),
+        }
+        for (filename, line, func), (cc, nc, tt, ct, callers) in rows
+    ]
+
+
+def _write_files(profile: cProfile.Profile, files: dict, text: str, collapsed: str):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile.dump_stats(files["pstats"])
+    with open(files["text"], "w") as f:
+        f.write(text)
+    with open(files["collapsed"], "w") as f:
+        f.write(collapsed)
+
+
+def _written(profile_id: str, task: asyncio.Task):
+    _writes.pop(profile_id, None)
+    if not task.cancelled() and task.exception():
+        log.error("Writing profile %s failed: %s", profile_id, task.exception())
+
+
+def _finish() -> dict:
+    """Build the report, move the session into results and write its pstats / text / collapsed-stack files."""
+    global _session
+    session, _session = _session, None
+    base = os.path.join(PROFILE_DIR, session["id"])
+    files = {"pstats": base + ".pstats", "text": base + ".txt", "collapsed": base + ".collapsed"}
+
+    text = io.StringIO()
+    stats = pstats.Stats(session["profile"], stream=text)
+    stats.sort_stats(session["sort"]).print_stats(TOP_N)
+    collapsed = "\n".join(f"{stack} {n}" for stack, n in session["stacks"].most_common()) + "\n"
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _write_files(session["profile"], files, text.getvalue(), collapsed)
+    else:
+        task = loop.create_task(asyncio.to_thread(_write_files, session["profile"], files, text.getvalue(), collapsed))
+        _writes[session["id"]] = task
+        task.add_done_callback(lambda t, profile_id=session["id"]: _written(profile_id, t))
+
+    result = {
+        "id": session["id"],
+        "target": session["target"],
+        "captured": session["captured"],
+        "requested": session["count"],
+        "armedAt": session["armedAt"],
+        "finishedAt": time.time(),
+        "wallSeconds": round(session["wallSeconds"], 6),
+        "avgSeconds": round(session["wallSeconds"] / max(session["captured"], 1), 6),
+        "samples": sum(session["stacks"].values()),
+        "otherSamples": session["otherSamples"],
+        "sort": session["sort"],
+        "top": _top_functions(stats, session["sort"]),
+        "files": files,
+    }
+    _results[result["id"]] = result
+    while len(_results) > MAX_RESULTS:
+        _results.popitem(last=False)
+    return result
+
+
+def status() -> dict:
+    active = None
+    if _session is not None:
+        active = {k: _session[k] for k in ("id", "target", "count", "captured", "sort", "armedAt")}
+    return {
+        "active": active,
+        "results": [
+            {k: r[k] for k in ("id", "target", "captured", "finishedAt", "avgSeconds")}
+            for r in reversed(_results.values())
+        ],
+    }
+
+
+def get_result(profile_id: str) -> Optional[dict]:
+    return _results.get(profile_id)
+
+
+def _read(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+async def get_collapsed(profile_id: str) -> Optional[str]:
+    result = _results.get(profile_id)
+    if not result:
+        return None
+    pending = _writes.get(profile_id)
+    if pending is not None:
+        await asyncio.wait([pending])
+    return await asyncio.to_thread(_read, result["files"]["collapsed"])
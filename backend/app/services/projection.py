@@ -0,0 +1,300 @@
+"""
+Projection — Monte Carlo projection of portfolio value under correlated geometric Brownian motion.
+Daily log-return drift and covariance come from historical daily closes (stocks from the stock
+history cache, crypto from CoinGecko), aligned on common trading days; symbols without daily
+history fall back to the live intraday covariance engine (zero drift). Paths are simulated in
+fixed-size chunks, and chunks can fan out over the shared worker pool (AGENTFI_PROJECTION_PARALLEL=1).
+Band values are folded into fixed-bin log-value histograms as each chunk finishes, so only the
+terminal values and drawdowns are kept per path. Every chunk draws from its own seed spawned
+from the request seed, so a seeded projection is identical however many workers run it.
+"""
+import asyncio
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services import workers
+from app.services.covariance import CovarianceEngine, PERIODS_PER_YEAR
+from app.services.log import get_logger
+from app.services.market_data import MarketDataService, CRYPTO_IDS, STOCK_SYMBOLS
+from app.services.stock_history import get_stock_history
+
+DEFAULT_PATHS = 100_000
+MAX_PATHS = 1_000_000
+TRADING_DAYS = 252  # steps per simulated year
+MAX_HORIZON = 5 * TRADING_DAYS
+HISTORY_DAYS = 365  # calendar days of closes the model is estimated from
+MIN_RETURNS = 30  # aligned daily returns needed before a symbol uses its own history
+CLOSES_TTL = 3600  # seconds before a symbol's daily closes are refetched
+CHUNK_ELEMENTS = 1 << 22  # float32 draws per chunk (paths × steps × assets), ~16 MB
+BAND_POINTS = 64  # horizon points the percentile bands are reported at
+HIST_BINS = 2048  # log-value bins per band point; band percentiles interpolate within a bin
+HIST_SIGMAS = 8  # histogram half-width in standard deviations of the most volatile asset
+PERCENTILES = (5, 25, 50, 75, 95)
+DRAWDOWN_LEVELS = (10, 20, 30, 50)  # % peak-to-trough levels reported as probabilities
+PARALLEL = os.getenv("AGENTFI_PROJECTION_PARALLEL", "0") == "1"  # fan chunks out over the worker pool
+
+log = get_logger("projection")
+
+_COIN_IDS = {symbol: coin_id for coin_id, symbol in CRYPTO_IDS.items()}
+_closes: Dict[str, Tuple[float, Dict[str, float]]] = {}  # symbol -> (fetched at, {date: close})
+
+
+# ── Return model ────────────────────────────────────────────
+async def _crypto_closes(symbol: str) -> Dict[str, float]:
+    history = await MarketDataService().fetch_crypto_history(_COIN_IDS[symbol], HISTORY_DAYS, points=None)
+    closes = {}
+    for point in history:  # CoinGecko returns daily points at this range; the last one per day wins
+        day = datetime.fromtimestamp(point["timestamp"] / 1000, timezone.utc).date().isoformat()
+        closes[day] = point["price"]
+    return closes
+
+
+async def daily_closes(symbols: List[str]) -> Dict[str, Dict[str, float]]:
+    """{symbol: {date: close}} for symbols with daily history, refetched at most every CLOSES_TTL."""
+    now = time.time()
+    stale = [s for s in symbols if (s in _COIN_IDS or s in STOCK_SYMBOLS)
+             and now - _closes.get(s, (0, None))[0] > CLOSES_TTL]
+    stocks = [s for s in stale if s in STOCK_SYMBOLS]
+    if stocks:
+        history = await get_stock_history().get_history(stocks, HISTORY_DAYS)
+        for symbol, bars in history.items():
+            _closes[symbol] = (now, {b["date"]: b["close"] for b in bars})
+    crypto = [s for s in stale if s in _COIN_IDS]
+    fetched = await asyncio.gather(*(_crypto_closes(s) for s in crypto), return_exceptions=True)
+    for symbol, closes in zip(crypto, fetched):
+        if isinstance(closes, Exception):
+            log.warning("Crypto daily history unavailable: %s", closes, extra={"rate_key": symbol})
+            continue
+        _closes[symbol] = (now, closes)
+    return {s: _closes[s][1] for s in symbols if s in _closes and _closes[s][1]}
+
+
+def _align(closes: Dict[str, Dict[str, float]]) -> Tuple[List[str], np.ndarray]:
+    """Log returns on the dates every symbol has (crypto weekends fold into the next trading day)."""
+    symbols = sorted(closes, key=lambda s: len(closes[s]), reverse=True)
+    while symbols:
+        common = sorted(set.intersection(*(set(closes[s]) for s in symbols)))
+        if len(common) > MIN_RETURNS:
+            prices = np.array([[closes[s][d] for s in symbols] for d in common], dtype=float)
+            return symbols, np.diff(np.log(prices), axis=0)
+        symbols.pop()  # the shortest history limits the overlap most
+    return [], np.empty((0, 0))
+
+
+async def estimate_model(symbols: List[str], intraday: Optional[CovarianceEngine] = None,
+                         drift: str = "historical") -> dict:
+    """
+    Per-step (trading day) log-return drift and covariance for `symbols`. Historical symbols form
+    one block estimated from aligned daily closes; intraday fallbacks form a second block,
+    uncorrelated with the first. Symbols with neither are left out and held at constant value.
+    """
+    closes = await daily_closes(symbols)
+    daily, returns = _align(closes)
+    mu = returns.mean(axis=0) if daily else np.empty(0)
+    cov = np.atleast_2d(np.cov(returns, rowvar=False)) if daily else np.empty((0, 0))
+
+    fallback, fallback_cov = [], np.empty((0, 0))
+    if intraday is not None:
+        fallback, fallback_cov = intraday.matrix([s for s in symbols if s not in daily])
+        fallback_cov = fallback_cov * PERIODS_PER_YEAR / TRADING_DAYS
+
+    names = daily + fallback
+    n, k = len(names), len(daily)
+    full = np.zeros((n, n))
+    full[:k, :k] = cov
+    full[k:, k:] = fallback_cov
+    step_mu = np.concatenate([mu, np.zeros(len(fallback))]) if drift == "historical" else np.zeros(n)
+    vol = np.sqrt(np.diag(full))
+    return {
+        "symbols": names,
+        "mu": step_mu,
+        "cov": full,
+        "source": {**{s: "daily" for s in daily}, **{s: "intraday" for s in fallback}},
+        "observations": len(returns),
+        "annualizedDriftPct": {s: round(float(m) * TRADING_DAYS * 100, 2) for s, m in zip(names, step_mu)},
+        "annualizedVolatilityPct": {s: round(float(v) * math.sqrt(TRADING_DAYS) * 100, 2) for s, v in zip(names, vol)},
+        "untracked": [s for s in symbols if s not in names],
+    }
+
+
+# ── Simulation ──────────────────────────────────────────────
+def _factor(cov: np.ndarray) -> np.ndarray:
+    """A with A·Aᵀ = cov; Cholesky, or eigenvalues clipped at zero when cov is singular."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        w, v = np.linalg.eigh(cov)
+        return v * np.sqrt(np.clip(w, 0, None))
+
+
+def _simulate_chunk(seed: np.random.SeedSequence, n_paths: int, steps: int, mu: np.ndarray,
+                    factor: np.ndarray, values: np.ndarray, cash: float,
+                    sample_at: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simulate one chunk of buy-and-hold paths. Returns portfolio values at the `sample_at` steps
+    (1-based, one row per step) and each path's maximum drawdown from its running peak (as a fraction).
+    Arrays are laid out step-major, so the running sums and peaks are one contiguous row op per step.
+    Antithetic pairs: the second half of the paths mirrors the first half's shocks, which halves
+    the normal draws (the dominant cost) and lowers the variance of the estimates.
+    """
+    rng = np.random.default_rng(seed)
+    half = (n_paths + 1) // 2
+    x = np.empty((steps, n_paths, len(values)), dtype=np.float32)
+    np.matmul(rng.standard_normal((steps, half, len(values)), dtype=np.float32), factor.T, out=x[:, :half])
+    np.negative(x[:, :n_paths - half], out=x[:, half:])
+    for t in range(1, steps):
+        np.add(x[t], x[t - 1], out=x[t])
+    np.exp(x, out=x)
+    # Drift is deterministic, so it scales each step's holding values instead of every shock
+    weights = values * np.exp(mu * np.arange(1, steps + 1, dtype=np.float32)[:, None])
+    paths = np.matmul(x, weights[:, :, None])[..., 0]
+    paths += cash
+
+    peak = np.full(n_paths, cash + values.sum(), dtype=np.float32)  # the starting value is the first peak
+    max_dd = np.zeros(n_paths, dtype=np.float32)
+    drawdown = np.empty(n_paths, dtype=np.float32)
+    for row in paths:
+        np.maximum(peak, row, out=peak)
+        np.divide(row, peak, out=drawdown)
+        np.minimum(max_dd, drawdown - 1, out=max_dd)
+    return paths[sample_at - 1], -max_dd
+
+
+def _simulate_batch(chunks: List[Tuple[np.random.SeedSequence, int]], steps: int, mu: np.ndarray,
+                    factor: np.ndarray, values: np.ndarray, cash: float, sample_at: np.ndarray,
+                    initial: float, lo: np.ndarray, width: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Run `chunks` one after another and fold each into per-band-point histograms of
+    log(value / initial) with HIST_BINS bins starting at `lo` (values outside land in the end bins).
+    Returns (bin counts, value sums per band point, terminal values, max drawdowns).
+    """
+    rows = len(sample_at)
+    counts = np.zeros(rows * HIST_BINS, dtype=np.int64)
+    sums = np.zeros(rows)
+    terminal, max_dd = [], []
+    offsets = (np.arange(rows) * HIST_BINS)[:, None]
+    for seed, n in chunks:
+        samples, dd = _simulate_chunk(seed, n, steps, mu, factor, values, cash, sample_at)
+        sums += samples.sum(axis=1, dtype=np.float64)
+        terminal.append(samples[-1])
+        max_dd.append(dd)
+        logs = np.log(np.maximum(samples / initial, 1e-30))
+        bins = np.clip(((logs - lo[:, None]) / width[:, None]).astype(np.int64), 0, HIST_BINS - 1)
+        counts += np.bincount((bins + offsets).ravel(), minlength=rows * HIST_BINS)
+    return counts.reshape(rows, HIST_BINS), sums, np.concatenate(terminal), np.concatenate(max_dd)
+
+
+def _band_percentiles(counts: np.ndarray, lo: np.ndarray, width: np.ndarray, initial: float) -> np.ndarray:
+    """Percentile values (PERCENTILES × band points) read off the histogram CDFs."""
+    cdf = np.cumsum(counts, axis=1)
+    total = cdf[:, -1]
+    out = np.empty((len(PERCENTILES), len(counts)))
+    for i, p in enumerate(PERCENTILES):
+        target = p / 100 * total
+        b = np.minimum((cdf < target[:, None]).sum(axis=1), HIST_BINS - 1)
+        rows = np.arange(len(counts))
+        before = np.where(b > 0, cdf[rows, np.maximum(b - 1, 0)], 0)
+        frac = (target - before) / np.maximum(counts[rows, b], 1)
+        out[i] = initial * np.exp(lo + (b + frac) * width)
+    return out
+
+
+def _flat(initial: float, paths: int, horizon: int, seed: Optional[int], start: float) -> dict:
+    """A projection with nothing to move: every band sits at `initial` (a zero or negative net value)."""
+    days = [0] + np.unique(np.linspace(1, horizon, min(horizon, BAND_POINTS)).round().astype(int)).tolist()
+    return {
+        "initialValue": round(initial, 2),
+        "paths": paths,
+        "horizonDays": horizon,
+        "seed": seed,
+        "bands": [{"day": day, **{f"p{p}": round(initial, 2) for p in PERCENTILES}, "mean": round(initial, 2)}
+                  for day in days],
+        "terminal": {"expectedValue": round(initial, 2), "expectedReturnPct": 0.0, "medianReturnPct": 0.0,
+                     "probLossPct": 0.0, "var95Pct": 0.0, "cvar95Pct": 0.0},
+        "drawdown": {"expectedMaxPct": 0.0, "medianMaxPct": 0.0,
+                     "probabilityPct": {str(level): 0.0 for level in DRAWDOWN_LEVELS}},
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def simulate(model: dict, values: Dict[str, float], cash: float, paths: int = DEFAULT_PATHS,
+             horizon: int = TRADING_DAYS, seed: Optional[int] = None, parallel: bool = PARALLEL) -> dict:
+    """Project `values` ({symbol: market value}) plus `cash` over `horizon` trading days."""
+    start = time.perf_counter()
+    names = [s for s in model["symbols"] if values.get(s)]
+    idx = [model["symbols"].index(s) for s in names]
+    # Untracked holdings have no return model, so they are carried at their current value
+    cash = cash + sum(v for s, v in values.items() if s not in names and s != "Cash")
+    initial = cash + sum(values[s] for s in names)
+    if initial <= 0:  # returns and drawdowns are undefined without a positive starting value
+        return _flat(initial, paths, horizon, seed, start)
+    vals = np.array([values[s] for s in names], dtype=np.float32)
+    mu = model["mu"][idx].astype(np.float32)
+    factor = _factor(model["cov"][np.ix_(idx, idx)]).astype(np.float32)
+    if not names:  # nothing to simulate: one zero-variance asset keeps the shapes uniform
+        vals, mu, factor = np.zeros(1, np.float32), np.zeros(1, np.float32), np.zeros((1, 1), np.float32)
+
+    sample_at = np.unique(np.linspace(1, horizon, min(horizon, BAND_POINTS)).round().astype(int))
+    # The portfolio's log growth is bounded by its best asset's, so the widest asset sets the range
+    sigma = float(np.sqrt((factor.astype(float) ** 2).sum(axis=1).max()))
+    half = float(np.abs(mu).max()) * sample_at + HIST_SIGMAS * sigma * np.sqrt(sample_at) + 1e-6
+    lo, width = -half, 2 * half / HIST_BINS
+
+    chunk = max(1, CHUNK_ELEMENTS // (horizon * len(vals)))
+    sizes = [min(chunk, paths - i) for i in range(0, paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = list(zip(seeds, sizes))
+    tasks = min(len(chunks), workers.POOL_SIZE * 4) if parallel else 1
+    args = [(chunks[i::tasks], horizon, mu, factor, vals, np.float32(cash), sample_at, initial, lo, width)
+            for i in range(tasks)]
+    results = workers.run(_simulate_batch, args, parallel)
+    counts = sum(r[0] for r in results)
+    means = sum(r[1] for r in results) / paths
+    terminal = np.concatenate([r[2] for r in results]).astype(float)
+    max_dd = np.concatenate([r[3] for r in results]) * 100
+
+    bands = _band_percentiles(counts, lo, width, initial)
+    returns = (terminal / initial - 1) * 100
+    var95 = -np.percentile(returns, 5)
+    tail = returns[returns <= -var95]
+    return {
+        "initialValue": round(initial, 2),
+        "paths": paths,
+        "horizonDays": horizon,
+        "seed": seed,
+        "bands": [{"day": 0, **{f"p{p}": round(initial, 2) for p in PERCENTILES}, "mean": round(initial, 2)}] + [
+            {"day": int(day), **{f"p{p}": round(float(b), 2) for p, b in zip(PERCENTILES, bands[:, j])},
+             "mean": round(float(means[j]), 2)}
+            for j, day in enumerate(sample_at)
+        ],
+        "terminal": {
+            "expectedValue": round(float(terminal.mean()), 2),
+            "expectedReturnPct": round(float(returns.mean()), 2),
+            "medianReturnPct": round(float(np.median(returns)), 2),
+            "probLossPct": round(float((returns < 0).mean()) * 100, 2),
+            "var95Pct": round(float(var95), 2) + 0.0,  # + 0.0 turns -0.0 into 0.0
+            "cvar95Pct": round(float(-tail.mean()), 2) + 0.0 if tail.size else round(float(var95), 2) + 0.0,
+        },
+        "drawdown": {
+            "expectedMaxPct": round(float(max_dd.mean()), 2),
+            "medianMaxPct": round(float(np.median(max_dd)), 2),
+            "probabilityPct": {str(level): round(float((max_dd >= level).mean()) * 100, 2) for level in DRAWDOWN_LEVELS},
+        },
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+async def project(values: Dict[str, float], cash: float, intraday: Optional[CovarianceEngine] = None,
+                  paths: int = DEFAULT_PATHS, horizon: int = TRADING_DAYS, seed: Optional[int] = None,
+                  drift: str = "historical") -> dict:
+    """Estimate the return model for the held symbols, then simulate off the event loop."""
+    held = [s for s, v in values.items() if v and s != "Cash"]
+    model = await estimate_model(held, intraday, drift)
+    result = await asyncio.to_thread(simulate, model, values, cash, paths, horizon, seed)
+    public = {k: model[k] for k in ("source", "observations", "annualizedDriftPct", "annualizedVolatilityPct", "untracked")}
+    return {**result, "model": {"drift": drift, **public}}
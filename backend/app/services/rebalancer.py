@@ -0,0 +1,133 @@
+"""
+Rebalancer — Computes the minimal set of trades that moves a portfolio to target weights
+or back inside risk constraints, accounting for cash, fees and lot sizes.
+Vectorized over holdings with NumPy so large books (thousands of symbols) solve in one pass.
+"""
+import numpy as np
+from typing import Dict, List, Optional
+from app.services.market_data import get_sector
+from app.services.order_book import get_market_config
+
+MIN_TRADE_NOTIONAL = 10.0  # skip dust trades below this size
+DEFAULT_LOT = {"Crypto": 0.0001, "Stocks": 0.01}  # fractional shares / coin precision
+
+
+def _lot_size(symbol: str) -> float:
+    return get_market_config(symbol).get("lot", DEFAULT_LOT.get(get_sector(symbol), 0.0001))
+
+
+def validate_targets(targets: Dict[str, float], min_cash_weight: float = 0.0) -> Dict[str, float]:
+    """Reject target weights that can't be held long-only: negative ones, or a total above 1 - min_cash_weight."""
+    negative = sorted(s for s, w in targets.items() if w < 0)
+    if negative:
+        raise ValueError(f"Target weights must be non-negative: {', '.join(negative)}")
+    total = sum(targets.values())
+    if total > 1 - min_cash_weight + 1e-9:
+        raise ValueError(f"Target weights sum to {total:.4f}, above the {1 - min_cash_weight:.4f} available after the cash floor")
+    return targets
+
+
+def plan_rebalance(
+    values: Dict[str, float],
+    prices: Dict[str, float],
+    cash: float,
+    targets: Optional[Dict[str, float]] = None,
+    max_weight: Optional[float] = None,
+    sector_caps: Optional[Dict[str, float]] = None,
+    min_cash_weight: float = 0.0,
+) -> dict:
+    """
+    Build a rebalancing plan.
+    - With `targets` ({symbol: weight of total equity}), every listed symbol is moved to its
+      weight and unlisted holdings are sold down to zero. Weights must pass validate_targets.
+    - Without targets, current weights are kept.
+    Either way the caps are then enforced: any weight above `max_weight` is clipped, and any
+    sector above its cap in `sector_caps` (e.g. {"Crypto": 0.5}) is scaled down.
+    Buys are scaled back if they'd need more cash than is available after sells, fees and
+    `min_cash_weight`. Sells never exceed the holding; quantities are rounded toward zero to
+    each symbol's lot size.
+    """
+    if targets is not None:
+        validate_targets(targets, min_cash_weight)
+    symbols = sorted(set(values) | set(targets or {}))
+    symbols = [s for s in symbols if prices.get(s, 0) > 0]
+    n = len(symbols)
+    if n == 0:
+        return {"trades": [], "summary": {"equity": round(cash, 2), "trades": 0, "turnover": 0.0}}
+
+    price = np.array([prices[s] for s in symbols], dtype=float)
+    value = np.array([values.get(s, 0.0) for s in symbols], dtype=float)
+    fee_rate = np.array([get_market_config(s)["taker_bps"] / 10_000 for s in symbols])
+    lot = np.array([_lot_size(s) for s in symbols])
+    sectors = [get_sector(s) for s in symbols]
+    sector_names, sector_idx = np.unique(sectors, return_inverse=True)
+
+    equity = cash + value.sum()
+    weight = value / equity if equity > 0 else np.zeros(n)
+
+    if targets is not None:
+        target = np.array([targets.get(s, 0.0) for s in symbols], dtype=float)
+    else:
+        target = weight.copy()
+    if max_weight is not None:
+        target = np.minimum(target, max_weight)
+    for sector, cap in (sector_caps or {}).items():
+        if sector not in sector_names:
+            continue
+        mask = sector_idx == np.searchsorted(sector_names, sector)
+        sector_total = target[mask].sum()
+        if sector_total > cap:
+            target[mask] *= cap / sector_total
+
+    delta = np.maximum(target * equity - value, -value)  # +buy / -sell, in dollars; no shorting
+
+    # Cash feasibility: sells (net of fees) fund buys (gross of fees)
+    sells = np.where(delta < 0, -delta, 0.0)
+    buys = np.where(delta > 0, delta, 0.0)
+    available = cash + (sells * (1 - fee_rate)).sum() - min_cash_weight * equity
+    buy_cost = (buys * (1 + fee_rate)).sum()
+    scale = min(1.0, max(available, 0.0) / buy_cost) if buy_cost > 0 else 1.0
+    delta = np.where(delta > 0, delta * scale, delta)
+
+    # Round to lots (toward zero) and drop dust
+    qty = np.trunc(delta / price / lot) * lot
+    notional = np.abs(qty * price)
+    trade_mask = notional >= MIN_TRADE_NOTIONAL
+    fees = notional * fee_rate
+
+    new_value = value + np.where(trade_mask, qty * price, 0.0)
+    new_cash = cash - (np.where(trade_mask, qty * price + fees, 0.0)).sum()
+
+    trades = [
+        {
+            "symbol": symbols[i],
+            "side": "BUY" if qty[i] > 0 else "SELL",
+            "qty": round(float(abs(qty[i])), 8),
+            "estPrice": round(float(price[i]), 2),
+            "notional": round(float(notional[i]), 2),
+            "estFee": round(float(fees[i]), 4),
+            "weightBefore": round(float(weight[i]) * 100, 2),
+            "weightAfter": round(float(new_value[i] / equity) * 100, 2) if equity > 0 else 0,
+        }
+        for i in np.flatnonzero(trade_mask)
+    ]
+    # Sells first so their proceeds are available for the buys
+    trades.sort(key=lambda t: t["side"] != "SELL")
+
+    sector_after = np.bincount(sector_idx, weights=new_value, minlength=len(sector_names))
+    return {
+        "trades": trades,
+        "summary": {
+            "equity": round(float(equity), 2),
+            "cashBefore": round(float(cash), 2),
+            "cashAfter": round(float(new_cash), 2),
+            "trades": len(trades),
+            "turnover": round(float(notional[trade_mask].sum()), 2),
+            "estFees": round(float(fees[trade_mask].sum()), 4),
+            "buyScale": round(float(scale), 4),
+            "sectorWeightsAfter": {
+                str(sector_names[k]): round(float(sector_after[k] / equity) * 100, 2) if equity > 0 else 0
+                for k in range(len(sector_names))
+            },
+        },
+    }
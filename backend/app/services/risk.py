@@ -0,0 +1,200 @@
+"""
+Risk Engine — Per-agent drawdown, exposure, concentration and VaR tracking.
+State is updated incrementally once per simulation tick (EWMA volatility, running peak),
+so every check is O(1) per agent regardless of how long the agent has been trading.
+"""
+import math
+from typing import Dict, Optional
+from app.services import shared_state
+
+# Default limits; per-agent overrides live in _limits
+RISK_LIMITS = {
+    "max_drawdown_pct": 25.0,  # auto-pause once equity falls this far below its peak
+    "max_position_pct": 60.0,  # reject buys that push one symbol above this share of equity
+    "max_gross_exposure_pct": 100.0,  # reject buys beyond this much invested equity
+    "max_var_pct": 10.0,  # reject buys while 1-tick 99% VaR exceeds this share of equity
+}
+EWMA_LAMBDA = 0.94  # RiskMetrics decay for per-tick return variance
+MIN_SHARPE_REFRESHES = 30  # market refreshes of returns before a Sharpe ratio is reported
+VAR_Z = {95: 1.645, 99: 2.326}
+
+_state: Dict[int, dict] = {}
+_limits: Dict[int, dict] = {}
+
+
+def _restore_state(state: dict):
+    _state.clear()
+    _state.update({int(k): v for k, v in state["state"].items()})
+    _limits.clear()
+    _limits.update({int(k): v for k, v in state["limits"].items()})
+
+
+shared_state.register("risk", lambda: {"state": _state, "limits": _limits}, _restore_state)
+
+
+def get_limits(agent_id: int) -> dict:
+    return {**RISK_LIMITS, **_limits.get(agent_id, {})}
+
+
+def set_limits(agent_id: int, **overrides) -> dict:
+    """Override one or more limits for an agent (None values are ignored)."""
+    current = _limits.setdefault(agent_id, {})
+    current.update({k: v for k, v in overrides.items() if v is not None and k in RISK_LIMITS})
+    return get_limits(agent_id)
+
+
+def _init_state(agent_id: int, equity: float, initial_capital: float) -> dict:
+    state = {
+        "equity": equity,
+        "peak": max(equity, initial_capital),
+        "drawdown_pct": 0.0,
+        "max_drawdown_pct": 0.0,
+        "variance": 0.0,
+        "refresh_equity": equity,  # equity at the last market refresh
+        "refreshes": 0,  # per-refresh returns folded into the moments below
+        "refresh_mean": 0.0,
+        "refresh_m2": 0.0,  # sum of squared deviations from the mean (Welford)
+        "gross_exposure": 0.0,
+        "max_position_value": 0.0,
+        "max_position_symbol": None,
+        "ticks": 0,
+        "breach": None,
+    }
+    _state[agent_id] = state
+    return state
+
+
+def update(agent_id: int, wallet: dict, gross_exposure: float, max_position: tuple,
+           refreshed: bool = True) -> Optional[str]:
+    """
+    Fold one tick's revalued wallet into the agent's risk state.
+    `max_position` is (symbol, value) of the largest holding, computed during revaluation.
+    `refreshed` says whether the tick saw new market prices; only those ticks add a return to
+    the Sharpe statistics, since between refreshes equity moves only by fees.
+    Returns a breach description if the drawdown limit was crossed, else None.
+    """
+    equity = wallet.get("total_value", 0)
+    state = _state.get(agent_id) or _init_state(agent_id, equity, wallet.get("initial_capital", equity))
+
+    prev = state["equity"]
+    if prev > 0 and state["ticks"] > 0:
+        r = equity / prev - 1
+        state["variance"] = EWMA_LAMBDA * state["variance"] + (1 - EWMA_LAMBDA) * r * r
+    if refreshed:
+        base = state.get("refresh_equity", prev)
+        if base > 0 and state["ticks"] > 0:
+            r = equity / base - 1
+            n = state["refreshes"] = state.get("refreshes", 0) + 1
+            delta = r - state.get("refresh_mean", 0.0)
+            state["refresh_mean"] = state.get("refresh_mean", 0.0) + delta / n
+            state["refresh_m2"] = state.get("refresh_m2", 0.0) + delta * (r - state["refresh_mean"])
+        state["refresh_equity"] = equity
+    state["equity"] = equity
+    state["ticks"] += 1
+    state["peak"] = max(state["peak"], equity)
+    state["drawdown_pct"] = (state["peak"] - equity) / state["peak"] * 100 if state["peak"] > 0 else 0.0
+    state["max_drawdown_pct"] = max(state["max_drawdown_pct"], state["drawdown_pct"])
+    state["gross_exposure"] = gross_exposure
+    state["max_position_symbol"], state["max_position_value"] = max_position
+
+    limit = get_limits(agent_id)["max_drawdown_pct"]
+    if state["drawdown_pct"] >= limit and not state["breach"]:
+        state["breach"] = f"Drawdown {state['drawdown_pct']:.1f}% breached {limit:.1f}% limit"
+        return state["breach"]
+    return None
+
+
+def clear_breach(agent_id: int):
+    """Reset the breach flag and peak (e.g. when a paused agent is manually resumed)."""
+    state = _state.get(agent_id)
+    if state:
+        state["breach"] = None
+        state["peak"] = state["equity"]
+        state["drawdown_pct"] = 0.0
+
+
+def value_at_risk(agent_id: int, confidence: int = 99) -> float:
+    """One-tick parametric VaR in dollars from the EWMA return volatility."""
+    state = _state.get(agent_id)
+    if not state:
+        return 0.0
+    return VAR_Z.get(confidence, VAR_Z[99]) * math.sqrt(state["variance"]) * state["equity"]
+
+
+def sharpe_ratio(agent_id: int) -> float:
+    """
+    Sharpe ratio of the agent's equity returns between market refreshes, over its whole tracked
+    history (mean / sample std, zero risk-free rate). Not annualized: scaling a few hours of
+    30-second returns up to a year only magnifies noise. 0 until MIN_SHARPE_REFRESHES returns.
+    """
+    state = _state.get(agent_id)
+    n = state.get("refreshes", 0) if state else 0
+    if n < MIN_SHARPE_REFRESHES:
+        return 0.0
+    std = math.sqrt(state["refresh_m2"] / (n - 1))
+    return state["refresh_mean"] / std if std > 0 else 0.0
+
+
+def check_order(agent_id: int, wallet: dict, symbol: str, notional: float,
+                committed: float = 0.0, committed_symbol: float = 0.0) -> tuple:
+    """
+    Pre-trade check for a buy of `notional` dollars.
+    `committed` is the notional of buys already accepted for the agent but not yet filled into the
+    wallet (`committed_symbol` the part of it in `symbol`), so several buys in one tick or one
+    rebalance share the headroom instead of each seeing all of it.
+    Returns (allowed_notional, reason): the order is clipped to the tightest limit, or
+    rejected (0) if there's no headroom at all.
+    """
+    state = _state.get(agent_id)
+    equity = wallet.get("total_value", 0)
+    if not state or equity <= 0:
+        return (notional, None)
+    limits = get_limits(agent_id)
+
+    if state["breach"]:
+        return (0.0, state["breach"])
+    if value_at_risk(agent_id) / equity * 100 > limits["max_var_pct"]:
+        return (0.0, f"VaR above {limits['max_var_pct']:.1f}% of equity")
+
+    pos = wallet["positions"].get(symbol)
+    pos_value = (pos["qty"] * pos["currentPrice"] if pos else 0.0) + committed_symbol
+    # Holdings as of the wallet's last revaluation, which out-of-band fills also update
+    gross = max(equity - wallet["cash"], 0.0) + committed
+    headroom = min(
+        equity * limits["max_position_pct"] / 100 - pos_value,
+        equity * limits["max_gross_exposure_pct"] / 100 - gross,
+    )
+    if headroom <= 0:
+        return (0.0, f"{symbol} concentration/exposure limit reached")
+    if notional > headroom:
+        return (headroom, f"Clipped to {symbol} concentration/exposure limit")
+    return (notional, None)
+
+
+def get_risk_report(agent_id: int) -> dict:
+    state = _state.get(agent_id)
+    limits = get_limits(agent_id)
+    if not state:
+        return {"agentId": agent_id, "limits": limits, "tracked": False}
+    equity = state["equity"]
+    return {
+        "agentId": agent_id,
+        "tracked": True,
+        "equity": round(equity, 2),
+        "peakEquity": round(state["peak"], 2),
+        "drawdownPct": round(state["drawdown_pct"], 2),
+        "maxDrawdownPct": round(state["max_drawdown_pct"], 2),
+        "grossExposure": round(state["gross_exposure"], 2),
+        "grossExposurePct": round(state["gross_exposure"] / equity * 100, 2) if equity > 0 else 0,
+        "largestPosition": {
+            "symbol": state["max_position_symbol"],
+            "value": round(state["max_position_value"], 2),
+            "pct": round(state["max_position_value"] / equity * 100, 2) if equity > 0 else 0,
+        },
+        "tickVolatilityPct": round(math.sqrt(state["variance"]) * 100, 4),
+        "var95": round(value_at_risk(agent_id, 95), 2),
+        "var99": round(value_at_risk(agent_id, 99), 2),
+        "sharpe": round(sharpe_ratio(agent_id), 3),
+        "breach": state["breach"],
+        "limits": limits,
+    }
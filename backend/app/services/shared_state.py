@@ -0,0 +1,262 @@
+"""
+Shared State — Single-writer / many-reader state publication over shared memory.
+In a multi-worker deployment one "writer" process runs market polling and the simulation
+and publishes a JSON snapshot of all live state into a `multiprocessing.shared_memory`
+segment after every tick and every mutating request. Any number of read-only "reader"
+API workers map the same segment and swap the decoded snapshot into their module globals,
+so reads never cross a process boundary and scale with the number of workers.
+
+The segment starts with a seqlock header (seq, length, published_at, flags): the writer bumps
+seq to odd before copying the payload and to even afterwards; readers retry until they see the
+same even seq before and after their copy. The payload is a small JSON directory
+({key: [version, offset, length]}) followed by one JSON section per provider. Providers that
+supply a version are only re-encoded when it changes, and readers only decode sections whose
+version differs from the one they applied, so slow-moving state costs nothing per tick.
+
+A snapshot that doesn't fit the segment is not published: the writer sets the overflow flag,
+and writer and readers report themselves stale (see /api/health) until a snapshot fits again.
+
+Roles come from AGENTFI_ROLE: "standalone" (default, no shared memory), "writer" or "reader".
+"""
+import asyncio
+import json
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.services.log import get_logger
+
+ROLE = os.getenv("AGENTFI_ROLE", "standalone").lower()
+SHM_NAME = os.getenv("AGENTFI_SHM_NAME", "agentfi_state")
+SHM_SIZE = int(os.getenv("AGENTFI_SHM_SIZE", str(64 * 1024 * 1024)))
+WRITER_URL = os.getenv("AGENTFI_WRITER_URL", "http://127.0.0.1:8001")
+STALE_AFTER = float(os.getenv("AGENTFI_STALE_AFTER", "60"))  # seconds without a new snapshot
+SEQ_HEADER = "X-AgentFi-State-Seq"
+
+HEADER = struct.Struct("<QQdQ")  # seq, payload length, published_at, flags
+FLAGS_OFFSET = 24
+FLAG_OVERFLOW = 1  # the latest snapshot didn't fit; the published one is stale
+DIRECTORY = struct.Struct("<I")  # directory length, then the directory JSON
+HEADER_SIZE = 64  # payload starts on its own cache line
+READ_RETRIES = 1000
+
+log = get_logger("shared_state")
+
+# {key: (export, restore, version, decode)}: each module contributes its own section of the snapshot
+_providers: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None], Optional[Callable[[], Any]], bool]] = {}
+_encoded: Dict[str, Tuple[Any, bytes]] = {}  # writer: last (version, JSON bytes) per section
+_applied: Dict[str, Any] = {}  # reader: version of each section last restored
+_shm: Optional[shared_memory.SharedMemory] = None
+_seq = 0  # writer: last published seq; reader: last applied seq
+_published_at = 0.0
+_overflow = False
+_epoch = f"{os.getpid()}.{time.time():.0f}"  # versions are prefixed with it, so a restarted writer's can't collide
+
+
+def register(key: str, export: Callable[[], Any], restore: Callable[[Any], None],
+             version: Optional[Callable[[], Any]] = None, decode: bool = True):
+    """
+    `export()` returns JSON-serializable state (or already-encoded JSON bytes); `restore(value)`
+    installs it in a reader. `version()` must change whenever export() would; without it the
+    section is re-encoded on every publish. decode=False hands restore() the raw JSON bytes so
+    it can defer decoding until the data is first used.
+    """
+    _providers[key] = (export, restore, version, decode)
+
+
+def is_writer() -> bool:
+    return ROLE == "writer"
+
+
+def is_reader() -> bool:
+    return ROLE == "reader"
+
+
+def _open(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """Open untracked: the resource tracker would otherwise unlink the segment when any process exits."""
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+# ── Writer ──────────────────────────────────────────────────
+def start_writer():
+    """Create (or reuse) the segment. Reusing keeps already-running readers attached."""
+    global _shm, _seq
+    try:
+        _shm = _open(SHM_NAME, create=True, size=SHM_SIZE)
+        _seq = 0
+    except FileExistsError:
+        _shm = _open(SHM_NAME)
+        if _shm.size < SHM_SIZE:
+            _shm.close()
+            unlink()
+            _shm = _open(SHM_NAME, create=True, size=SHM_SIZE)
+            _seq = 0
+        else:
+            _seq = HEADER.unpack_from(_shm.buf, 0)[0] + 1 & ~1
+    log.info("Publishing state to shared memory %s (%d MB)", SHM_NAME, _shm.size // (1024 * 1024))
+    publish()
+
+
+def _encode(key: str, export: Callable[[], Any], version: Optional[Callable[[], Any]]) -> Tuple[Any, bytes]:
+    current = version() if version else None
+    cached = _encoded.get(key)
+    if current is None or cached is None or cached[0] != current:
+        data = export()
+        if not isinstance(data, bytes):
+            data = json.dumps(data, separators=(",", ":"), default=str).encode()
+        cached = _encoded[key] = (f"{_epoch}:{_seq + 2 if current is None else current}", data)
+    return cached
+
+
+def publish() -> int:
+    """Snapshot every registered provider into the segment. No-op unless this is the writer."""
+    global _seq, _published_at, _overflow
+    if _shm is None or not is_writer():
+        return 0
+    directory, sections, offset = {}, [], 0
+    for key, (export, _, version, _) in _providers.items():
+        v, data = _encode(key, export, version)
+        directory[key] = [v, offset, len(data)]
+        sections.append(data)
+        offset += len(data)
+    index = json.dumps(directory, separators=(",", ":"), default=str).encode()
+    length = DIRECTORY.size + len(index) + offset
+    buf = _shm.buf
+    if HEADER_SIZE + length > _shm.size:
+        if not _overflow:
+            sizes = ", ".join(f"{k}={d[2]}" for k, d in sorted(directory.items(), key=lambda i: -i[1][2]))
+            log.error("State snapshot (%d bytes: %s) exceeds AGENTFI_SHM_SIZE (%d); readers are stale",
+                      length, sizes, _shm.size)
+        _overflow = True
+        struct.pack_into("<Q", buf, FLAGS_OFFSET, FLAG_OVERFLOW)
+        return _seq
+    _overflow = False
+    struct.pack_into("<Q", buf, 0, _seq + 1)  # odd: write in progress
+    pos = HEADER_SIZE
+    DIRECTORY.pack_into(buf, pos, len(index))
+    pos += DIRECTORY.size
+    for data in (index, *sections):
+        buf[pos:pos + len(data)] = data
+        pos += len(data)
+    _seq += 2
+    _published_at = time.time()
+    HEADER.pack_into(buf, 0, _seq - 1, length, _published_at, 0)
+    struct.pack_into("<Q", buf, 0, _seq)
+    return _seq
+
+
+def close():
+    """Detach from the segment. It is left in place so a restarted writer reuses it."""
+    global _shm
+    if _shm is not None:
+        _shm.close()
+        _shm = None
+
+
+def unlink():
+    """Remove the segment (the launcher calls this once every process has exited)."""
+    try:
+        shm = _open(SHM_NAME)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+# ── Reader ──────────────────────────────────────────────────
+def start_reader() -> bool:
+    """Attach to the writer's segment; False if the writer hasn't created it yet."""
+    global _shm
+    if _shm is not None:
+        return True
+    try:
+        _shm = _open(SHM_NAME)
+    except FileNotFoundError:
+        return False
+    log.info("Attached to shared memory %s", SHM_NAME)
+    return True
+
+
+def sync() -> int:
+    """Apply the latest published snapshot if it's newer than ours; returns the applied seq."""
+    global _seq, _published_at, _overflow
+    if _shm is None and not start_reader():
+        return _seq
+    buf = _shm.buf
+    _overflow = bool(struct.unpack_from("<Q", buf, FLAGS_OFFSET)[0] & FLAG_OVERFLOW)
+    for _ in range(READ_RETRIES):
+        seq = struct.unpack_from("<Q", buf, 0)[0]
+        if seq == _seq:
+            return _seq
+        if seq & 1:
+            time.sleep(0.0001)
+            continue
+        _, length, published_at, _ = HEADER.unpack_from(buf, 0)
+        payload = bytes(buf[HEADER_SIZE:HEADER_SIZE + length])
+        if struct.unpack_from("<Q", buf, 0)[0] != seq:
+            continue  # torn read: the writer published mid-copy
+        index_len = DIRECTORY.unpack_from(payload, 0)[0]
+        start = DIRECTORY.size + index_len
+        directory = json.loads(payload[DIRECTORY.size:start])
+        for key, (_, restore, _, decode) in _providers.items():
+            if key not in directory or _applied.get(key) == directory[key][0]:
+                continue
+            version, offset, size = directory[key]
+            data = payload[start + offset:start + offset + size]
+            restore(json.loads(data) if decode else data)
+            _applied[key] = version
+        _seq, _published_at = seq, published_at
+        return _seq
+    log.warning("Gave up reading shared state after %d retries", READ_RETRIES)
+    return _seq
+
+
+async def wait_for(seq: int, timeout: float = 1.0) -> bool:
+    """Read-your-writes: wait until a snapshot at least as new as `seq` has been applied."""
+    deadline = time.monotonic() + timeout
+    while sync() < seq:
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.002)
+    return True
+
+
+async def follow(interval: float = 0.1):
+    """Reader background task: pick up new snapshots as the writer publishes them."""
+    while True:
+        try:
+            sync()
+        except Exception:
+            log.exception("Applying shared state failed")
+        await asyncio.sleep(interval)
+
+
+def is_stale() -> bool:
+    """True while this process serves state the writer has moved past (or can't publish)."""
+    if is_writer():
+        return _overflow
+    if is_reader():
+        return _overflow or _shm is None or time.time() - _published_at > STALE_AFTER
+    return False
+
+
+def get_status() -> dict:
+    return {
+        "role": ROLE,
+        "segment": SHM_NAME if _shm is not None else None,
+        "seq": _seq,
+        "publishedAt": _published_at or None,
+        "ageSeconds": round(time.time() - _published_at, 1) if _published_at else None,
+        "overflow": _overflow,
+        "stale": is_stale(),
+        "providers": list(_providers),
+        "sectionBytes": {k: len(data) for k, (_, data) in _encoded.items()},
+    }
@@ -3,45 +3,278 @@ Trading Simulator — Gives each AI agent virtual funds to simulate trades.
 Uses real market data from CoinGecko and persists all data to disk.
 """
 import asyncio
-import random
+import heapq
+import itertools
+import json
 import time
-from typing import Dict, List
-from app.services.market_data import MarketDataService
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, List, Optional, Set
+import numpy as np
+from app.services.market_data import MarketDataService, STOCK_SYMBOLS
+from app.services.ai_engine import compute_indicators, PortfolioAnalyzer
+from app.services.strategies import get_strategy
+from app.services.order_book import MatchingEngine, aggregate_fills
+from app.services import risk, profiler, shared_state
+from app.services.alerts import get_alert_engine
+from app.services.candles import get_candle_builder
+from app.services.chat_context import build_snapshot
+from app.services.covariance import CovarianceEngine
+from app.services.leaderboard import Leaderboard
+from app.services.metrics import timer, record_cache, TICK_DURATION, PERSIST_DURATION, AGENTS, POSITIONS
 from app.services.persistence import save_wallets, load_wallets, save_trades, load_trades
+from app.services.log import get_logger
+from app.services.stock_history import get_stock_history
 
 market_service = MarketDataService()
+exchange = MatchingEngine()
+log = get_logger("simulator")
 
 # Virtual wallets for each agent
 _wallets: Dict[int, dict] = {}
 _trade_history: Dict[int, List[dict]] = {}
+_trades_dirty: Set[int] = set()  # agents whose history changed since it was last published
+_trades_version = 0
+_trade_fragments: Dict[int, bytes] = {}  # writer: each agent's history as published JSON
+_pending_trades: Optional[bytes] = None  # reader: published history, decoded on first use
 _agent_statuses: Dict[int, str] = {}  # {agent_id: "active"/"paused"}
+_agent_symbols: Dict[int, List[str]] = {}  # {agent_id: resolved symbols from asset_focus}
+_symbol_agents: Dict[str, Set[int]] = {}  # {symbol: agent ids subscribed to it (focus or held)}
+_symbol_traders: Dict[str, Set[int]] = {}  # {symbol: active agent ids trading it}
+_price_history: Dict[str, Deque[float]] = {}  # {symbol: prices seen at each market refresh}
+_indicators: Dict[str, dict] = {}  # {symbol: shared indicator state for strategy plugins}
+_last_market_update: float = 0
+HISTORY_LEN = 200
+_status_listeners: List[Callable[[Dict[int, str]], None]] = []
+_agent_directory: Callable[[], List[dict]] = list  # provides agent configs (id, name, ...)
+_chat_snapshot: dict = {}  # rebuilt once per tick for the chat handlers
+_covariance = CovarianceEngine()  # EWMA return covariance across symbols, one update per market refresh
+_portfolio = PortfolioAnalyzer(risk_model=_covariance.portfolio_risk)  # aggregated holdings, synced with each snapshot
+_covariance.on_update(_portfolio.invalidate)
+_leaderboard = Leaderboard()  # agents ranked by pnl / pnlPct / winRate / sharpe, synced with each snapshot
+_tick_metrics: dict = {}  # orders / fills / rejects / notional from the last tick
 _is_running = False
+_background: Set[asyncio.Task] = set()  # startup work that runs alongside the ticks (held so it isn't collected)
 _save_counter = 0  # Save every N ticks to avoid excessive disk I/O
 
 
 def set_agent_status(agent_id: int, status: str):
     """Called by agents route when toggling."""
     _agent_statuses[agent_id] = status
+    if status == "active":
+        risk.clear_breach(agent_id)
+    if agent_id in _wallets:
+        _index_agent(agent_id)
+        _chat_snapshot.clear()
+
+
+def add_status_listener(callback: Callable[[Dict[int, str]], None]):
+    """
+    Register a callback for status changes the simulator makes itself (e.g. risk auto-pause).
+    It is called once per tick with every change made in it, as {agent_id: status}.
+    """
+    _status_listeners.append(callback)
+
+
+def set_agent_directory(provider: Callable[[], List[dict]]):
+    """Register the source of agent configs (names) used when building chat snapshots."""
+    global _agent_directory
+    _agent_directory = provider
+
+
+def get_chat_snapshot() -> dict:
+    """Latest chat context snapshot; built on demand if no tick has produced one yet."""
+    record_cache("chat_snapshot", bool(_chat_snapshot))
+    if not _chat_snapshot:
+        _refresh_chat_snapshot()
+    return _chat_snapshot
+
+
+def _refresh_chat_snapshot():
+    global _chat_snapshot
+    _leaderboard.sync({
+        agent_id: (
+            w.get("pnl", 0),
+            w.get("pnl_pct", 0),
+            round((w.get("wins", 0) / max(w.get("trades_count", 0), 1)) * 100, 1),
+            round(risk.sharpe_ratio(agent_id), 3),
+        )
+        for agent_id, w in _wallets.items()
+    })
+    _chat_snapshot = build_snapshot(_wallets, get_recent_trades(10), _agent_directory(), _leaderboard)
+    _portfolio.sync({h["name"]: h["value"] for h in _chat_snapshot["holdings"]})
+
+
+def get_covariance_engine() -> CovarianceEngine:
+    return _covariance
+
+
+def get_leaderboard() -> Leaderboard:
+    """Agents ranked by each performance metric as of the latest snapshot."""
+    get_chat_snapshot()
+    return _leaderboard
+
+
+def get_portfolio_analyzer() -> PortfolioAnalyzer:
+    """Aggregated live holdings (all agents' positions + cash) with incremental analysis."""
+    get_chat_snapshot()
+    return _portfolio
+
+
+def _auto_pause(agent_id: int, reason: str):
+    _agent_statuses[agent_id] = "paused"
+    _index_agent(agent_id)
+    log.warning("Agent #%d auto-paused: %s", agent_id, reason, extra={"agentId": agent_id, "rate_key": agent_id})
+
+
+def update_agent_config(agent_id: int, strategy: str = None, asset: str = None):
+    """Called by agents route when an agent's strategy or asset focus changes."""
+    wallet = _wallets.get(agent_id)
+    if not wallet:
+        return
+    if strategy:
+        wallet["strategy"] = strategy
+    if asset:
+        wallet["asset_focus"] = asset
+    _index_agent(agent_id)
+
+
+# ── Symbol → agents index ───────────────────────────────────
+
+def resolve_symbols(asset_focus: str) -> List[str]:
+    """Map an agent's asset focus description to the symbols it trades."""
+    if "BTC" in asset_focus or "Crypto" in asset_focus:
+        return ["BTC", "ETH", "SOL"]
+    elif "AAPL" in asset_focus or "Stock" in asset_focus:
+        return ["AAPL", "NVDA", "MSFT"]
+    return ["BTC", "ETH", "AAPL", "NVDA"]
+
+
+def _unindex_agent(agent_id: int):
+    for symbol in _agent_symbols.pop(agent_id, []):
+        _symbol_agents.get(symbol, set()).discard(agent_id)
+        _symbol_traders.get(symbol, set()).discard(agent_id)
+
+
+def _index_agent(agent_id: int):
+    """
+    (Re)index one agent; paused agents stay subscribed for pricing but leave the trading set.
+    Positions outside the asset focus (left by an asset change or a rebalance) stay subscribed,
+    so they keep being marked to market, until they are closed.
+    """
+    _unindex_agent(agent_id)
+    wallet = _wallets.get(agent_id)
+    if not wallet:
+        return
+    focus = resolve_symbols(wallet.get("asset_focus", ""))
+    symbols = focus + [s for s in wallet["positions"] if s not in focus]
+    _agent_symbols[agent_id] = symbols
+    active = _agent_statuses.get(agent_id, "active") == "active"
+    for symbol in symbols:
+        _symbol_agents.setdefault(symbol, set()).add(agent_id)
+    if active:
+        for symbol in focus:
+            _symbol_traders.setdefault(symbol, set()).add(agent_id)
+
+
+def _rebuild_index():
+    _agent_symbols.clear()
+    _symbol_agents.clear()
+    _symbol_traders.clear()
+    for agent_id in _wallets:
+        _index_agent(agent_id)
+
+
+def _export_state() -> dict:
+    return {
+        "wallets": _wallets,
+        "statuses": _agent_statuses,
+        "indicators": _indicators,
+        "tickMetrics": _tick_metrics,
+    }
+
+
+def _restore_state(state: dict):
+    """Reader workers: install the writer's published state (JSON keys come back as strings)."""
+    global _wallets, _agent_statuses, _indicators, _tick_metrics
+    _wallets = {int(k): v for k, v in state["wallets"].items()}
+    _agent_statuses = {int(k): v for k, v in state["statuses"].items()}
+    _indicators = state["indicators"]
+    _tick_metrics = state["tickMetrics"]
+    _rebuild_index()
+    _chat_snapshot.clear()
+
+
+def _touch_trades(agent_ids):
+    global _trades_version
+    _trades_dirty.update(agent_ids)
+    _trades_version += 1
+
+
+def _export_trades() -> bytes:
+    """Trade history as JSON, re-encoding only the agents that traded since the last export."""
+    for agent_id in _trades_dirty:
+        _trade_fragments[agent_id] = json.dumps(_trade_history.get(agent_id, []), separators=(",", ":"),
+                                                default=str).encode()
+    _trades_dirty.clear()
+    return b"{" + b",".join(b'"%d":%s' % (a, _trade_fragments.get(a) or b"[]") for a in _trade_history) + b"}"
+
+
+def _restore_trades(data: bytes):
+    global _pending_trades
+    _pending_trades = data
+    _chat_snapshot.clear()
+
+
+def _histories() -> Dict[int, List[dict]]:
+    """All trade histories; in a reader, decodes the latest published history the first time it's needed."""
+    global _trade_history, _pending_trades
+    if _pending_trades is not None:
+        _trade_history = {int(k): v for k, v in json.loads(_pending_trades).items()}
+        _pending_trades = None
+    return _trade_history
+
+
+# Trade history and covariance change on their own schedule, so they are separate sections
+shared_state.register("simulator", _export_state, _restore_state)
+shared_state.register("trades", _export_trades, _restore_trades, version=lambda: _trades_version, decode=False)
+shared_state.register("covariance", _covariance.to_dict, _covariance.load, version=lambda: _covariance.updates)
+
+
+def get_symbol_agents(symbol: str, active_only: bool = False) -> Set[int]:
+    """Agent ids subscribed to (or, with active_only, actively trading) a symbol."""
+    index = _symbol_traders if active_only else _symbol_agents
+    return index.get(symbol, set())
 
 
 def initialize_agent_wallet(agent_id: int, capital: float, strategy: str, asset: str):
     """Give an agent virtual currency to start trading."""
-    _wallets[agent_id] = {
-        "initial_capital": capital,
-        "cash": capital,
-        "positions": {},
-        "total_value": capital,
-        "pnl": 0,
-        "pnl_pct": 0,
-        "trades_count": 0,
-        "wins": 0,
-        "losses": 0,
-        "strategy": strategy,
-        "asset_focus": asset,
-        "last_trade": None,
-        "started_at": time.time(),
-    }
-    _trade_history[agent_id] = []
+    initialize_agent_wallets([(agent_id, capital, strategy, asset)])
+
+
+def initialize_agent_wallets(specs: List[tuple]):
+    """Bulk form of initialize_agent_wallet: (agent_id, capital, strategy, asset) tuples, persisted once."""
+    now = time.time()
+    for agent_id, capital, strategy, asset in specs:
+        _wallets[agent_id] = {
+            "initial_capital": capital,
+            "cash": capital,
+            "positions": {},
+            "total_value": capital,
+            "pnl": 0,
+            "pnl_pct": 0,
+            "trades_count": 0,
+            "wins": 0,
+            "losses": 0,
+            "strategy": strategy,
+            "asset_focus": asset,
+            "last_trade": None,
+            "started_at": now,
+        }
+        _trade_history[agent_id] = []
+        _index_agent(agent_id)
+    _touch_trades(agent_id for agent_id, *_ in specs)
+    _chat_snapshot.clear()
     _persist()
 
 
@@ -50,20 +283,73 @@ def get_wallet(agent_id: int) -> dict:
 
 
 def get_trade_history(agent_id: int) -> List[dict]:
-    return _trade_history.get(agent_id, [])
+    return _histories().get(agent_id, [])
 
 
 def get_all_wallets() -> Dict[int, dict]:
     return _wallets
 
 
+def get_recent_trades(limit: int = 10, agent_id: int = None, symbol: str = None,
+                      successful_only: bool = True) -> List[dict]:
+    """
+    True latest `limit` trades across agents, newest first.
+    Each agent's history is already time-ordered, so this is a lazy k-way heap merge
+    over the k history tails: O(k + limit·log k) instead of concatenating and sorting.
+    """
+    if agent_id is not None:
+        sources = {agent_id: _histories().get(agent_id, [])}
+    else:
+        sources = _histories()
+    streams = [
+        ((aid, t) for t in reversed(history))
+        for aid, history in sources.items() if history
+    ]
+    merged = heapq.merge(*streams, key=lambda item: -item[1]["timestamp"])
+    if successful_only:
+        merged = (item for item in merged if item[1].get("success"))
+    if symbol:
+        symbol = symbol.upper()
+        merged = (item for item in merged if item[1]["symbol"] == symbol)
+    return [{**t, "agentId": aid} for aid, t in itertools.islice(merged, limit)]
+
+
+def get_indicators(symbol: str) -> dict:
+    return _indicators.get(symbol, {})
+
+
+def _update_indicators(price_map: Dict[str, float]) -> bool:
+    """
+    Fold a new market refresh into the per-symbol history and recompute indicators once per symbol.
+    Returns whether there was a new refresh to fold in.
+    """
+    global _last_market_update
+    last_update = market_service.get_last_update()
+    if last_update == _last_market_update:
+        return False
+    _last_market_update = last_update
+    _covariance.update(price_map)
+    alerts = get_alert_engine()
+    for symbol, price in price_map.items():
+        if not price or price <= 0:
+            continue
+        history = _price_history.setdefault(symbol, deque(maxlen=HISTORY_LEN))
+        history.append(price)
+        if symbol in _symbol_agents or alerts.watched_fields(symbol) - {"price"}:
+            _indicators[symbol] = compute_indicators(list(history))
+    alerts.evaluate(price_map, _indicators, last_update)
+    return True
+
+
 def _persist():
-    """Save wallets and trades to disk."""
+    """Save wallets, trades and changed alert rules to disk."""
     try:
-        save_wallets(_wallets)
-        save_trades(_trade_history)
-    except Exception as e:
-        print(f"[Persistence] save error: {e}")
+        with timer(PERSIST_DURATION):
+            save_wallets(_wallets)
+            save_trades(_trade_history)
+            get_alert_engine().flush()
+    except Exception:
+        log.exception("Persisting wallets/trades/alerts failed")
 
 
 def _load_from_disk():
@@ -73,29 +359,29 @@ def _load_from_disk():
     loaded_trades = load_trades()
     if loaded_wallets:
         _wallets = loaded_wallets
-        print(f"[Simulator] Loaded {len(_wallets)} agent wallets from disk")
+        log.info("Loaded %d agent wallets from disk", len(_wallets))
     if loaded_trades:
         _trade_history = loaded_trades
-        print(f"[Simulator] Loaded trade history for {len(_trade_history)} agents")
+        log.info("Loaded trade history for %d agents", len(_trade_history))
+        _touch_trades(_trade_history)
+    _rebuild_index()
+    _chat_snapshot.clear()
 
 
-def _execute_trade(agent_id: int, symbol: str, action: str, qty: float, price: float):
-    """Execute a simulated trade for an agent."""
-    wallet = _wallets.get(agent_id)
-    if not wallet:
-        return
-
+def _apply_fill(wallet: dict, symbol: str, action: str, qty: float, price: float, fee: float, now: float) -> dict:
+    """Validate one fill against the wallet's cash/position and apply it. No revaluation here."""
     trade = {
-        "timestamp": time.time(),
+        "timestamp": now,
         "symbol": symbol,
         "action": action,
         "qty": round(qty, 6),
         "price": round(price, 2),
         "value": round(qty * price, 2),
+        "fee": round(fee, 4),
     }
 
     if action == "BUY":
-        cost = qty * price
+        cost = qty * price + fee
         if wallet["cash"] >= cost:
             wallet["cash"] -= cost
             pos = wallet["positions"].get(symbol, {"qty": 0, "avgEntry": 0, "currentPrice": price})
@@ -114,9 +400,9 @@ def _execute_trade(agent_id: int, symbol: str, action: str, qty: float, price: f
     elif action == "SELL":
         pos = wallet["positions"].get(symbol)
         if pos and pos["qty"] >= qty:
-            revenue = qty * price
+            revenue = qty * price - fee
             wallet["cash"] += revenue
-            pnl = (price - pos["avgEntry"]) * qty
+            pnl = (price - pos["avgEntry"]) * qty - fee
             if pnl > 0:
                 wallet["wins"] += 1
             else:
@@ -133,78 +419,229 @@ def _execute_trade(agent_id: int, symbol: str, action: str, qty: float, price: f
             trade["success"] = False
             trade["reason"] = "Insufficient position"
 
-    # Update portfolio value
-    positions_value = sum(
-        p["qty"] * p["currentPrice"] for p in wallet["positions"].values()
-    )
+    return trade
+
+
+def _apply_batch(batch: Dict[int, List[tuple]], metrics: dict):
+    """
+    Apply one tick's fills in a single pass per agent.
+    `batch` maps agent_id -> [(symbol, action, qty, price, fee), ...]; sells are applied
+    first so their proceeds can fund the same tick's buys. Revaluation happens once afterwards.
+    """
+    now = time.time()
+    for agent_id, fills in batch.items():
+        wallet = _wallets.get(agent_id)
+        if not wallet:
+            continue
+        fills.sort(key=lambda f: f[1] != "SELL")
+        trades = [_apply_fill(wallet, *f, now) for f in fills]
+        for t in trades:
+            if t["success"]:
+                metrics["fills"] += 1
+                metrics["notional"] += t["value"]
+                metrics["fees"] += t["fee"]
+            else:
+                metrics["rejects"] += 1
+        wallet["last_trade"] = trades[-1]
+
+        history = _trade_history.setdefault(agent_id, [])
+        history.extend(trades)
+        if len(history) > 100:
+            del history[:-100]
+
+        # A position opened outside the subscribed symbols or one just closed changes the subscriptions
+        subscribed = _agent_symbols.get(agent_id, ())
+        if any(f[0] not in subscribed or f[0] not in wallet["positions"] for f in fills):
+            _index_agent(agent_id)
+    if batch:
+        _touch_trades(batch)
+
+
+def _revalue(wallet: dict) -> tuple:
+    """Mark a wallet to market; returns (gross exposure, (largest symbol, its value)) for the risk engine."""
+    positions_value = 0.0
+    largest = (None, 0.0)
+    for sym, p in wallet["positions"].items():
+        value = p["qty"] * p.get("currentPrice", 0)
+        positions_value += value
+        if value > largest[1]:
+            largest = (sym, value)
     wallet["total_value"] = round(wallet["cash"] + positions_value, 2)
     wallet["pnl"] = round(wallet["total_value"] - wallet["initial_capital"], 2)
     wallet["pnl_pct"] = round((wallet["pnl"] / wallet["initial_capital"]) * 100, 2) if wallet["initial_capital"] > 0 else 0
-    wallet["last_trade"] = trade
-
-    if agent_id not in _trade_history:
-        _trade_history[agent_id] = []
-    _trade_history[agent_id].append(trade)
-    _trade_history[agent_id] = _trade_history[agent_id][-100:]
+    return positions_value, largest
+
+
+def execute_orders(agent_id: int, orders: List[dict]) -> dict:
+    """
+    Submit out-of-band orders (e.g. a rebalance plan) for one agent through the matching
+    engine and apply the fills with the same batch path the tick loop uses.
+    `orders` are {"symbol", "side", "qty"} dicts; each is a market order at the last polled price.
+    Only active agents can trade. Buys pass the same risk gate as the tick (and may be clipped by
+    it); sells are clamped to the held quantity and go first so their proceeds fund the buys, which
+    are capped to the cash left at their worst-case cost.
+    """
+    wallet = _wallets.get(agent_id)
+    if not wallet:
+        return {"error": "Agent wallet not found"}
+    if _agent_statuses.get(agent_id, "active") != "active":
+        return {"error": f"Agent #{agent_id} is paused"}
+    price_map = {p["symbol"]: p["price"] for p in market_service.get_all_prices()}
+    metrics = {"timestamp": time.time(), "orders": 0, "fills": 0, "rejects": 0, "riskRejects": 0, "notional": 0.0, "fees": 0.0}
+    batch: Dict[int, List[tuple]] = defaultdict(list)
+    committed: Dict[str, float] = defaultdict(float)  # buy notional already accepted, by symbol
+    available = wallet["cash"]  # plus sell proceeds, minus buys' worst-case cost (fees and slippage included)
+    for o in sorted(orders, key=lambda o: o["side"] != "SELL"):
+        ref_price = price_map.get(o["symbol"])
+        if not ref_price or ref_price <= 0:
+            metrics["rejects"] += 1
+            continue
+        book = exchange.book(o["symbol"])
+        qty = o["qty"]
+        if o["side"] == "SELL":
+            qty = min(qty, wallet["positions"].get(o["symbol"], {}).get("qty", 0.0))
+            if qty <= 0:
+                metrics["rejects"] += 1
+                continue
+        else:
+            notional, _ = risk.check_order(agent_id, wallet, o["symbol"], qty * ref_price,
+                                           sum(committed.values()), committed[o["symbol"]])
+            if notional < 10:
+                metrics["riskRejects"] += 1
+                continue
+            qty = notional / ref_price
+            cost = book.buy_cost_bound(qty, ref_price)
+            if cost > available:
+                qty *= max(available, 0.0) / cost * (1 - 1e-9)
+                if qty * ref_price < 10:
+                    metrics["rejects"] += 1
+                    continue
+                cost = book.buy_cost_bound(qty, ref_price)
+            committed[o["symbol"]] += qty * ref_price
+            available -= cost
+        metrics["orders"] += 1
+        fills = book.submit_market(agent_id, o["side"], qty, ref_price)
+        for (_, side), f in aggregate_fills(fills).items():
+            batch[agent_id].append((o["symbol"], side, f["qty"], f["price"], f["fee"]))
+            if side == "SELL":
+                available += f["qty"] * f["price"] - f["fee"]
+    _apply_batch(batch, metrics)
+    _revalue(wallet)
+    _chat_snapshot.clear()
+    return {**metrics, "notional": round(metrics["notional"], 2), "fees": round(metrics["fees"], 4)}
+
+
+def get_tick_metrics() -> dict:
+    """Batch metrics from the most recent simulation tick."""
+    return _tick_metrics
 
 
 async def run_simulation_tick():
     """One tick of the simulation loop."""
-    global _save_counter
+    global _save_counter, _tick_metrics
     prices = market_service.get_all_prices()
     if not prices:
         return
 
     price_map = {p["symbol"]: p["price"] for p in prices}
-
-    for agent_id, wallet in _wallets.items():
-        # Skip paused agents — only update prices, don't trade
-        status = _agent_statuses.get(agent_id, "active")
-        strategy = wallet["strategy"]
-        asset_focus = wallet["asset_focus"]
-
-        if "BTC" in asset_focus or "Crypto" in asset_focus:
-            symbols = ["BTC", "ETH", "SOL"]
-        elif "AAPL" in asset_focus or "Stock" in asset_focus:
-            symbols = ["AAPL", "NVDA", "MSFT"]
-        else:
-            symbols = ["BTC", "ETH", "AAPL", "NVDA"]
-
-        for symbol in symbols:
-            current_price = price_map.get(symbol)
-            if not current_price or current_price <= 0:
-                continue
-
-            if symbol in wallet["positions"]:
-                wallet["positions"][symbol]["currentPrice"] = current_price
-
-            # Don't trade if agent is paused
-            if status != "active":
-                continue
-
-            should_buy, should_sell, qty_factor = _decide(strategy, wallet, symbol, current_price)
-
-            if should_buy and wallet["cash"] > 100:
-                buy_amount = wallet["cash"] * qty_factor * random.uniform(0.5, 1.0)
-                qty = buy_amount / current_price
-                if qty * current_price >= 10:
-                    _execute_trade(agent_id, symbol, "BUY", qty, current_price)
-
-            elif should_sell and symbol in wallet["positions"]:
-                pos = wallet["positions"].get(symbol)
-                if pos:
-                    sell_qty = pos["qty"] * qty_factor * random.uniform(0.5, 1.0)
-                    if sell_qty * current_price >= 10:
-                        _execute_trade(agent_id, symbol, "SELL", sell_qty, current_price)
-
-    # Refresh total values
+    refreshed = _update_indicators(price_map)
+
+    metrics = {"timestamp": time.time(), "orders": 0, "fills": 0, "rejects": 0, "riskRejects": 0, "notional": 0.0, "fees": 0.0}
+    batch: Dict[int, List[tuple]] = defaultdict(list)
+    committed: Dict[int, float] = defaultdict(float)  # buy notional accepted this tick, for the risk gate
+    reserved: Dict[int, float] = defaultdict(float)  # cash earmarked for those buys, fees and slippage included
+
+    # Only symbols with subscribers are visited, and each only touches its own agents
+    for symbol, subscribers in _symbol_agents.items():
+        current_price = price_map.get(symbol)
+        if not current_price or current_price <= 0:
+            continue
+
+        for agent_id in subscribers:
+            pos = _wallets[agent_id]["positions"].get(symbol)
+            if pos:
+                pos["currentPrice"] = current_price
+
+        # Paused agents are not in the trading set; group the rest by strategy
+        by_strategy = defaultdict(list)
+        for agent_id in _symbol_traders.get(symbol, ()):
+            by_strategy[_wallets[agent_id]["strategy"]].append(agent_id)
+
+        ind = _indicators.get(symbol)
+        book = exchange.book(symbol)
+        orders = []
+        for strategy, agent_ids in by_strategy.items():
+            wallets = [_wallets[a] for a in agent_ids]
+            cash = np.fromiter(
+                (w["cash"] - reserved[a] for a, w in zip(agent_ids, wallets)),
+                dtype=float, count=len(wallets),
+            )
+            pos_qty = np.fromiter(
+                (w["positions"][symbol]["qty"] if symbol in w["positions"] else 0.0 for w in wallets),
+                dtype=float, count=len(wallets),
+            )
+            buy_mask, sell_mask, qty_factor = get_strategy(strategy).decide_batch(ind, cash, pos_qty)
+
+            for i in np.flatnonzero(buy_mask):
+                notional = float(cash[i] * qty_factor[i])
+                if notional < 10:
+                    continue
+                notional, _ = risk.check_order(agent_ids[i], wallets[i], symbol, notional, committed[agent_ids[i]])
+                if notional < 10:
+                    metrics["riskRejects"] += 1
+                    continue
+                qty = notional / current_price
+                # A buy that could be rejected for funds at apply time would strand the agents it
+                # crossed with (their fills stand), so it must be affordable at its worst fill
+                cost = book.buy_cost_bound(qty, current_price)
+                if cost > cash[i]:
+                    qty *= float(cash[i]) / cost * (1 - 1e-9)
+                    notional = qty * current_price
+                    if notional < 10:
+                        continue
+                    cost = book.buy_cost_bound(qty, current_price)
+                orders.append({"agent_id": agent_ids[i], "side": "BUY", "qty": qty})
+                committed[agent_ids[i]] += notional
+                reserved[agent_ids[i]] += cost
+
+            for i in np.flatnonzero(sell_mask):
+                sell_qty = float(pos_qty[i] * qty_factor[i])
+                if sell_qty * current_price >= 10:
+                    orders.append({"agent_id": agent_ids[i], "side": "SELL", "qty": sell_qty})
+
+        # Agents cross each other in the book first; the rest pays external slippage
+        if orders:
+            metrics["orders"] += len(orders)
+            fills = exchange.match_orders(symbol, current_price, orders)
+            for (agent_id, side), f in aggregate_fills(fills).items():
+                batch[agent_id].append((symbol, side, f["qty"], f["price"], f["fee"]))
+
+    _apply_batch(batch, metrics)
+
+    # Single revaluation pass after all fills are applied, feeding the risk engine
+    open_positions = 0
+    paused: Dict[int, str] = {}
     for agent_id, wallet in _wallets.items():
-        positions_value = sum(
-            p["qty"] * p.get("currentPrice", 0) for p in wallet["positions"].values()
-        )
-        wallet["total_value"] = round(wallet["cash"] + positions_value, 2)
-        wallet["pnl"] = round(wallet["total_value"] - wallet["initial_capital"], 2)
-        wallet["pnl_pct"] = round((wallet["pnl"] / wallet["initial_capital"]) * 100, 2) if wallet["initial_capital"] > 0 else 0
+        open_positions += len(wallet["positions"])
+        gross, largest = _revalue(wallet)
+        breach = risk.update(agent_id, wallet, gross, largest, refreshed)
+        if breach and _agent_statuses.get(agent_id, "active") == "active":
+            _auto_pause(agent_id, breach)
+            paused[agent_id] = "paused"
+    if paused:  # one notification per tick, so listeners persist once however many agents paused
+        for callback in _status_listeners:
+            callback(paused)
+
+    _refresh_chat_snapshot()
+
+    active = sum(1 for a in _wallets if _agent_statuses.get(a, "active") == "active")
+    AGENTS.set(active, status="active")
+    AGENTS.set(len(_wallets) - active, status="paused")
+    POSITIONS.set(open_positions)
+
+    metrics["notional"] = round(metrics["notional"], 2)
+    metrics["fees"] = round(metrics["fees"], 4)
+    _tick_metrics = metrics
 
     # Auto-save every 3 ticks (30 seconds)
     _save_counter += 1
@@ -213,46 +650,26 @@ async def run_simulation_tick():
         _save_counter = 0
 
 
-def _decide(strategy: str, wallet: dict, symbol: str, price: float) -> tuple:
-    """Strategy-specific trade decision."""
-    pos = wallet["positions"].get(symbol)
-
-    if strategy == "Trend Following":
-        r = random.random()
-        if r < 0.15:
-            return (True, False, 0.25)
-        elif r > 0.88 and pos:
-            return (False, True, 0.3)
-        return (False, False, 0)
-
-    elif strategy == "Volatility Breakout":
-        r = random.random()
-        if r < 0.12:
-            return (True, False, 0.35)
-        elif r > 0.90 and pos:
-            return (False, True, 0.5)
-        return (False, False, 0)
-
-    elif strategy == "Mean Reversion":
-        r = random.random()
-        if r < 0.10:
-            return (True, False, 0.20)
-        elif r > 0.92 and pos:
-            return (False, True, 0.4)
-        return (False, False, 0)
-
-    elif strategy == "High Frequency":
-        r = random.random()
-        if r < 0.25:
-            return (True, False, 0.15)
-        elif r > 0.78 and pos:
-            return (False, True, 0.6)
-        return (False, False, 0)
-
-    else:
-        if random.random() < 0.08:
-            return (True, False, 0.10)
-        return (False, False, 0)
+async def _seed_stock_history(days: int = 180):
+    """
+    Backfill the stocks' 1d candles with daily bars, so daily charts and indicators are warm
+    from the start. The intraday price history that drives the strategies isn't touched: its
+    points are market refreshes, and daily closes mixed in would skew every indicator window.
+    """
+    try:
+        history = await get_stock_history().get_history(STOCK_SYMBOLS, days)
+    except Exception:
+        log.exception("Seeding stock history failed")
+        return
+    builder = get_candle_builder()
+    today = datetime.now(timezone.utc).date().isoformat()  # today's bar is still forming from live quotes
+    for symbol, bars in history.items():
+        builder.seed(symbol, "1d", np.array([
+            (datetime.fromisoformat(b["date"]).replace(tzinfo=timezone.utc).timestamp(),
+             b["open"], b["high"], b["low"], b["close"], b["volume"])
+            for b in bars if b["date"] < today
+        ], dtype=float).reshape(-1, 6))
+    log.info("Seeded daily candles for %d stocks", sum(1 for bars in history.values() if bars))
 
 
 async def start_simulation_loop():
@@ -262,6 +679,10 @@ async def start_simulation_loop():
 
     # Load persisted data from disk first
     _load_from_disk()
+    # Daily bars come over the network; ticks don't need them, so they don't wait on the fetch
+    task = asyncio.create_task(_seed_stock_history())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
 
     # Initialize default agents only if nothing was loaded
     if not _wallets:
@@ -273,11 +694,13 @@ async def start_simulation_loop():
         ]
         for agent_id, capital, strategy, asset in _default_agents:
             initialize_agent_wallet(agent_id, capital, strategy, asset)
-        print("[Simulator] Initialized 4 default agents with virtual funds")
+        log.info("Initialized %d default agents with virtual funds", len(_default_agents))
 
     while _is_running:
         try:
-            await run_simulation_tick()
-        except Exception as e:
-            print(f"[Simulator] tick error: {e}")
+            with timer(TICK_DURATION), profiler.capture("tick"):
+                await run_simulation_tick()
+        except Exception:
+            log.exception("Simulation tick failed")
+        shared_state.publish()
         await asyncio.sleep(10)
@@ -0,0 +1,214 @@
+"""
+Stock History — Daily OHLCV bars for stocks behind a pluggable provider.
+Bars are cached on disk per symbol together with the date range they cover, so a request
+only fetches the dates that aren't cached yet. Many symbols are fetched concurrently in
+bounded batches. Providers: "yahoo" (v8 chart API, default) and "fixture" (local CSV files
+or a deterministic synthetic series, for tests and offline runs). Select with AGENTFI_STOCK_PROVIDER.
+"""
+import asyncio
+import csv
+import hashlib
+import math
+import os
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.services.log import get_logger
+from app.services.metrics import timer, FETCH_LATENCY, FETCH_ERRORS
+from app.services.persistence import save_bars, load_bars
+
+MAX_CONCURRENCY = 8  # symbols fetched at once
+FETCH_TIMEOUT = 15
+INTRADAY_TTL = 900  # seconds before today's still-forming bar is refetched
+
+log = get_logger("stock_history")
+
+Bar = dict  # {"date": "YYYY-MM-DD", "open", "high", "low", "close", "volume"}
+Range = Tuple[date, date]
+
+
+# ── Providers ───────────────────────────────────────────────
+class HistoryProvider:
+    name = "base"
+
+    async def fetch_daily(self, client: httpx.AsyncClient, symbol: str, start: date, end: date) -> List[Bar]:
+        raise NotImplementedError
+
+
+class YahooChartProvider(HistoryProvider):
+    name = "yahoo"
+    URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+    async def fetch_daily(self, client, symbol, start, end):
+        params = {
+            "period1": int(datetime(start.year, start.month, start.day, tzinfo=timezone.utc).timestamp()),
+            "period2": int(datetime(end.year, end.month, end.day, 23, 59, tzinfo=timezone.utc).timestamp()),
+            "interval": "1d",
+        }
+        try:
+            with timer(FETCH_LATENCY, provider="yahoo", endpoint="chart"):
+                resp = await client.get(self.URL.format(symbol=symbol), params=params,
+                                        headers={"User-Agent": "Mozilla/5.0"})
+                resp.raise_for_status()
+                result = resp.json()["chart"]["result"][0]
+        except Exception:
+            FETCH_ERRORS.inc(provider="yahoo", endpoint="chart")
+            raise
+
+        quote = result["indicators"]["quote"][0]
+        bars = []
+        for i, ts in enumerate(result.get("timestamp") or []):
+            close = quote["close"][i]
+            if close is None:  # halted / partial rows
+                continue
+            bars.append({
+                "date": datetime.fromtimestamp(ts, timezone.utc).date().isoformat(),
+                "open": round(quote["open"][i] or close, 4),
+                "high": round(quote["high"][i] or close, 4),
+                "low": round(quote["low"][i] or close, 4),
+                "close": round(close, 4),
+                "volume": quote["volume"][i] or 0,
+            })
+        return bars
+
+
+class FixtureProvider(HistoryProvider):
+    """
+    Reads `<dir>/<SYMBOL>.csv` (date,open,high,low,close,volume) when present; otherwise
+    generates deterministic weekday bars seeded by the symbol, so results are stable.
+    """
+    name = "fixture"
+
+    def __init__(self, fixtures_dir: Optional[str] = None, base_price: float = 100.0):
+        self.fixtures_dir = fixtures_dir or os.getenv("AGENTFI_FIXTURES_DIR")
+        self.base_price = base_price
+
+    async def fetch_daily(self, client, symbol, start, end):
+        path = os.path.join(self.fixtures_dir, f"{symbol}.csv") if self.fixtures_dir else None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                rows = list(csv.DictReader(f))
+            return [
+                {"date": r["date"], **{k: float(r[k]) for k in ("open", "high", "low", "close")},
+                 "volume": int(float(r.get("volume") or 0))}
+                for r in rows if start.isoformat() <= r["date"] <= end.isoformat()
+            ]
+        return self._synthetic(symbol, start, end)
+
+    def _synthetic(self, symbol: str, start: date, end: date) -> List[Bar]:
+        # Each day's bar depends only on (symbol, date) so overlapping ranges agree
+        seed = int(hashlib.md5(symbol.encode()).hexdigest()[:8], 16)
+        bars = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                rng = random.Random(seed * 100_003 + day.toordinal())
+                trend = math.sin(day.toordinal() / 40 + seed % 7) * 0.3
+                close = self.base_price * (1 + (seed % 50) / 10) * math.exp(trend)
+                open_ = close * (1 + rng.gauss(0, 0.01))
+                bars.append({
+                    "date": day.isoformat(),
+                    "open": round(open_, 4),
+                    "high": round(max(open_, close) * (1 + abs(rng.gauss(0, 0.005))), 4),
+                    "low": round(min(open_, close) * (1 - abs(rng.gauss(0, 0.005))), 4),
+                    "close": round(close, 4),
+                    "volume": rng.randint(1_000_000, 50_000_000),
+                })
+            day += timedelta(days=1)
+        return bars
+
+
+PROVIDERS = {"yahoo": YahooChartProvider, "fixture": FixtureProvider}
+
+
+# ── Cached history service ──────────────────────────────────
+def _missing_ranges(cached: dict, start: date, end: date) -> List[Range]:
+    """Date ranges in [start, end] not covered by the cached [from, to] span."""
+    if not cached.get("from"):
+        return [(start, end)]
+    covered_from, covered_to = date.fromisoformat(cached["from"]), date.fromisoformat(cached["to"])
+    ranges = []
+    if start < covered_from:
+        ranges.append((start, min(end, covered_from - timedelta(days=1))))
+    if end > covered_to:
+        ranges.append((max(start, covered_to + timedelta(days=1)), end))
+    return ranges
+
+
+class StockHistoryService:
+    def __init__(self, provider: Optional[HistoryProvider] = None):
+        self.provider = provider or PROVIDERS[os.getenv("AGENTFI_STOCK_PROVIDER", "yahoo")]()
+        self._cache: Dict[str, dict] = {}  # symbol -> {"from", "to", "bars"}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _cached(self, symbol: str) -> dict:
+        if symbol not in self._cache:
+            self._cache[symbol] = load_bars(symbol) or {"from": None, "to": None, "bars": []}
+        return self._cache[symbol]
+
+    async def _fill(self, client: httpx.AsyncClient, symbol: str, start: date, end: date):
+        """Fetch whatever part of [start, end] isn't cached and merge it in."""
+        async with self._locks.setdefault(symbol, asyncio.Lock()):
+            cached = self._cached(symbol)
+            ranges = _missing_ranges(cached, start, end)
+            if ranges and ranges[-1][0] >= date.today() and time.time() - cached.get("fetchedAt", 0) < INTRADAY_TTL:
+                ranges.pop()  # only today's bar is missing and it was fetched recently
+            if not ranges:
+                return
+            fetched: List[Bar] = []
+            try:
+                for lo, hi in ranges:
+                    fetched.extend(await self.provider.fetch_daily(client, symbol, lo, hi))
+            except Exception as e:
+                log.warning("History fetch failed, serving cached bars: %s", e,
+                            extra={"provider": self.provider.name, "rate_key": symbol})
+                return
+            by_date = {b["date"]: b for b in cached["bars"]}
+            by_date.update({b["date"]: b for b in fetched})
+            # Today's bar is still forming, so coverage stops at yesterday and it is refetched
+            covered_to = min(end, date.today() - timedelta(days=1))
+            cached["from"] = min(start, date.fromisoformat(cached["from"])).isoformat() if cached["from"] else start.isoformat()
+            cached["to"] = max(covered_to, date.fromisoformat(cached["to"])).isoformat() if cached["to"] else covered_to.isoformat()
+            cached["bars"] = [by_date[d] for d in sorted(by_date)]
+            cached["fetchedAt"] = time.time()
+            await asyncio.to_thread(save_bars, symbol, cached)
+
+    async def get_history(self, symbols: List[str], days: int = 90) -> Dict[str, List[Bar]]:
+        """Daily bars for the last `days` calendar days per symbol, fetching only what's missing."""
+        end = date.today()
+        start = end - timedelta(days=days)
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+        async def fill(client, symbol):
+            async with sem:
+                await self._fill(client, symbol, start, end)
+
+        async with httpx.AsyncClient(timeout=FETCH_TIMEOUT) as client:
+            await asyncio.gather(*(fill(client, s) for s in symbols))
+
+        lo, hi = start.isoformat(), end.isoformat()
+        return {s: [b for b in self._cached(s)["bars"] if lo <= b["date"] <= hi] for s in symbols}
+
+    async def get_closes(self, symbol: str, days: int = 90) -> List[float]:
+        bars = (await self.get_history([symbol], days))[symbol]
+        return [b["close"] for b in bars]
+
+
+_service: Optional[StockHistoryService] = None
+
+
+def get_stock_history() -> StockHistoryService:
+    global _service
+    if _service is None:
+        _service = StockHistoryService()
+    return _service
+
+
+def set_provider(provider: HistoryProvider):
+    """Swap the provider (e.g. FixtureProvider in tests) with a fresh in-memory cache."""
+    global _service
+    _service = StockHistoryService(provider)
@@ -0,0 +1,246 @@
+"""
+Strategy Plugins — Indicator-driven trade decisions for the simulator.
+Each plugin reads the shared per-symbol indicator state (see ai_engine.compute_indicators)
+and emits a buy/sell decision plus a sizing factor, either for one agent or for every
+agent running that strategy at once. Backtests take the signal for every bar of a series at
+once from indicator columns (see ai_engine.compute_indicator_series).
+"""
+import numpy as np
+from typing import Dict, Optional, Tuple
+from app.services.ai_engine import score_indicators
+
+MIN_CASH = 100  # agents below this cash level don't open new positions
+
+_registry: Dict[str, "Strategy"] = {}
+
+
+def register_strategy(name: str):
+    """Class decorator that instantiates a plugin and registers it under `name`."""
+    def wrapper(cls):
+        _registry[name] = cls()
+        cls.name = name
+        return cls
+    return wrapper
+
+
+def get_strategy(name: str) -> "Strategy":
+    """Look up a strategy plugin, falling back to the composite AI signal."""
+    return _registry.get(name) or _registry["default"]
+
+
+def list_strategies() -> Dict[str, dict]:
+    return {name: dict(s.params) for name, s in _registry.items()}
+
+
+class Strategy:
+    """
+    Base plugin. Subclasses implement `signal()`, which maps indicators to a
+    (buy_strength, sell_strength) pair in [0, 1]; sizing and masking are shared.
+    """
+    name = "default"
+    min_history = 30
+    params: Dict[str, float] = {"buy_size": 0.10, "sell_size": 0.30}
+
+    def __init__(self, params: Optional[Dict[str, float]] = None):
+        self.params = {**type(self).params, **(params or {})}
+
+    def signal(self, ind: dict) -> Tuple[float, float]:
+        raise NotImplementedError
+
+    def signal_series(self, cols: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        signal() at every bar of indicator columns (NaN where compute_indicators reports None).
+        Plugins override this with array expressions; the fallback calls signal() bar by bar.
+        """
+        names = list(cols)
+        rows = zip(*(cols[f].tolist() for f in names))
+        pairs = [self.signal({f: None if v != v else v for f, v in zip(names, row)}) for row in rows]
+        return np.array([b for b, _ in pairs], dtype=float), np.array([s for _, s in pairs], dtype=float)
+
+    def _strengths(self, ind: Optional[dict]) -> Tuple[float, float]:
+        if not ind or ind.get("length", 0) < self.min_history:
+            return (0.0, 0.0)
+        return self.signal(ind)
+
+    def strengths_series(self, cols: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """(buy, sell) strengths per bar, zero until the series has `min_history` bars."""
+        early = cols["length"] < self.min_history
+        with np.errstate(invalid="ignore", divide="ignore"):
+            buy, sell = self.signal_series(cols)
+        return np.where(early, 0.0, buy), np.where(early, 0.0, sell)
+
+    def decide(self, ind: Optional[dict], cash: float, pos_qty: float) -> Tuple[bool, bool, float]:
+        """Single-agent decision: (should_buy, should_sell, qty_factor)."""
+        return self.decide_strengths(*self._strengths(ind), cash, pos_qty)
+
+    def decide_strengths(self, buy: float, sell: float, cash: float, pos_qty: float) -> Tuple[bool, bool, float]:
+        """decide() for already computed signal strengths."""
+        if buy > 0 and cash > MIN_CASH:
+            return (True, False, self.params["buy_size"] * buy)
+        if sell > 0 and pos_qty > 0:
+            return (False, True, self.params["sell_size"] * sell)
+        return (False, False, 0)
+
+    def decide_batch(self, ind: Optional[dict], cash: np.ndarray, pos_qty: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Batched decision for every agent on this strategy/symbol.
+        The signal is evaluated once; per-agent eligibility is applied with masks.
+        """
+        buy, sell = self._strengths(ind)
+        buy_mask = (cash > MIN_CASH) if buy > 0 else np.zeros(len(cash), dtype=bool)
+        sell_mask = (pos_qty > 0) & ~buy_mask if sell > 0 else np.zeros(len(cash), dtype=bool)
+        qty_factor = np.where(
+            buy_mask, self.params["buy_size"] * buy,
+            np.where(sell_mask, self.params["sell_size"] * sell, 0.0),
+        )
+        return buy_mask, sell_mask, qty_factor
+
+
+def _scale(value: float, threshold: float) -> float:
+    """Strength in [0.5, 1] growing with how far `value` exceeds `threshold`."""
+    if threshold <= 0:
+        return 1.0
+    return float(min(max(value / (2 * threshold), 0.5), 1.0))
+
+
+def _scale_series(value: np.ndarray, threshold: float) -> np.ndarray:
+    """_scale over an array."""
+    if threshold <= 0:
+        return np.ones(len(value))
+    return np.minimum(np.maximum(value / (2 * threshold), 0.5), 1.0)
+
+
+def _present(col: np.ndarray) -> np.ndarray:
+    """Bars where an optional indicator is truthy (not None and not zero)."""
+    return ~np.isnan(col) & (col != 0)
+
+
+def _score_series(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """ai_engine.score_indicators per bar, adding the terms in the same order."""
+    rsi, price, mom = cols["rsi"], cols["currentPrice"], cols["momentum"]
+    sma20 = cols["sma20"]
+    sma50 = np.where(_present(cols["sma50"]), cols["sma50"], sma20)  # the `sma50 or sma20` callers pass
+    has20, has50 = _present(sma20), _present(sma50)
+    score = np.select([rsi < 30, rsi > 70, rsi < 45, rsi > 55], [1.0, -1.0, 0.3, -0.3], 0.0)
+    score = score + np.where(has20, np.where(price > sma20, 0.5, -0.5), 0.0)
+    score = score + np.where(has20 & has50, np.where(sma20 > sma50, 0.5, -0.5), 0.0)
+    return score + np.select([mom > 5, mom < -5], [0.5, -0.5], 0.0)
+
+
+@register_strategy("default")
+class CompositeSignal(Strategy):
+    """Trades on the weighted RSI/SMA/momentum score from the AI engine."""
+    params = {"buy_score": 0.5, "sell_score": -0.5, "buy_size": 0.10, "sell_size": 0.30}
+
+    def signal(self, ind):
+        score, _ = score_indicators(ind["rsi"], ind["sma20"], ind["sma50"] or ind["sma20"],
+                                    ind["momentum"], ind["currentPrice"])
+        p = self.params
+        if score >= p["buy_score"]:
+            return (_scale(score, p["buy_score"]), 0.0)
+        if score <= p["sell_score"]:
+            return (0.0, _scale(-score, -p["sell_score"]))
+        return (0.0, 0.0)
+
+    def signal_series(self, cols):
+        score = _score_series(cols)
+        p = self.params
+        buy = score >= p["buy_score"]
+        sell = ~buy & (score <= p["sell_score"])
+        return (np.where(buy, _scale_series(score, p["buy_score"]), 0.0),
+                np.where(sell, _scale_series(-score, -p["sell_score"]), 0.0))
+
+
+@register_strategy("Trend Following")
+class TrendFollowing(Strategy):
+    """Buys price above a rising SMA20 with positive momentum; exits when the trend breaks."""
+    params = {"mom_buy": 1.0, "mom_sell": -1.0, "buy_size": 0.25, "sell_size": 0.30}
+
+    def signal(self, ind):
+        p = self.params
+        price, sma20 = ind["currentPrice"], ind["sma20"]
+        sma50 = ind["sma50"] or sma20
+        if price > sma20 >= sma50 and ind["momentum"] > p["mom_buy"]:
+            return (_scale(ind["momentum"], p["mom_buy"]), 0.0)
+        if price < sma20 or ind["momentum"] < p["mom_sell"]:
+            return (0.0, _scale(-ind["momentum"], -p["mom_sell"]))
+        return (0.0, 0.0)
+
+    def signal_series(self, cols):
+        p = self.params
+        price, sma20, mom = cols["currentPrice"], cols["sma20"], cols["momentum"]
+        sma50 = np.where(_present(cols["sma50"]), cols["sma50"], sma20)
+        buy = (price > sma20) & (sma20 >= sma50) & (mom > p["mom_buy"])
+        sell = ~buy & ((price < sma20) | (mom < p["mom_sell"]))
+        return (np.where(buy, _scale_series(mom, p["mom_buy"]), 0.0),
+                np.where(sell, _scale_series(-mom, -p["mom_sell"]), 0.0))
+
+
+@register_strategy("Mean Reversion")
+class MeanReversion(Strategy):
+    """Buys stretched-down prices (low z-score and RSI); sells once price reverts above the mean."""
+    min_history = 20
+    params = {"z_entry": 1.5, "z_exit": 0.5, "rsi_buy": 35, "rsi_sell": 65, "buy_size": 0.20, "sell_size": 0.40}
+
+    def signal(self, ind):
+        p = self.params
+        if ind["zscore"] < -p["z_entry"] and ind["rsi"] < p["rsi_buy"]:
+            return (_scale(-ind["zscore"], p["z_entry"]), 0.0)
+        if ind["zscore"] > p["z_exit"] or ind["rsi"] > p["rsi_sell"]:
+            return (0.0, 1.0)
+        return (0.0, 0.0)
+
+    def signal_series(self, cols):
+        p = self.params
+        z, rsi = cols["zscore"], cols["rsi"]
+        buy = (z < -p["z_entry"]) & (rsi < p["rsi_buy"])
+        sell = ~buy & ((z > p["z_exit"]) | (rsi > p["rsi_sell"]))
+        return np.where(buy, _scale_series(-z, p["z_entry"]), 0.0), np.where(sell, 1.0, 0.0)
+
+
+@register_strategy("Volatility Breakout")
+class VolatilityBreakout(Strategy):
+    """Buys closes above the 20-period channel high when volatility is elevated; sells below the low."""
+    min_history = 21
+    params = {"min_volatility": 10.0, "buy_size": 0.35, "sell_size": 0.50}
+
+    def signal(self, ind):
+        price, high, low = ind["currentPrice"], ind["channelHigh"], ind["channelLow"]
+        if high is None or low is None:
+            return (0.0, 0.0)
+        if price > high and ind["volatility"] >= self.params["min_volatility"]:
+            return (1.0, 0.0)
+        if price < low:
+            return (0.0, 1.0)
+        return (0.0, 0.0)
+
+    def signal_series(self, cols):
+        price, high, low = cols["currentPrice"], cols["channelHigh"], cols["channelLow"]
+        channel = ~np.isnan(high) & ~np.isnan(low)
+        buy = channel & (price > high) & (cols["volatility"] >= self.params["min_volatility"])
+        sell = channel & ~buy & (price < low)
+        return np.where(buy, 1.0, 0.0), np.where(sell, 1.0, 0.0)
+
+
+@register_strategy("High Frequency")
+class HighFrequency(Strategy):
+    """Scalps short-horizon momentum over the last few refreshes."""
+    min_history = 4
+    params = {"mom_buy": 0.2, "mom_sell": -0.2, "buy_size": 0.15, "sell_size": 0.60}
+
+    def signal(self, ind):
+        p = self.params
+        mom = ind["momentumShort"]
+        if mom > p["mom_buy"]:
+            return (_scale(mom, p["mom_buy"]), 0.0)
+        if mom < p["mom_sell"]:
+            return (0.0, _scale(-mom, -p["mom_sell"]))
+        return (0.0, 0.0)
+
+    def signal_series(self, cols):
+        p = self.params
+        mom = cols["momentumShort"]
+        buy = mom > p["mom_buy"]
+        sell = ~buy & (mom < p["mom_sell"])
+        return (np.where(buy, _scale_series(mom, p["mom_buy"]), 0.0),
+                np.where(sell, _scale_series(-mom, -p["mom_sell"]), 0.0))
@@ -0,0 +1,291 @@
+"""
+Strategy Sweep — Grid or random search over strategy parameters, backtested on historical daily closes.
+Indicators don't depend on parameters, so they are computed once per series and saved with the
+prices as .npy files that pool workers memory-map read-only: every backtest reads the columns of
+one shared copy instead of receiving pickled arrays, and takes its strategy's signal for all bars
+in one vectorized pass. Superseded series files are kept for SERIES_GRACE seconds after their last
+use so sweeps still running on them can finish. Each (strategy, params, series) backtest is cached on disk
+under a hash of its inputs, so repeated or overlapping sweeps only run what they haven't seen.
+Configurations rank by average return, worst drawdown or average Sharpe ratio across series.
+"""
+import glob
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services import workers
+from app.services.ai_engine import compute_indicator_series
+from app.services.market_data import get_sector
+from app.services.order_book import get_market_config
+from app.services.persistence import SWEEP_DIR, append_sweep_cache, save_sweep_cache, load_sweep_cache
+from app.services.projection import daily_closes
+from app.services.strategies import get_strategy, list_strategies
+
+INITIAL_CAPITAL = 10_000.0
+MIN_NOTIONAL = 10  # same order floor as the simulator
+MIN_BARS = 60  # daily closes a series needs to be backtested
+MAX_CONFIGS = 2_000
+DEFAULT_SAMPLES = 100
+DEFAULT_SPAN = (0.5, 2.0)  # random-search range around each default when no ranges are given
+MAX_CACHE = 200_000  # cached backtests kept on disk, oldest dropped first
+COMPACT_AT = MAX_CACHE * 3 // 2  # rewrite the cache log once it holds this many entries
+BACKTEST_VERSION = 1  # bump when backtest semantics change so old cache entries miss
+RANK_KEYS = {"return": ("returnPct", True), "drawdown": ("maxDrawdownPct", False), "sharpe": ("sharpe", True)}
+INDICATOR_FIELDS = tuple(compute_indicator_series(np.ones(1)))  # column order of the series files
+SERIES_DIR = os.path.join(SWEEP_DIR, "series")
+SERIES_GRACE = 3600  # seconds an unused, superseded series file is kept before it is removed
+
+_cache: Optional[Dict[str, dict]] = None
+_logged = 0  # entries in the on-disk log, including superseded and evicted ones
+_cache_lock = threading.Lock()
+_series_cols: Dict[str, Dict[str, np.ndarray]] = {}  # per worker: path -> memory-mapped indicator columns
+
+
+# ── Parameter spaces ────────────────────────────────────────
+def build_configs(strategy: str, grid: Optional[Dict[str, List[float]]] = None,
+                  ranges: Optional[Dict[str, List[float]]] = None, samples: int = DEFAULT_SAMPLES,
+                  seed: Optional[int] = None) -> List[dict]:
+    """
+    Parameter overrides to test: the cartesian product of `grid`, or `samples` uniform draws from
+    `ranges` ({param: [low, high]}). With neither, draws span DEFAULT_SPAN around each default.
+    """
+    strategies = list_strategies()
+    if strategy not in strategies:
+        raise ValueError(f"Unknown strategy '{strategy}'")
+    defaults = strategies[strategy]
+    unknown = set(grid or {}) | set(ranges or {})
+    unknown -= set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {strategy}: {', '.join(sorted(unknown))}")
+
+    if grid:
+        if math.prod(len(v) for v in grid.values()) > MAX_CONFIGS:
+            raise ValueError(f"Grid has more than {MAX_CONFIGS} combinations")
+        keys = list(grid)
+        return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+    if samples > MAX_CONFIGS:
+        raise ValueError(f"At most {MAX_CONFIGS} samples per sweep")
+    if not ranges:
+        ranges = {k: sorted((v * DEFAULT_SPAN[0], v * DEFAULT_SPAN[1])) for k, v in defaults.items()}
+    rng = random.Random(seed)
+    return [{k: round(rng.uniform(lo, hi), 4) for k, (lo, hi) in ranges.items()} for _ in range(samples)]
+
+
+# ── Series ──────────────────────────────────────────────────
+async def load_series(symbols: List[str]) -> Tuple[List[dict], List[str]]:
+    """Daily closes per symbol with its trading cost and periods per year; short histories are skipped."""
+    closes = await daily_closes(symbols)
+    series, skipped = [], []
+    for symbol in symbols:
+        by_date = closes.get(symbol, {})
+        if len(by_date) < MIN_BARS:
+            skipped.append(symbol)
+            continue
+        config = get_market_config(symbol)
+        series.append({
+            "symbol": symbol,
+            "closes": [by_date[d] for d in sorted(by_date)],
+            "costBps": config["taker_bps"] + config["spread_bps"],
+            "periodsPerYear": 365 if get_sector(symbol) == "Crypto" else 252,
+        })
+    return series, skipped
+
+
+def _write_series(symbol: str, closes: List[float]) -> Tuple[str, str]:
+    """
+    Save prices + indicator columns under a content hash (reused while the closes are unchanged).
+    Using a file refreshes its mtime; other digests of the symbol unused for SERIES_GRACE are removed.
+    """
+    prices = np.asarray(closes, dtype=float)
+    digest = hashlib.sha1(prices.tobytes()).hexdigest()[:16]
+    path = os.path.join(SERIES_DIR, f"{symbol}-{digest}.npy")
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        os.makedirs(SERIES_DIR, exist_ok=True)
+        indicators = compute_indicator_series(prices)
+        tmp = os.path.join(SERIES_DIR, f"{symbol}-{digest}.tmp.npy")
+        np.save(tmp, np.column_stack([indicators[f] for f in INDICATOR_FIELDS]))
+        os.replace(tmp, path)
+    cutoff = time.time() - SERIES_GRACE
+    for old in glob.glob(os.path.join(SERIES_DIR, f"{symbol}-*.npy")):
+        try:
+            if old != path and os.path.getmtime(old) < cutoff:
+                os.remove(old)
+        except FileNotFoundError:
+            pass  # collected by a concurrent sweep
+    return path, digest
+
+
+# ── Backtest (runs in pool workers) ─────────────────────────
+def _load_series(path: str) -> Dict[str, np.ndarray]:
+    """Indicator columns of a series file: read-only views of its memory map, opened once per worker."""
+    if path not in _series_cols:
+        if len(_series_cols) >= 64:
+            _series_cols.clear()
+        data = np.load(path, mmap_mode="r")
+        _series_cols[path] = {f: data[:, j] for j, f in enumerate(INDICATOR_FIELDS)}
+    return _series_cols[path]
+
+
+def backtest(strategy, cols: Dict[str, np.ndarray], cost_bps: float, periods_per_year: int) -> dict:
+    """
+    One wallet trading one series by the simulator's rules: decide() on every bar, orders below
+    MIN_NOTIONAL skipped, fills at the bar's price with half-spread + taker fee (`cost_bps`).
+    The signal doesn't depend on the wallet, so it is computed for all bars up front.
+    """
+    cost = cost_bps / 10_000
+    cash, qty, entry = INITIAL_CAPITAL, 0.0, 0.0
+    trades = wins = sells = 0
+    strengths = strategy.strengths_series(cols)
+    prices = cols["currentPrice"].tolist()
+    equity = np.empty(len(prices))
+    for i, (buy_strength, sell_strength, price) in enumerate(zip(*(s.tolist() for s in strengths), prices)):
+        buy, sell, factor = strategy.decide_strengths(buy_strength, sell_strength, cash, qty)
+        if buy:
+            notional = min(cash * factor, cash / (1 + cost))
+            if notional >= MIN_NOTIONAL:
+                bought = notional / price
+                entry = (entry * qty + price * (1 + cost) * bought) / (qty + bought)
+                qty += bought
+                cash -= notional * (1 + cost)
+                trades += 1
+        elif sell:
+            sold = min(qty * factor, qty)
+            if sold * price >= MIN_NOTIONAL:
+                cash += sold * price * (1 - cost)
+                wins += price * (1 - cost) > entry
+                sells += 1
+                trades += 1
+                qty -= sold
+                if qty <= 0.0001:
+                    qty = 0.0
+        equity[i] = cash + qty * price
+
+    returns = np.diff(equity) / equity[:-1]
+    std = float(returns.std()) if returns.size else 0.0
+    return {
+        "returnPct": round((float(equity[-1]) / INITIAL_CAPITAL - 1) * 100, 3),
+        "maxDrawdownPct": round(float((1 - equity / np.maximum.accumulate(equity)).max()) * 100, 3),
+        "sharpe": round(float(returns.mean()) / std * math.sqrt(periods_per_year), 3) if std > 0 else 0.0,
+        "trades": trades,
+        "winRatePct": round(wins / sells * 100, 1) if sells else None,
+    }
+
+
+def _run_batch(strategy_name: str, configs: List[dict], series: List[tuple]) -> List[List[dict]]:
+    """Backtest each config on each (path, cost_bps, periods_per_year) series."""
+    cls = type(get_strategy(strategy_name))
+    return [
+        [backtest(cls(params), _load_series(path), cost_bps, periods) for path, cost_bps, periods in series]
+        for params in configs
+    ]
+
+
+# ── Sweep ───────────────────────────────────────────────────
+def _cache_key(strategy: str, params: dict, digest: str, cost_bps: float) -> str:
+    blob = json.dumps([BACKTEST_VERSION, strategy, sorted(params.items()), digest, cost_bps])
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def _get_cache() -> Dict[str, dict]:
+    global _cache, _logged
+    if _cache is None:
+        _cache, _logged = load_sweep_cache()
+        _trim_cache(_cache)
+    return _cache
+
+
+def _trim_cache(cache: Dict[str, dict]):
+    """Evict the oldest entries past MAX_CACHE, compacting the log once evictions have piled up in it."""
+    global _logged
+    while len(cache) > MAX_CACHE:
+        cache.pop(next(iter(cache)))
+    if _logged > COMPACT_AT:
+        save_sweep_cache(cache)
+        _logged = len(cache)
+
+
+def _add_to_cache(cache: Dict[str, dict], fresh: Dict[str, dict]):
+    """Cache new backtests and append just those to the on-disk log. Call with _cache_lock held."""
+    global _logged
+    fresh = {k: r for k, r in fresh.items() if k not in cache}
+    if not fresh:
+        return
+    cache.update(fresh)
+    append_sweep_cache(fresh)
+    _logged += len(fresh)
+    _trim_cache(cache)
+
+
+def _summarize(params: dict, results: List[dict], series: List[dict]) -> dict:
+    return {
+        "params": params,
+        "returnPct": round(sum(r["returnPct"] for r in results) / len(results), 3),
+        "maxDrawdownPct": max(r["maxDrawdownPct"] for r in results),
+        "sharpe": round(sum(r["sharpe"] for r in results) / len(results), 3),
+        "trades": sum(r["trades"] for r in results),
+        "series": {s["symbol"]: r for s, r in zip(series, results)},
+    }
+
+
+def run_sweep(strategy: str, configs: List[dict], series: List[dict], by: str = "sharpe",
+              top: int = 20, parallel: bool = True) -> dict:
+    """Backtest every config (always including the strategy's defaults) on every series and rank them."""
+    start = time.perf_counter()
+    if by not in RANK_KEYS:
+        raise ValueError(f"Rank by one of {', '.join(RANK_KEYS)}")
+    if not series:
+        raise ValueError("No symbol has enough daily history to backtest")
+    defaults = list_strategies()[strategy]
+    unique: Dict[str, dict] = {}
+    for overrides in [{}] + configs:
+        params = {**defaults, **overrides}
+        unique.setdefault(json.dumps(sorted(params.items())), params)
+    configs = list(unique.values())
+
+    for s in series:
+        s["path"], s["digest"] = _write_series(s["symbol"], s["closes"])
+    keys = [[_cache_key(strategy, c, s["digest"], s["costBps"]) for s in series] for c in configs]
+    with _cache_lock:
+        cache = _get_cache()
+        todo = [i for i, row in enumerate(keys) if any(k not in cache for k in row)]
+    if todo:
+        n_batches = min(len(todo), workers.POOL_SIZE * 4) if parallel else 1
+        batches = [todo[j::n_batches] for j in range(n_batches)]
+        spec = [(s["path"], s["costBps"], s["periodsPerYear"]) for s in series]
+        results = workers.run(_run_batch, [(strategy, [configs[i] for i in b], spec) for b in batches], parallel)
+        fresh: Dict[str, dict] = {}
+        for batch, rows in zip(batches, results):
+            for i, row in zip(batch, rows):
+                fresh.update(zip(keys[i], row))
+        with _cache_lock:
+            _add_to_cache(cache, fresh)
+
+    ranked = [_summarize(c, [cache[k] for k in keys[i]], series) for i, c in enumerate(configs)]
+    for name, (field, descending) in RANK_KEYS.items():
+        order = sorted(range(len(ranked)), key=lambda i: ranked[i][field], reverse=descending)
+        for rank, i in enumerate(order, 1):
+            ranked[i].setdefault("ranks", {})[name] = rank
+    baseline = ranked[0]
+    ranked.sort(key=lambda r: r["ranks"][by])
+    return {
+        "strategy": strategy,
+        "by": by,
+        "configs": len(configs),
+        "computed": len(todo),
+        "cached": len(configs) - len(todo),
+        "symbols": {s["symbol"]: len(s["closes"]) for s in series},
+        "baseline": baseline,
+        "results": ranked[:max(top, 1)],
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 1),
+    }
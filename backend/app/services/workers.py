@@ -0,0 +1,35 @@
+"""
+Worker Pool — One shared process pool for CPU-bound jobs (Monte Carlo projection, strategy sweeps).
+Workers are spawned rather than forked because the server process runs logging and event-loop
+threads, and are created on first use so nothing is paid unless a job asks for parallelism.
+Size it with AGENTFI_POOL_SIZE (default: one worker per CPU).
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+POOL_SIZE = int(os.getenv("AGENTFI_POOL_SIZE", "0")) or os.cpu_count() or 1
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=POOL_SIZE, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def run(fn: Callable, tasks: List[tuple], parallel: bool = True) -> list:
+    """fn(*task) for every task, in order; on the pool when `parallel` and there is more than one task."""
+    if parallel and POOL_SIZE > 1 and len(tasks) > 1:
+        return list(get_pool().map(fn, *zip(*tasks)))
+    return [fn(*task) for task in tasks]
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,12 @@
+"""
+AgentFi benchmark suite — offline, no network. Run from backend/:
+    python -m benchmarks.run [--quick] [--out results.json] [--baseline benchmarks/baseline.json]
+
+Importing this package points persistence at a throwaway data directory (unless
+AGENTFI_DATA_DIR is already set) so benchmarks never touch backend/data.
+"""
+import os
+import tempfile
+
+if not os.getenv("AGENTFI_DATA_DIR"):
+    os.environ["AGENTFI_DATA_DIR"] = tempfile.mkdtemp(prefix="agentfi-bench-")
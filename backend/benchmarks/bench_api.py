@@ -0,0 +1,52 @@
+"""
+API benchmark — in-process requests/sec for the hot read endpoints with a stubbed market.
+Uses httpx's ASGI transport, so no server, sockets or upstream providers are involved.
+"""
+import asyncio
+import time
+
+import httpx
+
+import app.services.simulator as sim
+from benchmarks.common import StubMarket, populate_simulator, result
+
+ENDPOINTS = ("/api/agents/", "/api/dashboard/stats", "/api/market/prices")
+
+
+async def _rps(client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            resp = await client.get(path)
+            resp.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def _run(n_agents: int, requests: int, concurrency: int) -> list:
+    import main
+    from app.routes import agents as agents_route
+
+    agents_route._registry.load(populate_simulator(n_agents))
+    market = StubMarket()
+    market.step()
+    await sim.run_simulation_tick()
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ENDPOINTS:
+            await _rps(client, path, 10, concurrency)  # warm-up
+            rps = await _rps(client, path, requests, concurrency)
+            results.append(result(f"api.rps[{path}][agents={n_agents}]", rps, "req/s", better="higher"))
+    return results
+
+
+def bench(quick: bool = False) -> list:
+    results = []
+    for n_agents in ((4, 100) if quick else (4, 100, 1_000)):
+        results.extend(asyncio.run(_run(n_agents, requests=200 if quick else 1_000, concurrency=20)))
+    return results
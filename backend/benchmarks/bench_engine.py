@@ -0,0 +1,27 @@
+"""
+AI engine benchmark — generate_signal and each compute_* indicator across history lengths.
+"""
+from app.services import ai_engine
+from benchmarks.common import measure, price_series, result
+
+LENGTHS = (60, 1_000, 10_000, 100_000)
+
+
+def bench(quick: bool = False) -> list:
+    results = []
+    lengths = LENGTHS[:3] if quick else LENGTHS
+    for n in lengths:
+        prices = price_series(n)
+        cases = {
+            "generate_signal": lambda: ai_engine.generate_signal(prices),
+            "compute_indicators": lambda: ai_engine.compute_indicators(prices),
+            "compute_rsi": lambda: ai_engine.compute_rsi(prices),
+            "compute_sma50": lambda: ai_engine.compute_sma(prices, 50),
+            "compute_ema12": lambda: ai_engine.compute_ema(prices, 12),
+            "compute_momentum": lambda: ai_engine.compute_momentum(prices),
+            "compute_volatility": lambda: ai_engine.compute_volatility(prices),
+        }
+        for name, fn in cases.items():
+            t = measure(fn, repeat=5, number=20)
+            results.append(result(f"engine.{name}[n={n}]", t["median"], "s/call"))
+    return results
@@ -0,0 +1,70 @@
+"""
+Intent router benchmark — chat messages classified per second.
+Compares the compiled router against the original if-chain of `any(kw in text ...)` scans.
+Run from backend/:  python -m benchmarks.bench_intent_router [n_messages]
+"""
+import random
+import sys
+import time
+
+from app.routes.chat import intents
+
+CORPUS = [
+    "What are my agents doing?",
+    "Analyze BTC",
+    "can you run a technical analysis on ethereum for me",
+    "Show recent trades",
+    "Review my portfolio and suggest a rebalance",
+    "Market overview",
+    "what's the sentiment today",
+    "Suggest a strategy",
+    "is solana trading higher than yesterday? analyze it",
+    "hello there",
+    "how are my bots performing, any good decisions lately?",
+    "what did the agents buy and sell in the last hour",
+    "show me my holdings and allocation breakdown please, I want to see everything in detail",
+]
+
+
+def _legacy_classify(user_text: str) -> str:
+    """The pre-router keyword chain, kept here as the benchmark baseline."""
+    if any(kw in user_text for kw in ["agent", "bot", "decision", "doing", "status", "trading"]):
+        return "agents"
+    coin_map = {"btc": "bitcoin", "bitcoin": "bitcoin", "eth": "ethereum", "ethereum": "ethereum", "sol": "solana", "solana": "solana"}
+    for keyword in coin_map:
+        if keyword in user_text and ("analyze" in user_text or "analysis" in user_text or "technical" in user_text):
+            return "analysis"
+    if any(kw in user_text for kw in ["portfolio", "rebalance", "holdings", "allocation"]):
+        return "portfolio"
+    if any(kw in user_text for kw in ["trade", "recent", "history", "buy", "sell"]):
+        return "trades"
+    if any(kw in user_text for kw in ["market", "overview", "sentiment", "price"]):
+        return "market"
+    if any(kw in user_text for kw in ["strategy", "suggest", "recommend"]):
+        return "strategy"
+    return None
+
+
+def _run(fn, messages) -> float:
+    start = time.perf_counter()
+    for m in messages:
+        fn(m)
+    return time.perf_counter() - start
+
+
+def bench(n_messages: int = 200_000, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    messages = [rng.choice(CORPUS) for _ in range(n_messages)]
+    router_s = _run(intents.classify, messages)
+    legacy_s = _run(lambda m: _legacy_classify(m.lower()), messages)
+    return {
+        "name": "intent_router",
+        "messages": n_messages,
+        "router_msgs_per_sec": round(n_messages / router_s),
+        "legacy_msgs_per_sec": round(n_messages / legacy_s),
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(bench(n))
@@ -0,0 +1,51 @@
+"""
+Order book benchmark — orders matched per second.
+Run from backend/:  python -m benchmarks.bench_order_book [n_orders]
+"""
+import random
+import sys
+import time
+
+from app.services.order_book import MatchingEngine, OrderBook
+
+
+def bench_limit_flow(n_orders: int = 200_000, seed: int = 7) -> dict:
+    """Random limit orders around a mid price on a single book (crossing + resting)."""
+    rng = random.Random(seed)
+    book = OrderBook("BTC")
+    orders = [
+        (rng.randrange(1000), "BUY" if rng.random() < 0.5 else "SELL",
+         rng.uniform(0.01, 2.0), round(60_000 + rng.gauss(0, 25), 0))
+        for _ in range(n_orders)
+    ]
+    fills = 0
+    start = time.perf_counter()
+    for agent_id, side, qty, price in orders:
+        fills += len(book.submit_limit(agent_id, side, qty, price))
+    elapsed = time.perf_counter() - start
+    return {"name": "limit_flow", "orders": n_orders, "fills": fills,
+            "seconds": round(elapsed, 4), "orders_per_sec": round(n_orders / elapsed)}
+
+
+def bench_tick_auction(n_agents: int = 10_000, ticks: int = 20, seed: int = 7) -> dict:
+    """The simulator path: one per-tick auction of agent market intents per symbol."""
+    rng = random.Random(seed)
+    engine = MatchingEngine()
+    total = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        orders = [
+            {"agent_id": a, "side": "BUY" if rng.random() < 0.5 else "SELL", "qty": rng.uniform(0.001, 0.5)}
+            for a in range(n_agents)
+        ]
+        engine.match_orders("BTC", 60_000 + rng.gauss(0, 100), orders)
+        total += len(orders)
+    elapsed = time.perf_counter() - start
+    return {"name": "tick_auction", "orders": total, "fills": engine.fills_generated,
+            "seconds": round(elapsed, 4), "orders_per_sec": round(total / elapsed)}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for result in (bench_limit_flow(n), bench_tick_auction()):
+        print(result)
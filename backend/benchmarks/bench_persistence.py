@@ -0,0 +1,37 @@
+"""
+Persistence benchmark — save/load of wallets and trade history at several state sizes.
+"""
+import random
+
+from app.services import persistence
+from benchmarks.common import make_wallet, measure, result
+
+STATE_SIZES = (10, 1_000, 10_000)
+
+
+def _state(n_agents: int, trades_per_agent: int = 100, seed: int = 7):
+    rng = random.Random(seed)
+    wallets, trades = {}, {}
+    for agent_id in range(1, n_agents + 1):
+        w = make_wallet(25_000, "Trend Following", "Crypto (BTC/ETH)")
+        w["positions"] = {s: {"qty": rng.random(), "avgEntry": 100.0, "currentPrice": 101.0} for s in ("BTC", "ETH", "SOL")}
+        wallets[agent_id] = w
+        trades[agent_id] = [
+            {"timestamp": 1_700_000_000 + i, "symbol": "BTC", "action": "BUY", "qty": 0.01,
+             "price": 60_000.0, "value": 600.0, "fee": 0.6, "success": True}
+            for i in range(trades_per_agent)
+        ]
+    return wallets, trades
+
+
+def bench(quick: bool = False) -> list:
+    results = []
+    sizes = STATE_SIZES[:2] if quick else STATE_SIZES
+    for n in sizes:
+        wallets, trades = _state(n)
+        repeat = 3 if n < 10_000 else 1
+        save = measure(lambda: (persistence.save_wallets(wallets), persistence.save_trades(trades)), repeat=repeat)
+        load = measure(lambda: (persistence.load_wallets(), persistence.load_trades()), repeat=repeat)
+        results.append(result(f"persistence.save[agents={n}]", save["median"], "s"))
+        results.append(result(f"persistence.load[agents={n}]", load["median"], "s"))
+    return results
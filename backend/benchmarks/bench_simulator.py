@@ -0,0 +1,29 @@
+"""
+Simulator benchmark — wall time of run_simulation_tick across agent counts.
+"""
+import asyncio
+import time
+
+import app.services.simulator as sim
+from benchmarks.common import StubMarket, populate_simulator, result
+
+AGENT_COUNTS = (10, 100, 1_000, 10_000, 100_000)
+
+
+def bench(quick: bool = False, ticks: int = 5) -> list:
+    results = []
+    counts = AGENT_COUNTS[:4] if quick else AGENT_COUNTS
+    for n in counts:
+        populate_simulator(n)
+        market = StubMarket()
+        runs = []
+        for _ in range(ticks if n < 100_000 else 2):
+            market.step()
+            start = time.perf_counter()
+            asyncio.run(sim.run_simulation_tick())
+            runs.append(time.perf_counter() - start)
+        runs.sort()
+        metrics = sim.get_tick_metrics()
+        results.append(result(f"simulator.tick[agents={n}]", runs[len(runs) // 2], "s/tick",
+                              orders=metrics.get("orders", 0), fills=metrics.get("fills", 0)))
+    return results
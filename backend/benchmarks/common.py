@@ -0,0 +1,93 @@
+"""
+Shared helpers for the benchmark suite: timing, result records, and simulator fixtures.
+"""
+import random
+import statistics
+import time
+from typing import Callable, List
+
+import app.services.market_data as market_data
+import app.services.simulator as sim
+from app.services import risk
+
+STRATEGIES = ["Trend Following", "Mean Reversion", "Volatility Breakout", "High Frequency"]
+ASSETS = ["Crypto (BTC/ETH)", "Stocks (AAPL/NVDA/MSFT)", "Mixed"]
+BASE_PRICES = {"BTC": 60_000.0, "ETH": 3_000.0, "SOL": 150.0, "AAPL": 180.0, "NVDA": 900.0, "MSFT": 400.0}
+
+
+def result(name: str, value: float, unit: str, better: str = "lower", **extra) -> dict:
+    """One benchmark record; `better` says which direction counts as an improvement."""
+    return {"name": name, "value": round(value, 6), "unit": unit, "better": better, **extra}
+
+
+def measure(fn: Callable, repeat: int = 5, number: int = 1) -> dict:
+    """Best-of/median timing of `number` calls, repeated `repeat` times (seconds per call)."""
+    runs: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - start) / number)
+    return {"min": min(runs), "median": statistics.median(runs)}
+
+
+def price_series(n: int, start: float = 100.0, seed: int = 7) -> List[float]:
+    rng = random.Random(seed)
+    prices = [start]
+    for _ in range(n - 1):
+        prices.append(prices[-1] * (1 + rng.gauss(0, 0.01)))
+    return prices
+
+
+def make_wallet(capital: float, strategy: str, asset: str) -> dict:
+    return {
+        "initial_capital": capital, "cash": capital, "positions": {}, "total_value": capital,
+        "pnl": 0, "pnl_pct": 0, "trades_count": 0, "wins": 0, "losses": 0,
+        "strategy": strategy, "asset_focus": asset, "last_trade": None, "started_at": time.time(),
+    }
+
+
+def populate_simulator(n_agents: int, seed: int = 7) -> List[dict]:
+    """Reset simulator state to `n_agents` fresh wallets; returns matching agent configs."""
+    rng = random.Random(seed)
+    sim._wallets.clear()
+    sim._trade_history.clear()
+    sim._agent_statuses.clear()
+    risk._state.clear()
+    agents = []
+    for agent_id in range(1, n_agents + 1):
+        strategy, asset = rng.choice(STRATEGIES), rng.choice(ASSETS)
+        capital = rng.choice([10_000, 15_000, 25_000, 30_000])
+        sim._wallets[agent_id] = make_wallet(capital, strategy, asset)
+        sim._trade_history[agent_id] = []
+        agents.append({"id": agent_id, "name": f"Bench #{agent_id}", "strategy": strategy,
+                       "asset": asset, "status": "active", "capital": capital})
+    sim._rebuild_index()
+    sim._chat_snapshot.clear()
+    sim._save_counter = -10**9  # keep disk I/O out of tick timings
+    return agents
+
+
+class StubMarket:
+    """Drives the market cache with a seeded random walk instead of CoinGecko/Yahoo."""
+
+    def __init__(self, seed: int = 7, warmup: int = 60):
+        self.rng = random.Random(seed)
+        self.prices = dict(BASE_PRICES)
+        sim._price_history.clear()
+        for _ in range(warmup):
+            self.step()
+            sim._update_indicators(self.prices)
+
+    def step(self):
+        for sym in self.prices:
+            self.prices[sym] *= 1 + self.rng.gauss(0, 0.01)
+        quotes = [
+            {"symbol": s, "name": s, "price": p, "change": round(self.rng.uniform(-3, 3), 2),
+             "volume": 0, "marketCap": 0, "sector": market_data.get_sector(s)}
+            for s, p in self.prices.items()
+        ]
+        market_data._cache["all"] = quotes
+        market_data._cache["crypto"] = [q for q in quotes if q["sector"] == "Crypto"]
+        market_data._cache["stocks"] = [q for q in quotes if q["sector"] == "Stocks"]
+        market_data._last_update += 1  # new "refresh" so the simulator recomputes indicators
@@ -0,0 +1,120 @@
+"""
+Benchmark runner — runs every suite and writes machine-readable JSON, optionally
+comparing against a stored baseline and failing on regressions.
+Run from backend/:
+    python -m benchmarks.run --quick --out bench.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import benchmarks  # noqa: F401  (isolates the data dir before any app import)
+from benchmarks import (
+    bench_api, bench_engine, bench_intent_router, bench_order_book, bench_persistence, bench_projection, bench_simulator,
+)
+from benchmarks.common import result
+
+SUITES = ("engine", "simulator", "persistence", "api", "order_book", "intent_router", "projection")
+
+
+def _order_book(quick: bool) -> list:
+    flow = bench_order_book.bench_limit_flow(20_000 if quick else 200_000)
+    auction = bench_order_book.bench_tick_auction(ticks=5 if quick else 20)
+    return [
+        result("order_book.limit_flow", flow["orders_per_sec"], "orders/s", better="higher"),
+        result("order_book.tick_auction", auction["orders_per_sec"], "orders/s", better="higher"),
+    ]
+
+
+def _intent_router(quick: bool) -> list:
+    r = bench_intent_router.bench(20_000 if quick else 200_000)
+    return [result("intent_router.classify", r["router_msgs_per_sec"], "msgs/s", better="higher")]
+
+
+def _projection(quick: bool) -> list:
+    r = bench_projection.bench(10_000 if quick else 100_000)
+    return [result("projection.simulate", r["paths_per_sec"], "paths/s", better="higher")]
+
+
+RUNNERS = {
+    "engine": bench_engine.bench,
+    "simulator": bench_simulator.bench,
+    "persistence": bench_persistence.bench,
+    "api": bench_api.bench,
+    "order_book": _order_book,
+    "intent_router": _intent_router,
+    "projection": _projection,
+}
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Results that got worse than the baseline by more than `threshold` (a fraction)."""
+    base = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        ref = base.get(r["name"])
+        if not ref or not ref["value"]:
+            continue
+        change = (r["value"] - ref["value"]) / ref["value"]
+        worse = change if r["better"] == "lower" else -change
+        r["baseline"] = ref["value"]
+        r["changePct"] = round(change * 100, 2)
+        if worse > threshold:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AgentFi benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    parser.add_argument("--only", nargs="*", choices=SUITES, help="run a subset of suites")
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also store the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown fraction (default 0.10)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for suite in args.only or SUITES:
+        start = time.perf_counter()
+        results.extend(RUNNERS[suite](args.quick))
+        print(f"[bench] {suite} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    report = {
+        "createdAt": time.time(),
+        "quick": args.quick,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        report["regressions"] = [r["name"] for r in regressions]
+
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(payload)
+
+    for r in regressions:
+        print(f"[bench] REGRESSION {r['name']}: {r['baseline']} -> {r['value']} {r['unit']} ({r['changePct']:+.1f}%)",
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
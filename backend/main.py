@@ -3,25 +3,40 @@ AgentFi Backend — FastAPI Server
 Real-time market data, AI signal generation, trading simulation, and portfolio management.
 """
 import asyncio
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+import httpx
 
-from app.routes import market, portfolio, agents, chat, dashboard
+from app.routes import market, portfolio, agents, chat, dashboard, trades, admin, alerts
+from app.services import metrics, profiler, shared_state, workers
+from app.services.log import setup_logging
 from app.services.market_data import MarketDataService
 from app.services.simulator import start_simulation_loop
 
+setup_logging()
 market_service = MarketDataService()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: begin background market data polling + trading simulation
-    market_task = asyncio.create_task(market_service.start_polling())
-    sim_task = asyncio.create_task(start_simulation_loop())
+    tasks = [asyncio.create_task(metrics.monitor_event_loop())]
+    if shared_state.is_reader():
+        # Read-only worker: state comes from the writer process via shared memory
+        tasks.append(asyncio.create_task(shared_state.follow()))
+    else:
+        # Startup: begin background market data polling + trading simulation
+        if shared_state.is_writer():
+            shared_state.start_writer()
+        tasks.append(asyncio.create_task(market_service.start_polling()))
+        tasks.append(asyncio.create_task(start_simulation_loop()))
     yield
     # Shutdown: cancel
-    market_task.cancel()
-    sim_task.cancel()
+    for task in tasks:
+        task.cancel()
+    workers.shutdown()
+    shared_state.close()
 
 app = FastAPI(
     title="AgentFi API",
@@ -38,13 +53,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def route_latency(request: Request, call_next):
+    if profiler.is_armed(request.url.path):
+        with profiler.capture(request.url.path):
+            return await call_next(request)
+    if not metrics.is_enabled():
+        return await call_next(request)
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.ROUTE_LATENCY.observe(
+        time.perf_counter() - start,
+        route=route.path if route else "unmatched",
+        method=request.method,
+    )
+    return response
+
+# ── Multi-worker state sync ─────────────────────────────────
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+LOCAL_PREFIXES = ("/api/chat",)  # read-only POSTs that readers can answer themselves
+HOP_HEADERS = {"host", "content-length", "transfer-encoding", "connection", "content-encoding", "date", "server"}
+_writer_client: httpx.AsyncClient = None
+
+
+async def _forward_to_writer(request: Request) -> Response:
+    """Readers can't mutate state: replay the request on the writer, then wait for its snapshot."""
+    global _writer_client
+    if _writer_client is None:
+        _writer_client = httpx.AsyncClient(base_url=shared_state.WRITER_URL, timeout=30)
+    upstream = await _writer_client.request(
+        request.method,
+        request.url.path,
+        params=request.query_params,
+        content=await request.body(),
+        headers={k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS},
+    )
+    seq = int(upstream.headers.get(shared_state.SEQ_HEADER, 0))
+    if seq:
+        await shared_state.wait_for(seq)
+    headers = {k: v for k, v in upstream.headers.items() if k.lower() not in HOP_HEADERS}
+    return Response(upstream.content, status_code=upstream.status_code, headers=headers)
+
+
+async def shared_state_sync(request: Request, call_next):
+    if request.method in READ_METHODS or request.url.path.startswith(LOCAL_PREFIXES):
+        return await call_next(request)
+    if shared_state.is_reader():
+        return await _forward_to_writer(request)
+    response = await call_next(request)
+    response.headers[shared_state.SEQ_HEADER] = str(shared_state.publish())
+    return response
+
+
+if shared_state.ROLE != "standalone":
+    app.middleware("http")(shared_state_sync)
+
 # Include routers
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(market.router, prefix="/api/market", tags=["Market Data"])
 app.include_router(portfolio.router, prefix="/api/portfolio", tags=["Portfolio"])
 app.include_router(agents.router, prefix="/api/agents", tags=["AI Agents"])
 app.include_router(chat.router, prefix="/api/chat", tags=["AI Chat"])
+app.include_router(trades.router, prefix="/api/trades", tags=["Trades"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(alerts.router, prefix="/api/alerts", tags=["Alerts"])
 
 @app.get("/api/health")
 async def health_check():
+    if shared_state.is_stale():
+        # Serving a snapshot the writer has moved past (or couldn't publish): take this worker out of rotation
+        return JSONResponse(
+            {"status": "stale", "service": "AgentFi API", "version": "1.0.0", "sharedState": shared_state.get_status()},
+            status_code=503,
+        )
     return {"status": "online", "service": "AgentFi API", "version": "1.0.0"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
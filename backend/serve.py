@@ -0,0 +1,68 @@
+"""
+AgentFi multi-worker launcher — one writer process running the simulation plus N read-only
+API workers serving from its shared-memory snapshots (see app/services/shared_state.py).
+    python serve.py --workers 4 --port 8000
+With --workers 1 this just runs the regular single-process server.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+from app.services import shared_state
+
+
+def _wait_healthy(url: str, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"writer exited with code {proc.returncode}")
+        try:
+            urllib.request.urlopen(url + "/api/health", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit("writer did not become healthy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run AgentFi with N read-only API workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--writer-port", type=int, default=8001)
+    args = parser.parse_args()
+
+    uvicorn = [sys.executable, "-m", "uvicorn", "main:app"]
+    if args.workers <= 1:
+        os.execv(sys.executable, uvicorn + ["--host", args.host, "--port", str(args.port)])
+
+    writer_url = f"http://127.0.0.1:{args.writer_port}"
+    env = {**os.environ, "AGENTFI_WRITER_URL": writer_url}
+    writer = subprocess.Popen(uvicorn + ["--host", "127.0.0.1", "--port", str(args.writer_port)],
+                              env={**env, "AGENTFI_ROLE": "writer"})
+    _wait_healthy(writer_url, writer)
+    readers = subprocess.Popen(uvicorn + ["--host", args.host, "--port", str(args.port), "--workers", str(args.workers)],
+                               env={**env, "AGENTFI_ROLE": "reader"})
+
+    def stop(*_):
+        for proc in (readers, writer):
+            proc.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while writer.poll() is None and readers.poll() is None:
+            time.sleep(0.5)
+    finally:
+        stop()
+        for proc in (readers, writer):
+            proc.wait()
+        shared_state.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -23,15 +23,17 @@ export const marketAPI = {
     getAllPrices: () => request('/market/prices'),
     getCrypto: () => request('/market/crypto'),
     getStocks: () => request('/market/stocks'),
-    getHistory: (coinId = 'bitcoin', days = 30) =>
-        request(`/market/history/${coinId}?days=${days}`),
+    getHistory: (coinId = 'bitcoin', days = 30, points = 60) =>
+        request(`/market/history/${coinId}?days=${days}&points=${points}`),
     getAnalysis: (symbol) => request(`/market/analysis/${symbol}`),
+    getCandles: (symbol, params = {}) => request(`/market/candles/${symbol}?${new URLSearchParams(params)}`),
 };
 
 // ── Portfolio ───────────────────────────────────────────────
 export const portfolioAPI = {
     getHoldings: () => request('/portfolio/holdings'),
     getAnalysis: () => request('/portfolio/analysis'),
+    getProjection: (params = {}) => request(`/portfolio/projection?${new URLSearchParams(params)}`),
     rebalance: (adjustments) =>
         request('/portfolio/rebalance', {
             method: 'POST',
@@ -49,6 +51,47 @@ export const agentsAPI = {
             body: JSON.stringify(data),
         }),
     toggle: (id) => request(`/agents/${id}/toggle`, { method: 'POST' }),
+    getProjection: (id, params = {}) => request(`/agents/${id}/projection?${new URLSearchParams(params)}`),
+    query: (params = {}) => request(`/agents/?${new URLSearchParams(params)}`),
+    getLeaderboard: (params = {}) => request(`/agents/leaderboard?${new URLSearchParams(params)}`),
+    bulkCreate: (agents) =>
+        request('/agents/bulk', {
+            method: 'POST',
+            body: JSON.stringify({ agents }),
+        }),
+    sweep: (params) =>
+        request('/agents/sweep', {
+            method: 'POST',
+            body: JSON.stringify(params),
+        }),
+    bulkToggle: (selection) =>
+        request('/agents/bulk-toggle', {
+            method: 'POST',
+            body: JSON.stringify(selection),
+        }),
+};
+
+// ── Trades ──────────────────────────────────────────────────
+export const tradesAPI = {
+    recent: (limit = 20) => request(`/trades/recent?limit=${limit}`),
+};
+
+// ── Alerts ──────────────────────────────────────────────────
+export const alertsAPI = {
+    list: (params = {}) => request(`/alerts/?${new URLSearchParams(params)}`),
+    create: (rule) =>
+        request('/alerts/', {
+            method: 'POST',
+            body: JSON.stringify(rule),
+        }),
+    bulkCreate: (rules) =>
+        request('/alerts/bulk', {
+            method: 'POST',
+            body: JSON.stringify({ rules }),
+        }),
+    remove: (id) => request(`/alerts/${id}`, { method: 'DELETE' }),
+    getEvents: (since = 0, limit = 100) => request(`/alerts/events?since=${since}&limit=${limit}`),
+    streamUrl: (since) => `${API_BASE}/alerts/stream${since != null ? `?since=${since}` : ''}`,
 };
 
 // ── AI Chat ─────────────────────────────────────────────────